@@ -20,18 +20,57 @@ Environment Variables (alternative to CLI args):
     CLOUDFLARE_API_TOKEN - Your Cloudflare API token
     CLOUDFLARE_PROJECT_NAME - Your Pages project name
     DEPLOY_DIR - Directory containing files to deploy (default: ./out)
-
-Note: This script is designed for text-based files (HTML, CSS, JS).
-For sites with binary assets (images, fonts), use Wrangler CLI or the web interface.
+    DEPLOY_CACHE_DIR - Where to keep local deploy caches (default: ~/.cache/sycord-deploy)
+
+Uploads are content-addressed: every asset is hashed, Cloudflare is asked which
+hashes it is missing, and only those are uploaded. Hashes from the last
+successful deploy of the project are cached locally and not re-checked.
+Pass --full-upload to send every file in a single manifest request instead.
+
+Files are uploaded byte-for-byte, so binary assets (images, fonts) are supported.
+
+The project check (and creation, if needed) runs in the background while
+files are read and hashed. After a successful deploy it is skipped for an
+hour (DEPLOY_PREFLIGHT_TTL seconds, 0 to always check).
+
+Progress is checkpointed to a journal under DEPLOY_CACHE_DIR, and failed
+requests are retried with backoff. If a deploy still fails, re-run it with
+--resume (or DEPLOY_RESUME=1) to skip the uploads it already confirmed.
+
+Each deploy is planned against the branch's live deployment, found by paging
+through the project's deployments. Its manifest comes from the local cache of
+deployments made by this script, one file per deployment ID. If nothing would
+change, the deploy is skipped. --dry-run prints the plan without deploying;
+--plan-json writes it as JSON.
+
+Cache-Control headers come from a per-glob policy (--headers, default:
+revalidate HTML, cache static assets for an hour), sent as the deployment's
+_headers file ahead of the site's own _headers rules. --fingerprint adds
+content-hashed copies of the assets HTML and CSS reference under /_fp/,
+points the references at them and serves them as immutable for a year.
+Scripts are only fingerprinted with --fingerprint-scripts.
+--optimize minifies HTML, CSS and JavaScript before upload; results are
+cached by content, so only changed files are minified again. HTML comments
+are kept unless --strip-html-comments is given.
+
+--watch keeps running after the first deploy and redeploys whenever files in
+the directory change, once they have been left alone for --debounce seconds
+(default 0.5). Only assets Cloudflare does not hold yet are uploaded. Combine
+it with --branch=preview to iterate on a preview deployment.
+
+--metrics-json writes phase timings, request latency histograms, retry and
+byte counters and peak memory as JSON; --trace writes the phases as a Chrome
+trace-event file.
 """
 
 import os
 import sys
 import argparse
 import json
-import base64
+import mimetypes
+import time
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Sequence, Set, Tuple
 
 try:
     import requests
@@ -40,27 +79,91 @@ except ImportError:
     print("Install it with: pip install requests")
     sys.exit(1)
 
+from deploy_common import (
+    DEFAULT_JOBS, DEFAULT_SCAN_WORKERS, DeployFile, DigestCounts, IgnoreRules, PreflightCache, StatIndex, batch_files,
+    cloudflare_digest, create_session, get_cache_dir, iter_base64_chunks, read_files, run_parallel, select_files,
+    start_background, stream_base64_map, temp_path
+)
+from deploy_assets import cloudflare_headers_file, fingerprint_files, load_header_policy
+from deploy_blobstore import BlobStore
+from deploy_journal import DeployJournal
+from deploy_metrics import DeployMetrics, phase
+from deploy_optimize import optimize_files
+from deploy_plan import DeployPlan, ListingCache, plan_changes
+from deploy_watch import DEFAULT_DEBOUNCE_SECONDS, DirectoryWatcher, watch_and_deploy
+
+
+# Overridable so the script can be pointed at a proxy or a local stand-in API
+API_BASE = os.getenv("CLOUDFLARE_API_BASE", "https://api.cloudflare.com/client/v4")
+
+# Upper bounds for one asset upload request (same as Wrangler's buckets)
+MAX_BATCH_BYTES = 50 * 1024 * 1024
+MAX_BATCH_FILES = 5000
+
+# Hashes in the local manifest cache are trusted for this long before
+# Cloudflare is asked about them again
+MANIFEST_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Deployments are listed newest first; the branch's live one is normally on the first page
+DEPLOYMENTS_PAGE_SIZE = 25
+MAX_DEPLOYMENT_PAGES = 4
+
 
 class CloudflareDeployer:
     """Cloudflare Pages deployment using REST API"""
 
-    def __init__(self, account_id: str, api_token: str, project_name: str, deploy_dir: str, branch: str = "main"):
+    MAX_FILE_SIZE_MB = 25  # Cloudflare limit
+
+    def __init__(self, account_id: str, api_token: str, project_name: str, deploy_dir: str, branch: str = "main",
+                 full_upload: bool = False, jobs: int = DEFAULT_JOBS,
+                 scan_workers: int = DEFAULT_SCAN_WORKERS, scan_processes: bool = True,
+                 exclude: Sequence[str] = (), default_excludes: bool = True, resume: bool = False,
+                 optimize: bool = False, strip_html_comments: bool = False, fingerprint: bool = False,
+                 fingerprint_scripts: bool = False, headers_file: Optional[str] = None,
+                 dry_run: bool = False, plan_json: Optional[str] = None,
+                 session: Optional[requests.Session] = None, stat_index: Optional[StatIndex] = None):
         self.account_id = account_id
         self.api_token = api_token
         self.project_name = project_name
         self.deploy_dir = Path(deploy_dir)
         self.branch = branch
-        self.session = requests.Session()
+        self.full_upload = full_upload
+        self.jobs = jobs
+        self.scan_workers = scan_workers
+        self.scan_processes = scan_processes
+        self.manifest_cache_path = get_cache_dir() / "cloudflare" / account_id / f"{project_name}.json"
+        # The API does not list a deployment's files, so the manifests of our own deployments are kept
+        self.listings = ListingCache(get_cache_dir() / "cloudflare" / account_id / project_name / "deployments")
+        self.ignore_rules = IgnoreRules.for_directory(self.deploy_dir, ".cfignore", exclude, default_excludes)
+        self.stat_index = stat_index or StatIndex.for_directory(self.deploy_dir)
+        self.blob_store = BlobStore.default()
+        self.blob_scope = f"cloudflare:{account_id}/{project_name}"
+        self.resume = resume
+        self.dry_run = dry_run
+        self.plan_json = plan_json
+        self.optimize = optimize
+        self.strip_html_comments = strip_html_comments
+        self.fingerprint = fingerprint
+        self.fingerprint_scripts = fingerprint_scripts
+        self.header_policy = load_header_policy(headers_file)
+        self.headers = cloudflare_headers_file(self.header_policy)
+        self.journal = DeployJournal.for_target("cloudflare", account_id, project_name, branch)
+        self.metrics = DeployMetrics()
+        self.preflight_cache = PreflightCache.default()
+        self.preflight_key = PreflightCache.key("cloudflare", f"{account_id}/{project_name}", api_token)
+        # A caller deploying several sites can pass one session to share its connection pool
+        self.session = session or create_session(jobs)
         self.session.headers.update({
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json"
         })
 
+    @phase("preflight")
     def check_project_exists(self) -> bool:
         """Check if Cloudflare Pages project exists"""
         print(f"🔍 Checking if Cloudflare Pages project exists: {self.project_name}")
 
-        url = f"https://api.cloudflare.com/client/v4/accounts/{self.account_id}/pages/projects/{self.project_name}"
+        url = f"{API_BASE}/accounts/{self.account_id}/pages/projects/{self.project_name}"
         response = self.session.get(url)
 
         if response.status_code == 200:
@@ -70,11 +173,12 @@ class CloudflareDeployer:
             print("ℹ️  Project does not exist, will create it")
             return False
 
+    @phase("preflight")
     def create_project(self) -> bool:
         """Create Cloudflare Pages project"""
         print(f"📝 Creating Cloudflare Pages project: {self.project_name}")
 
-        url = f"https://api.cloudflare.com/client/v4/accounts/{self.account_id}/pages/projects"
+        url = f"{API_BASE}/accounts/{self.account_id}/pages/projects"
         payload = {
             "name": self.project_name,
             "production_branch": self.branch,
@@ -89,83 +193,134 @@ class CloudflareDeployer:
             print(f"❌ Failed to create project: {response.text}")
             return False
 
-    def read_files(self) -> List[Dict[str, str]]:
-        """Read all files from deploy directory"""
+    def preflight(self) -> None:
+        """Make sure the project exists, creating it if needed, unless a recent deploy already did"""
+        if self.preflight_cache.take(self.preflight_key):
+            print("✅ Project checked by a recent deploy")
+            return
+
+        if not self.check_project_exists() and not self.create_project():
+            raise Exception("Failed to create project")
+
+    @phase("scan")
+    def read_files(self) -> List[DeployFile]:
+        """List all files in the deploy directory"""
         print(f"\n📂 Reading files from: {self.deploy_dir}")
 
-        if not self.deploy_dir.exists():
-            raise FileNotFoundError(f"Deploy directory not found: {self.deploy_dir}")
+        files = read_files(self.deploy_dir, self.MAX_FILE_SIZE_MB, self.scan_workers, self.ignore_rules)
 
-        files = []
-        MAX_FILE_SIZE_MB = 25  # Cloudflare limit
+        print(f"✅ Found {len(files)} file(s)")
+        return files
 
-        for file_path in self.deploy_dir.rglob("*"):
-            if file_path.is_file():
-                try:
-                    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                        content = f.read()
+    @phase("scan")
+    def select_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Apply this target's ignore rules and size limit to files scanned elsewhere"""
+        files = select_files(files, self.MAX_FILE_SIZE_MB, self.ignore_rules)
+        print(f"\n📂 Deploying {len(files)} scanned file(s) from: {self.deploy_dir}")
+        return files
 
-                    # Validate file size
-                    size_mb = len(content.encode("utf-8")) / 1024 / 1024
-                    if size_mb > MAX_FILE_SIZE_MB:
-                        print(f"⚠️  Warning: {file_path.name} is {size_mb:.2f}MB (limit: {MAX_FILE_SIZE_MB}MB), skipping...")
-                        continue
+    @phase("optimize")
+    def optimize_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Swap in minified copies of HTML, CSS and JavaScript"""
+        optimized, report = optimize_files(files, self.deploy_dir, self.scan_workers, self.scan_processes,
+                                           self.strip_html_comments)
+        for kind, (count, before, after) in report.items():
+            self.metrics.count(f"optimize_saved_bytes_{kind}", before - after)
+        return optimized
+
+    @phase("fingerprint")
+    def fingerprint_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Add fingerprinted copies of the assets HTML and CSS reference"""
+        fingerprinted = fingerprint_files(files, self.deploy_dir, self.stat_index, self.scan_workers,
+                                          self.scan_processes, self.fingerprint_scripts)
+        self.metrics.count("fingerprinted", len(fingerprinted) - len(files))
+        return fingerprinted
+
+    def take_headers_file(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Merge the site's own _headers into the header policy and drop it from the assets"""
+        site_headers = next((file for file in files if file.path == "/_headers"), None)
+        if site_headers is None:
+            return files
+        self.headers = cloudflare_headers_file(self.header_policy, site_headers.source.read_text(encoding="utf-8"))
+        return [file for file in files if file is not site_headers]
+
+    def headers_as_file(self) -> DeployFile:
+        """The rendered _headers as a deploy file, for the inline upload"""
+        path = self.manifest_cache_path.with_suffix(".headers")
+        data = self.headers.encode("utf-8")
+        try:
+            unchanged = path.read_bytes() == data
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        stat = path.stat()
+        return DeployFile("/_headers", path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def deploy_files(self, files: List[DeployFile], manifest: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
+        """Deploy files to Cloudflare Pages"""
+        if self.full_upload:
+            return self.deploy_files_inline(files + [self.headers_as_file()])
+        return self.deploy_files_by_hash(files, manifest)
 
-                    # Get relative path with leading slash
-                    relative_path = "/" + str(file_path.relative_to(self.deploy_dir)).replace("\\", "/")
+    @phase("upload")
+    def deploy_files_inline(self, files: List[DeployFile]) -> Tuple[str, str]:
+        """Deploy files by sending every file's content in one manifest"""
+        print("🚀 Starting deployment to Cloudflare Pages...")
 
-                    files.append({
-                        "path": relative_path,
-                        "content": content
-                    })
-                except Exception as e:
-                    print(f"⚠️  Warning: Failed to read {file_path.name}: {e}")
+        upload_url = self.journal.get("upload_url")
+        deployment_id = self.journal.get("deployment_id")
 
-        print(f"✅ Found {len(files)} file(s)")
-        return files
+        if upload_url:
+            print(f"↩️  Resuming interrupted deployment {deployment_id}")
+        else:
+            # Create deployment
+            print("📝 Creating deployment...")
 
-    def deploy_files(self, files: List[Dict[str, str]]) -> Tuple[str, str]:
-        """Deploy files to Cloudflare Pages"""
-        print(f"🚀 Starting deployment to Cloudflare Pages...")
+            url = f"{API_BASE}/accounts/{self.account_id}/pages/projects/{self.project_name}/deployments"
+            payload = {
+                "branch": self.branch,
+            }
 
-        # Create deployment
-        print("📝 Creating deployment...")
+            response = self.session.post(url, json=payload)
 
-        url = f"https://api.cloudflare.com/client/v4/accounts/{self.account_id}/pages/projects/{self.project_name}/deployments"
-        payload = {
-            "branch": self.branch,
-        }
+            if not response.ok:
+                raise Exception(f"Failed to create deployment: {response.text}")
 
-        response = self.session.post(url, json=payload)
+            deploy_data = response.json()
+            upload_url = deploy_data.get("result", {}).get("upload_url")
+            deployment_id = deploy_data.get("result", {}).get("id", "unknown")
 
-        if not response.ok:
-            raise Exception(f"Failed to create deployment: {response.text}")
+            if not upload_url:
+                raise Exception("No upload URL received from Cloudflare")
 
-        deploy_data = response.json()
-        upload_url = deploy_data.get("result", {}).get("upload_url")
-        deployment_id = deploy_data.get("result", {}).get("id", "unknown")
+            self.journal.set(upload_url=upload_url, deployment_id=deployment_id)
+            print("✅ Deployment created, uploading files...")
 
-        if not upload_url:
-            raise Exception("No upload URL received from Cloudflare")
+        # Skip files an interrupted attempt already uploaded, unless they changed since
+        uploaded = self.journal.mapping("inline_uploaded")
+        pending = [file for file in files if uploaded.get(file.path) != [file.size, file.mtime_ns]]
+        if len(pending) < len(files):
+            print(f"   ↩️  {len(files) - len(pending)} file(s) already uploaded by the interrupted deploy")
 
-        print("✅ Deployment created, uploading files...")
+        batches = batch_files(pending, MAX_BATCH_BYTES, MAX_BATCH_FILES)
+        self.metrics.count("bytes_raw", sum(file.size for file in pending))
 
-        # Create file manifest
-        manifest = {}
-        for file in files:
-            # Encode content to base64
-            content_bytes = file["content"].encode("utf-8")
-            base64_content = base64.b64encode(content_bytes).decode("utf-8")
-            manifest[file["path"]] = base64_content
+        def upload_batch(numbered_batch: Tuple[int, List[DeployFile]]) -> None:
+            index, batch = numbered_batch
+            batch_bytes = sum(file.size for file in batch)
+            print(f"   📦 Batch {index}/{len(batches)}: {len(batch)} file(s), {batch_bytes / 1024:.2f} KB")
 
-            size_kb = len(file["content"]) / 1024
-            print(f"   - {file['path']} ({size_kb:.2f} KB)")
+            with self.metrics.span("upload_batch", index=index, files=len(batch), bytes=batch_bytes):
+                # Stream the manifest batch instead of building it in memory
+                upload_response = self.session.post(upload_url, data=lambda: stream_base64_map("manifest", batch))
 
-        # Upload manifest
-        upload_response = self.session.post(upload_url, json={"manifest": manifest})
+            if not upload_response.ok:
+                raise Exception(f"Failed to upload files: {upload_response.text}")
+            self.journal.update("inline_uploaded", {file.path: [file.size, file.mtime_ns] for file in batch})
 
-        if not upload_response.ok:
-            raise Exception(f"Failed to upload files: {upload_response.text}")
+        run_parallel(upload_batch, list(enumerate(batches, 1)), self.jobs)
 
         print("✅ Files uploaded successfully")
 
@@ -174,29 +329,299 @@ class CloudflareDeployer:
 
         return deployment_url, deployment_id
 
-    def deploy(self) -> str:
-        """Main deployment workflow"""
+    def file_digest(self) -> Tuple[str, Callable[[DeployFile], Dict[str, str]]]:
+        """Digest kind and picklable function files are content-addressed with"""
+        return "cloudflare", cloudflare_digest
+
+    @phase("encode")
+    def hash_files(self, files: List[DeployFile]) -> Dict[str, str]:
+        """Content-address files the way Pages expects (base64 content + extension)"""
+        kind, compute = self.file_digest()
+        # Counted per call: the fingerprint pass digests the same index before this stage
+        counts = DigestCounts()
+        digests = self.stat_index.digest_all(files, kind, compute, self.scan_workers, self.scan_processes, counts)
+
+        print(f"   {counts.hits} unchanged file(s) reused cached hashes, {counts.misses} hashed")
+        self.metrics.count("stat_index_hits", counts.hits)
+        self.metrics.count("stat_index_misses", counts.misses)
+        self.stat_index.prune(files)
+        self.stat_index.save()
+        return {path: file_digests["cloudflare"] for path, file_digests in digests.items()}
+
+    def load_known_hashes(self) -> Set[str]:
+        """Hashes uploaded by the last successful deploy, if the cache is fresh"""
+        try:
+            with open(self.manifest_cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return set()
+
+        if time.time() - cached.get("updated_at", 0) > MANIFEST_CACHE_TTL_SECONDS:
+            return set()
+
+        return set(cached.get("files", {}).values())
+
+    def save_manifest_cache(self, manifest: Dict[str, str], deployment_id: str) -> None:
+        """Remember the deployed manifest for the next run"""
+        try:
+            self.manifest_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = temp_path(self.manifest_cache_path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "updated_at": time.time(),
+                    "deployment_id": deployment_id,
+                    "files": manifest,
+                }, f)
+            os.replace(tmp_path, self.manifest_cache_path)
+        except OSError as e:
+            print(f"⚠️  Warning: Failed to write manifest cache: {e}")
+
+    @phase("upload")
+    def get_upload_token(self) -> str:
+        """Get a short-lived JWT for the Pages assets API"""
+        url = f"{API_BASE}/accounts/{self.account_id}/pages/projects/{self.project_name}/upload-token"
+        response = self.session.get(url)
+
+        if not response.ok:
+            raise Exception(f"Failed to get upload token: {response.text}")
+
+        jwt = response.json().get("result", {}).get("jwt")
+        if not jwt:
+            raise Exception("No upload token received from Cloudflare")
+        return jwt
+
+    @phase("check")
+    def check_missing(self, jwt: str, hashes: List[str]) -> List[str]:
+        """Ask Cloudflare which of the given hashes it doesn't have yet"""
+        response = self.session.post(
+            f"{API_BASE}/pages/assets/check-missing",
+            json={"hashes": hashes},
+            headers={"Authorization": f"Bearer {jwt}"},
+        )
+
+        if not response.ok:
+            raise Exception(f"Failed to check missing assets: {response.text}")
+
+        return response.json().get("result", [])
+
+    @staticmethod
+    def stream_assets(files: List[DeployFile], hashes: Dict[str, str]):
+        """Stream an assets upload body: [{key, value, metadata, base64}, ...]"""
+        yield b"["
+        for index, file in enumerate(files):
+            content_type = mimetypes.guess_type(file.path)[0] or "application/octet-stream"
+            if index:
+                yield b","
+            yield b'{"key":' + json.dumps(hashes[file.path]).encode("utf-8")
+            yield b',"metadata":' + json.dumps({"contentType": content_type}).encode("utf-8")
+            yield b',"base64":true,"value":"'
+            yield from iter_base64_chunks(file.source)
+            yield b'"}'
+        yield b"]"
+
+    @phase("upload")
+    def upload_assets(self, jwt: str, files: List[DeployFile], hashes: Dict[str, str]) -> None:
+        """Upload asset content keyed by hash, in concurrent size-bounded batches"""
+        batches = batch_files(files, MAX_BATCH_BYTES, MAX_BATCH_FILES)
+        self.metrics.count("bytes_raw", sum(file.size for file in files))
+
+        def upload_batch(numbered_batch: Tuple[int, List[DeployFile]]) -> None:
+            index, batch = numbered_batch
+            batch_bytes = sum(file.size for file in batch)
+            print(f"   📦 Batch {index}/{len(batches)}: {len(batch)} file(s), {batch_bytes / 1024:.2f} KB")
+
+            with self.metrics.span("upload_batch", index=index, files=len(batch), bytes=batch_bytes):
+                response = self.session.post(
+                    f"{API_BASE}/pages/assets/upload",
+                    data=lambda: self.stream_assets(batch, hashes),
+                    headers={"Authorization": f"Bearer {jwt}"},
+                )
+
+            if not response.ok:
+                raise Exception(f"Failed to upload files: {response.text}")
+            self.journal.extend("uploaded", [hashes[file.path] for file in batch])
+            self.blob_store.mark_present(self.blob_scope, [hashes[file.path] for file in batch])
+
+        run_parallel(upload_batch, list(enumerate(batches, 1)), self.jobs)
+
+    @phase("release")
+    def upsert_hashes(self, jwt: str, hashes: List[str]) -> None:
+        """Refresh the retention of every asset referenced by the deployment"""
+        response = self.session.post(
+            f"{API_BASE}/pages/assets/upsert-hashes",
+            json={"hashes": hashes},
+            headers={"Authorization": f"Bearer {jwt}"},
+        )
+
+        if not response.ok:
+            raise Exception(f"Failed to register asset hashes: {response.text}")
+
+    @phase("release")
+    def create_deployment(self, manifest: Dict[str, str]) -> str:
+        """Create a deployment from a path -> hash manifest"""
+        print("📝 Creating deployment...")
+
+        url = f"{API_BASE}/accounts/{self.account_id}/pages/projects/{self.project_name}/deployments"
+        form = {
+            "manifest": (None, json.dumps(manifest)),
+            "branch": (None, self.branch),
+            "_headers": ("_headers", self.headers),
+        }
+
+        # Drop the session's JSON content type so requests sets the multipart boundary
+        response = self.session.post(url, files=form, headers={"Content-Type": None})
+
+        if not response.ok:
+            raise Exception(f"Failed to create deployment: {response.text}")
+
+        return response.json().get("result", {}).get("id", "unknown")
+
+    def deploy_files_by_hash(self, files: List[DeployFile],
+                             manifest: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
+        """Deploy files uploading only the assets Cloudflare is missing
+
+        Pass the path -> hash manifest if hash_files already ran.
+        """
+        print("🚀 Starting deployment to Cloudflare Pages...")
+
+        if manifest is None:
+            manifest = self.hash_files(files)
+
+        all_hashes = sorted(set(manifest.values()))
+
+        # Assets confirmed by an interrupted attempt or recorded in the blob store count as known too
+        known_hashes = (
+            self.load_known_hashes()
+            | self.journal.items("uploaded")
+            | self.blob_store.present(self.blob_scope, all_hashes)
+        )
+        unknown_hashes = [h for h in all_hashes if h not in known_hashes]
+        print(f"🔍 {len(all_hashes) - len(unknown_hashes)} asset(s) known from earlier deploys")
+
+        jwt = self.get_upload_token()
+
+        missing = set(self.check_missing(jwt, unknown_hashes)) if unknown_hashes else set()
+        self.blob_store.mark_present(self.blob_scope, set(unknown_hashes) - missing)
+        self.metrics.count("assets_known", len(all_hashes) - len(unknown_hashes))
+        self.metrics.count("assets_checked", len(unknown_hashes))
+        self.metrics.count("assets_missing", len(missing))
+
+        if missing:
+            print(f"📤 Uploading {len(missing)} of {len(all_hashes)} asset(s)...")
+            # Several paths may share one hash; upload each hash once
+            to_upload = {}
+            for file in files:
+                file_hash = manifest[file.path]
+                if file_hash in missing and file_hash not in to_upload:
+                    to_upload[file_hash] = file
+            self.upload_assets(jwt, list(to_upload.values()), manifest)
+            print("✅ Files uploaded successfully")
+        else:
+            print("✅ All assets already present, nothing to upload")
+
+        self.upsert_hashes(jwt, all_hashes)
+
+        deployment_id = self.create_deployment(manifest)
+        self.save_manifest_cache(manifest, deployment_id)
+        self.listings.put(deployment_id, manifest, self.headers)
+
+        # Construct deployment URL
+        deployment_url = f"https://{self.project_name}.pages.dev"
+
+        return deployment_url, deployment_id
+
+    @phase("diff")
+    def get_live_deployment(self) -> Optional[str]:
+        """ID of the newest deployment on this branch that did not fail, following pagination"""
+        url = f"{API_BASE}/accounts/{self.account_id}/pages/projects/{self.project_name}/deployments"
+
+        for page in range(1, MAX_DEPLOYMENT_PAGES + 1):
+            response = self.session.get(url, params={"page": page, "per_page": DEPLOYMENTS_PAGE_SIZE})
+            if response.status_code == 404:
+                return None
+            if not response.ok:
+                raise Exception(f"Failed to list deployments: {response.text}")
+
+            data = response.json()
+            for deployment in data.get("result") or []:
+                branch = deployment.get("deployment_trigger", {}).get("metadata", {}).get("branch")
+                status = deployment.get("latest_stage", {}).get("status")
+                if branch == self.branch and status not in ("failure", "canceled"):
+                    return deployment.get("id")
+
+            if page >= data.get("result_info", {}).get("total_pages", page):
+                break
+        return None
+
+    @phase("diff")
+    def plan_deploy(self, files: List[DeployFile], manifest: Dict[str, str]) -> DeployPlan:
+        """Compare the local manifest with the branch's live deployment"""
+        base = self.get_live_deployment()
+        listing = self.listings.get(base) if base else None
+        remote = listing["files"] if listing else None
+        config_changed = bool(listing) and listing["config"] != self.headers
+        return plan_changes("cloudflare", self.branch, base, files, manifest, remote, config_changed)
+
+    def report_plan(self, plan: DeployPlan) -> None:
+        """Print the plan, record its totals and write it as JSON if asked to"""
+        plan.print_summary(list_paths=self.dry_run)
+        for category in ("added", "changed", "deleted"):
+            self.metrics.count(f"plan_{category}", len(getattr(plan, category)))
+        self.metrics.count("plan_upload_bytes", plan.total_bytes(plan.added + plan.changed))
+        if self.plan_json:
+            plan.write_json(self.plan_json)
+
+    @phase("deploy")
+    def deploy(self, files: Optional[List[DeployFile]] = None) -> str:
+        """Main deployment workflow
+
+        Pass files to deploy a list that was already scanned instead of reading the directory.
+        """
         print("\n☁️  Cloudflare Pages Deployment Tool (Python)\n")
 
-        # Step 1: Check/create project
-        project_exists = self.check_project_exists()
-        if not project_exists:
-            created = self.create_project()
-            if not created:
-                raise Exception("Failed to create project")
+        # Step 1: Check/create the project in the background while files are read and hashed
+        preflight = None if self.dry_run else start_background(self.preflight)
 
-        # Step 2: Read files
-        files = self.read_files()
+        # Step 2: Read and hash files
+        files = self.read_files() if files is None else self.select_files(files)
         if not files:
             raise Exception("No files found to deploy")
+        if self.optimize:
+            files = self.optimize_files(files)
+        if self.fingerprint:
+            files = self.fingerprint_files(files)
+        files = self.take_headers_file(files)
+        self.metrics.count("files", len(files))
+        # A dry run needs the hashes to plan even with --full-upload
+        manifest = None if self.full_upload and not self.dry_run else self.hash_files(files)
+        deployment_url = f"https://{self.project_name}.pages.dev"
 
-        # Step 3: Deploy
-        deployment_url, deployment_id = self.deploy_files(files)
+        if self.dry_run:
+            plan = self.plan_deploy(files, manifest)
+            self.report_plan(plan)
+            return deployment_url, plan.base
+
+        preflight.result()
+
+        # Step 3: Deploy, picking up an interrupted deploy of the same directory if asked to
+        resumed = self.journal.open(self.deploy_dir, self.resume)
+        if not self.full_upload and not resumed:
+            # Skip the deploy if the live deployment already matches
+            plan = self.plan_deploy(files, manifest)
+            self.report_plan(plan)
+            if plan.no_op:
+                self.journal.clear()
+                self.preflight_cache.remember(self.preflight_key)
+                print("✅ Live deployment already matches, nothing to deploy")
+                return deployment_url, plan.base
+        deployment_url, deployment_id = self.deploy_files(files, manifest)
+        self.journal.clear()
+        self.preflight_cache.remember(self.preflight_key)
 
         return deployment_url, deployment_id
 
 
-def get_config() -> Tuple[str, str, str, str, str]:
+def get_config() -> argparse.Namespace:
     """Get configuration from CLI args or environment variables"""
     parser = argparse.ArgumentParser(
         description="Deploy static website to Cloudflare Pages using REST API"
@@ -206,45 +631,127 @@ def get_config() -> Tuple[str, str, str, str, str]:
     parser.add_argument("--project", help="Cloudflare Pages project name")
     parser.add_argument("--dir", default="./out", help="Directory to deploy (default: ./out)")
     parser.add_argument("--branch", default="main", help="Deployment branch (default: main)")
+    parser.add_argument("--full-upload", action="store_true",
+                        help="Send every file in one manifest instead of only missing assets")
+    parser.add_argument("--jobs", type=int, help=f"Concurrent upload requests (default: {DEFAULT_JOBS})")
+    parser.add_argument("--scan-workers", type=int,
+                        help=f"Parallel workers for scanning and hashing (default: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument("--scan-threads", action="store_true",
+                        help="Hash on threads instead of processes (for I/O-bound trees such as network mounts)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip matching files or directories (repeatable; also read from .cfignore)")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="Also deploy .git, node_modules, source maps and editor temp files")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted deploy of the same directory from its last checkpoint")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Minify HTML, CSS and JavaScript before upload")
+    parser.add_argument("--strip-html-comments", action="store_true",
+                        help="With --optimize, also remove HTML comments (breaks React and Vue hydration markers)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Serve content-hashed copies of referenced assets as immutable")
+    parser.add_argument("--fingerprint-scripts", action="store_true",
+                        help="With --fingerprint, also fingerprint classic scripts (not for webpack publicPath 'auto')")
+    parser.add_argument("--headers", metavar="FILE",
+                        help="JSON list of {\"glob\", \"headers\"} rules replacing the default cache policy")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print what would be added, changed and deleted without deploying")
+    parser.add_argument("--plan-json", metavar="FILE", help="Write the deploy plan to this file as JSON")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and redeploy whenever files change (e.g. to a preview target)")
+    parser.add_argument("--debounce", type=float, metavar="SECONDS",
+                        help=f"With --watch, wait until files stop changing (default: {DEFAULT_DEBOUNCE_SECONDS}s)")
+    parser.add_argument("--metrics-json", help="Write phase timings, request latencies and counters to this file")
+    parser.add_argument("--trace", help="Write a Chrome trace-event file of the deploy phases")
 
     args = parser.parse_args()
 
-    account_id = args.account or os.getenv("CLOUDFLARE_ACCOUNT_ID")
-    api_token = args.token or os.getenv("CLOUDFLARE_API_TOKEN")
-    project_name = args.project or os.getenv("CLOUDFLARE_PROJECT_NAME")
-    deploy_dir = args.dir or os.getenv("DEPLOY_DIR", "./out")
-    branch = args.branch or os.getenv("DEPLOY_BRANCH", "main")
-
-    return account_id, api_token, project_name, deploy_dir, branch
+    return argparse.Namespace(
+        account_id=args.account or os.getenv("CLOUDFLARE_ACCOUNT_ID"),
+        api_token=args.token or os.getenv("CLOUDFLARE_API_TOKEN"),
+        project_name=args.project or os.getenv("CLOUDFLARE_PROJECT_NAME"),
+        deploy_dir=args.dir or os.getenv("DEPLOY_DIR", "./out"),
+        branch=args.branch or os.getenv("DEPLOY_BRANCH", "main"),
+        full_upload=args.full_upload or os.getenv("DEPLOY_FULL_UPLOAD") == "1",
+        jobs=args.jobs or int(os.getenv("DEPLOY_JOBS", DEFAULT_JOBS)),
+        scan_workers=args.scan_workers or int(os.getenv("DEPLOY_SCAN_WORKERS", DEFAULT_SCAN_WORKERS)),
+        scan_processes=not (args.scan_threads or os.getenv("DEPLOY_SCAN_THREADS") == "1"),
+        exclude=args.exclude + [glob for glob in os.getenv("DEPLOY_EXCLUDE", "").split(",") if glob],
+        default_excludes=not args.no_default_excludes,
+        resume=args.resume or os.getenv("DEPLOY_RESUME") == "1",
+        optimize=args.optimize or os.getenv("DEPLOY_OPTIMIZE") == "1",
+        strip_html_comments=args.strip_html_comments or os.getenv("DEPLOY_STRIP_HTML_COMMENTS") == "1",
+        fingerprint=args.fingerprint or os.getenv("DEPLOY_FINGERPRINT") == "1",
+        fingerprint_scripts=args.fingerprint_scripts or os.getenv("DEPLOY_FINGERPRINT_SCRIPTS") == "1",
+        headers_file=args.headers or os.getenv("DEPLOY_HEADERS"),
+        dry_run=args.dry_run or os.getenv("DEPLOY_DRY_RUN") == "1",
+        plan_json=args.plan_json or os.getenv("DEPLOY_PLAN_JSON"),
+        watch=args.watch or os.getenv("DEPLOY_WATCH") == "1",
+        debounce=args.debounce if args.debounce is not None else float(
+            os.getenv("DEPLOY_WATCH_DEBOUNCE", DEFAULT_DEBOUNCE_SECONDS)
+        ),
+        metrics_json=args.metrics_json or os.getenv("DEPLOY_METRICS_JSON"),
+        trace=args.trace or os.getenv("DEPLOY_TRACE"),
+    )
 
 
 def main():
     """Main entry point"""
+    deployer = None
     try:
-        account_id, api_token, project_name, deploy_dir, branch = get_config()
+        config = get_config()
 
         # Validate configuration
-        if not account_id:
+        if not config.account_id:
             print("❌ Error: Cloudflare Account ID is required")
             print("Provide via --account=xxx or CLOUDFLARE_ACCOUNT_ID env var")
             print("\nFind your Account ID at: https://dash.cloudflare.com/")
             sys.exit(1)
 
-        if not api_token:
+        if not config.api_token:
             print("❌ Error: Cloudflare API token is required")
             print("Provide via --token=xxx or CLOUDFLARE_API_TOKEN env var")
             print("\nCreate a token at: https://dash.cloudflare.com/profile/api-tokens")
             print("Required permission: Account → Cloudflare Pages → Edit")
             sys.exit(1)
 
-        if not project_name:
+        if not config.project_name:
             print("❌ Error: Project name is required")
             print("Provide via --project=my-site or CLOUDFLARE_PROJECT_NAME env var")
             sys.exit(1)
 
         # Create deployer and deploy
-        deployer = CloudflareDeployer(account_id, api_token, project_name, deploy_dir, branch)
-        deployment_url, deployment_id = deployer.deploy()
+        deployer = CloudflareDeployer(
+            config.account_id, config.api_token, config.project_name, config.deploy_dir, config.branch,
+            full_upload=config.full_upload, jobs=config.jobs,
+            scan_workers=config.scan_workers, scan_processes=config.scan_processes,
+            exclude=config.exclude, default_excludes=config.default_excludes, resume=config.resume,
+            optimize=config.optimize, strip_html_comments=config.strip_html_comments,
+            fingerprint=config.fingerprint, fingerprint_scripts=config.fingerprint_scripts,
+            headers_file=config.headers_file,
+            dry_run=config.dry_run, plan_json=config.plan_json,
+        )
+        try:
+            if config.watch and not config.dry_run:
+                deployments = []
+
+                def deploy_changes(files):
+                    deployments.append(deployer.deploy(files))
+                    return deployments[-1][0]
+
+                watcher = DirectoryWatcher(deployer.deploy_dir, deployer.ignore_rules, config.scan_workers,
+                                           config.debounce)
+                watch_and_deploy(deploy_changes, watcher)
+                deployment_url, deployment_id = deployments[-1]
+            else:
+                deployment_url, deployment_id = deployer.deploy()
+        finally:
+            deployer.metrics.write(config.metrics_json, config.trace, provider="cloudflare",
+                                   project=config.project_name, branch=config.branch)
+
+        if config.dry_run:
+            print("\n📋 Dry run, nothing was deployed\n")
+            return
 
         # Success!
         print("\n🎉 Deployment successful!")
@@ -253,6 +760,8 @@ def main():
 
     except Exception as e:
         print(f"\n❌ Deployment failed: {e}")
+        if deployer is not None and deployer.journal.exists():
+            print("💡 Run again with --resume to continue from the last confirmed upload")
         sys.exit(1)
 
 
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+
+"""
+Batch Deployment Script
+
+Deploys many sites from one process instead of starting one deploy script per
+site. Sites deployed with the same credentials share an HTTP session (and its
+kept-alive connections), hashing runs on one shared process pool, and the
+on-disk hash and compression caches are used exactly as by the single-site
+scripts.
+
+Requirements:
+- Python 3.7+
+- requests library (pip install requests)
+- firebase-deploy-standalone.py and cloudflare-deploy.py next to this script
+
+Usage:
+    python3 deploy-batch.py sites.json --report=results.json
+    python3 deploy-batch.py sites.csv --max-sites=8 --per-account=2 --log-dir=./deploy-logs
+
+Job list (a JSON array of objects, or a CSV file with a header row):
+    provider - firebase or cloudflare
+    project  - Firebase project ID or Cloudflare Pages project name
+    dir      - Directory containing files to deploy
+    channel  - Firebase channel (default: live)
+    branch   - Cloudflare deployment branch (default: main)
+    account  - Cloudflare Account ID (default: CLOUDFLARE_ACCOUNT_ID)
+    token    - Access token (default: FIREBASE_ACCESS_TOKEN or CLOUDFLARE_API_TOKEN)
+
+Sites run concurrently up to --max-sites, at most --per-provider per provider
+and --per-account per Cloudflare account or Firebase access token. Each site's
+output goes to its own log; the summary and the optional JSON report list the
+outcome of every site, and the report includes each site's deploy metrics.
+The exit status is 1 if any site failed.
+"""
+
+import os
+import sys
+import argparse
+import contextlib
+import contextvars
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import requests
+except ImportError:
+    print("❌ Error: requests library is required")
+    print("Install it with: pip install requests")
+    sys.exit(1)
+
+from deploy_common import (
+    DEFAULT_JOBS, DEFAULT_SCAN_WORKERS, JobOutput, create_session, load_script, set_process_pool
+)
+from deploy_compress import DEFAULT_GZIP_LEVEL
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROVIDERS = ("firebase", "cloudflare")
+DEFAULT_MAX_SITES = 4
+DEFAULT_PER_ACCOUNT = 2
+
+
+@dataclass
+class BatchJob:
+    """One site to deploy"""
+    provider: str
+    project: str
+    deploy_dir: str
+    channel: str = "live"
+    branch: str = "main"
+    account: str = ""
+    token: str = ""
+
+    @property
+    def label(self) -> str:
+        target = self.channel if self.provider == "firebase" else self.branch
+        return f"{self.provider}:{self.project}/{target}"
+
+    @property
+    def account_key(self) -> str:
+        """What provider rate limits are counted against"""
+        if self.provider == "cloudflare":
+            return f"cloudflare:{self.account}"
+        return f"firebase:{hashlib.sha256(self.token.encode('utf-8')).hexdigest()[:16]}"
+
+
+def load_jobs(path: str) -> List[BatchJob]:
+    """Read the job list from a JSON or CSV file, filling credentials from the environment"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get("jobs", [])
+
+    return [job_from_row(row, f"Job {number}") for number, row in enumerate(rows, 1)]
+
+
+def job_from_row(row: dict, name: str = "Job") -> BatchJob:
+    """Validate one job-list entry, filling credentials from the environment"""
+    row = {key: str(value or "").strip() for key, value in row.items() if key}
+    provider = row.get("provider", "").lower()
+    if provider not in PROVIDERS:
+        raise Exception(f"{name}: provider must be one of {', '.join(PROVIDERS)}")
+    if not row.get("project") or not row.get("dir"):
+        raise Exception(f"{name}: project and dir are required")
+
+    if provider == "firebase":
+        token = row.get("token") or os.getenv("FIREBASE_ACCESS_TOKEN", "")
+        account = ""
+    else:
+        token = row.get("token") or os.getenv("CLOUDFLARE_API_TOKEN", "")
+        account = row.get("account") or os.getenv("CLOUDFLARE_ACCOUNT_ID", "")
+        if not account:
+            raise Exception(f"{name}: Cloudflare Account ID is required")
+    if not token:
+        raise Exception(f"{name}: no token for {provider}")
+
+    return BatchJob(
+        provider=provider,
+        project=row["project"],
+        deploy_dir=row["dir"],
+        channel=row.get("channel") or "live",
+        branch=row.get("branch") or "main",
+        account=account,
+        token=token,
+    )
+
+
+class BatchDeployer:
+    """Run deploy jobs under per-provider and per-account concurrency limits"""
+
+    def __init__(self, jobs: List[BatchJob], max_sites: int = DEFAULT_MAX_SITES,
+                 per_provider: Optional[int] = None, per_account: int = DEFAULT_PER_ACCOUNT,
+                 log_dir: Optional[str] = None, deploy_options: Optional[dict] = None,
+                 firebase_options: Optional[dict] = None):
+        self.jobs = jobs
+        self.max_sites = max_sites
+        self.per_provider = per_provider or max_sites
+        self.per_account = per_account
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.deploy_options = deploy_options or {}
+        self.firebase_options = firebase_options or {}
+        self.modules = {
+            "firebase": load_script(SCRIPTS_DIR / "firebase-deploy-standalone.py"),
+            "cloudflare": load_script(SCRIPTS_DIR / "cloudflare-deploy.py"),
+        }
+        self.lock = threading.Lock()
+        self.provider_slots = {provider: threading.BoundedSemaphore(self.per_provider) for provider in PROVIDERS}
+        self.account_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self.sessions: Dict[str, requests.Session] = {}
+
+    def account_slot(self, job: BatchJob) -> threading.BoundedSemaphore:
+        with self.lock:
+            if job.account_key not in self.account_slots:
+                self.account_slots[job.account_key] = threading.BoundedSemaphore(self.per_account)
+            return self.account_slots[job.account_key]
+
+    def session_for(self, job: BatchJob) -> requests.Session:
+        """One session per provider credential, sized for every site that may use it at once"""
+        key = f"{job.provider}:{job.token}"
+        with self.lock:
+            if key not in self.sessions:
+                jobs = self.deploy_options.get("jobs", DEFAULT_JOBS)
+                self.sessions[key] = create_session(jobs * self.per_account)
+            return self.sessions[key]
+
+    def deployer_options(self, job: BatchJob) -> dict:
+        """Keyword arguments for job's deployer"""
+        return dict(self.deploy_options, session=self.session_for(job))
+
+    def make_deployer(self, job: BatchJob):
+        options = self.deployer_options(job)
+        if job.provider == "firebase":
+            return self.modules["firebase"].FirebaseDeployer(
+                job.project, job.token, job.deploy_dir, job.channel, **options, **self.firebase_options
+            )
+        return self.modules["cloudflare"].CloudflareDeployer(
+            job.account, job.token, job.project, job.deploy_dir, job.branch, **options
+        )
+
+    def run_job(self, job: BatchJob, output: JobOutput, log: Optional[io.StringIO] = None) -> dict:
+        """Deploy one job, capturing its output in log, and return its result"""
+        result = {
+            "provider": job.provider,
+            "project": job.project,
+            "target": job.channel if job.provider == "firebase" else job.branch,
+            "dir": job.deploy_dir,
+        }
+        log = io.StringIO() if log is None else log
+
+        with self.provider_slots[job.provider], self.account_slot(job):
+            print(f"🚀 {job.label} started")
+            start = time.perf_counter()
+            token = output.current.set(log)
+            deployer = None
+            try:
+                deployer = self.make_deployer(job)
+                deployed = deployer.deploy()
+                if job.provider == "firebase":
+                    result.update(status="ok", url=deployed)
+                else:
+                    result.update(status="ok", url=deployed[0], deployment_id=deployed[1])
+            except Exception as e:
+                print(f"\n❌ Deployment failed: {e}")
+                result.update(status="failed", error=str(e))
+            finally:
+                output.current.reset(token)
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            if deployer is not None:
+                result["metrics"] = deployer.metrics.summary()
+                # Every deployer opens its own blob-store connection; a daemon would leak one per job
+                deployer.blob_store.close()
+
+        if self.log_dir:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            log_path = self.log_dir / f"{job.label.replace(':', '-').replace('/', '-')}.log"
+            log_path.write_text(log.getvalue(), encoding="utf-8")
+            result["log"] = str(log_path)
+
+        if result["status"] == "ok":
+            print(f"✅ {job.label} deployed in {result['seconds']:.1f}s: {result['url']}")
+        else:
+            print(f"❌ {job.label} failed after {result['seconds']:.1f}s: {result['error']}")
+            if not self.log_dir:
+                print("".join(f"   {line}\n" for line in log.getvalue().strip().splitlines()[-10:]), end="")
+        return result
+
+    @contextlib.contextmanager
+    def running(self) -> Iterator[JobOutput]:
+        """Shared scan process pool and per-job output capture, torn down on exit"""
+        output = JobOutput(sys.stdout)
+        scan_pool = None
+        if self.deploy_options.get("scan_processes", True):
+            # Workers start on first use, from a job thread; forking a multithreaded process can copy held locks
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            scan_pool = ProcessPoolExecutor(
+                max_workers=self.deploy_options.get("scan_workers", DEFAULT_SCAN_WORKERS),
+                mp_context=multiprocessing.get_context(start_method),
+            )
+            set_process_pool(scan_pool)
+
+        sys.stdout = output
+        try:
+            yield output
+        finally:
+            sys.stdout = output.stream
+            if scan_pool is not None:
+                set_process_pool(None)
+                scan_pool.shutdown()
+            for session in self.sessions.values():
+                session.close()
+
+    def run(self) -> List[dict]:
+        """Deploy every job and return one result per job, in job-list order"""
+        print(f"\n📚 Deploying {len(self.jobs)} site(s), up to {self.max_sites} at a time\n")
+
+        with self.running() as output, ThreadPoolExecutor(max_workers=self.max_sites) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.run_job, job, output)
+                for job in self.jobs
+            ]
+            return [future.result() for future in futures]
+
+
+def get_config() -> argparse.Namespace:
+    """Get configuration from CLI args or environment variables"""
+    parser = argparse.ArgumentParser(
+        description="Deploy many static sites to Firebase Hosting and Cloudflare Pages in one run"
+    )
+    parser.add_argument("jobs_file", help="JSON or CSV list of sites to deploy")
+    parser.add_argument("--report", help="Write per-site results as JSON to this file")
+    add_batch_arguments(parser)
+
+    args = parser.parse_args()
+
+    return argparse.Namespace(
+        jobs_file=args.jobs_file,
+        report=args.report or os.getenv("DEPLOY_REPORT"),
+        **batch_options(args),
+    )
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser) -> None:
+    """Concurrency and deploy options shared with the deploy daemon"""
+    parser.add_argument("--log-dir", help="Write each site's output to its own file in this directory")
+    parser.add_argument("--max-sites", type=int,
+                        help=f"Sites deployed at the same time (default: {DEFAULT_MAX_SITES})")
+    parser.add_argument("--per-provider", type=int, help="Sites deployed at the same time per provider")
+    parser.add_argument("--per-account", type=int,
+                        help=f"Sites deployed at the same time per account or token (default: {DEFAULT_PER_ACCOUNT})")
+    parser.add_argument("--full-upload", action="store_true",
+                        help="Send every file inline instead of only missing content")
+    parser.add_argument("--jobs", type=int, help=f"Concurrent upload requests per site (default: {DEFAULT_JOBS})")
+    parser.add_argument("--scan-workers", type=int,
+                        help=f"Parallel workers for scanning and hashing (default: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument("--scan-threads", action="store_true",
+                        help="Hash on threads instead of processes (for I/O-bound trees such as network mounts)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip matching files or directories in every site (repeatable)")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="Also deploy .git, node_modules, source maps and editor temp files")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Minify HTML, CSS and JavaScript before upload")
+    parser.add_argument("--strip-html-comments", action="store_true",
+                        help="With --optimize, also remove HTML comments (breaks React and Vue hydration markers)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Serve content-hashed copies of referenced assets as immutable")
+    parser.add_argument("--fingerprint-scripts", action="store_true",
+                        help="With --fingerprint, also fingerprint classic scripts (not for webpack publicPath 'auto')")
+    parser.add_argument("--headers", metavar="FILE",
+                        help="JSON list of {\"glob\", \"headers\"} rules replacing the default cache policy")
+    parser.add_argument("--clone", action="store_true",
+                        help="Firebase: clone the released version and upload only what changed")
+    parser.add_argument("--compression-level", type=int,
+                        help=f"Firebase: gzip level for uploaded files (default: {DEFAULT_GZIP_LEVEL})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue interrupted deploys of the same directories from their last checkpoint")
+
+
+def batch_options(args: argparse.Namespace) -> dict:
+    """BatchDeployer keyword arguments from options added by add_batch_arguments"""
+    return dict(
+        log_dir=args.log_dir or os.getenv("DEPLOY_LOG_DIR"),
+        max_sites=args.max_sites or int(os.getenv("DEPLOY_MAX_SITES", DEFAULT_MAX_SITES)),
+        per_provider=args.per_provider or int(os.getenv("DEPLOY_PER_PROVIDER", 0)) or None,
+        per_account=args.per_account or int(os.getenv("DEPLOY_PER_ACCOUNT", DEFAULT_PER_ACCOUNT)),
+        deploy_options={
+            "full_upload": args.full_upload or os.getenv("DEPLOY_FULL_UPLOAD") == "1",
+            "jobs": args.jobs or int(os.getenv("DEPLOY_JOBS", DEFAULT_JOBS)),
+            "scan_workers": args.scan_workers or int(os.getenv("DEPLOY_SCAN_WORKERS", DEFAULT_SCAN_WORKERS)),
+            "scan_processes": not (args.scan_threads or os.getenv("DEPLOY_SCAN_THREADS") == "1"),
+            "exclude": args.exclude + [glob for glob in os.getenv("DEPLOY_EXCLUDE", "").split(",") if glob],
+            "default_excludes": not args.no_default_excludes,
+            "resume": args.resume or os.getenv("DEPLOY_RESUME") == "1",
+            "optimize": args.optimize or os.getenv("DEPLOY_OPTIMIZE") == "1",
+            "strip_html_comments": args.strip_html_comments or os.getenv("DEPLOY_STRIP_HTML_COMMENTS") == "1",
+            "fingerprint": args.fingerprint or os.getenv("DEPLOY_FINGERPRINT") == "1",
+            "fingerprint_scripts": args.fingerprint_scripts or os.getenv("DEPLOY_FINGERPRINT_SCRIPTS") == "1",
+            "headers_file": args.headers or os.getenv("DEPLOY_HEADERS"),
+        },
+        firebase_options={
+            "clone": args.clone or os.getenv("DEPLOY_CLONE") == "1",
+            "compression_level": args.compression_level or int(
+                os.getenv("DEPLOY_COMPRESSION_LEVEL", DEFAULT_GZIP_LEVEL)
+            ),
+        },
+    )
+
+
+def main():
+    """Main entry point"""
+    try:
+        config = get_config()
+        jobs = load_jobs(config.jobs_file)
+        if not jobs:
+            print("❌ Error: The job list is empty")
+            sys.exit(1)
+
+        batch = BatchDeployer(
+            jobs, max_sites=config.max_sites, per_provider=config.per_provider, per_account=config.per_account,
+            log_dir=config.log_dir, deploy_options=config.deploy_options, firebase_options=config.firebase_options,
+        )
+        results = batch.run()
+
+        if config.report:
+            with open(config.report, "w", encoding="utf-8") as f:
+                json.dump({"sites": results}, f, indent=2)
+            print(f"\n📋 Report written to {config.report}")
+
+        failed = [result for result in results if result["status"] != "ok"]
+        print(f"\n🎉 {len(results) - len(failed)} of {len(results)} site(s) deployed")
+        if failed:
+            print(f"❌ {len(failed)} site(s) failed")
+            sys.exit(1)
+
+    except Exception as e:
+        print(f"\n❌ Batch deployment failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
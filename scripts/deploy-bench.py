@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+"""
+Deployment Benchmark Script
+
+Runs FirebaseDeployer.deploy and CloudflareDeployer.deploy against a local
+stand-in for both APIs (deploy_fakeapi.py) over synthetic trees of mixed text
+and binary files, and reports wall time, peak RSS, bytes sent and request
+counts per deploy phase. Nothing leaves the machine and no credentials are
+needed.
+
+Requirements:
+- Python 3.7+ on Linux or macOS (for peak RSS)
+- requests library (pip install requests)
+- firebase-deploy-standalone.py and cloudflare-deploy.py next to this script
+
+Usage:
+    python3 deploy-bench.py --files=100,1000,10000 --latency-ms=20 --bandwidth-mbps=100
+
+Every provider and tree size is deployed twice: "cold" starts from an empty
+cache against an empty server, "warm" deploys the same tree again so only
+the incremental paths run. Each deploy runs in its own process so peak RSS
+is not inflated by earlier runs. Generated trees are kept in --work-dir and
+reused by later runs with the same size and seed.
+"""
+
+import os
+import sys
+import argparse
+import contextvars
+import functools
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+from deploy_common import DEFAULT_JOBS, DEFAULT_SCAN_WORKERS, load_script
+from deploy_fakeapi import STATS_PATH, FakeDeployAPI
+from deploy_metrics import peak_rss_mb
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROVIDERS = ("firebase", "cloudflare")
+SCENARIOS = ("cold", "warm")
+FILES_PER_DIRECTORY = 100
+TEXT_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg")
+BINARY_EXTENSIONS = (".png", ".jpg", ".woff2")
+
+# Deployer method -> phase it is billed to. Time spent in a nested wrapped
+# method is billed to the inner phase only.
+PHASES = {
+    "firebase": {
+        "check_project_exists": "preflight",
+        "check_hosting_initialized": "preflight",
+        "read_files": "scan",
+        "get_released_version": "delta",
+        "plan_deploy": "delta",
+        "deploy_delta": "delta",
+        "create_hosting_version": "version",
+        "compress_files": "hash",
+        "upload_files": "upload",
+        "finalize_version": "finalize",
+        "create_release": "release",
+    },
+    "cloudflare": {
+        "check_project_exists": "preflight",
+        "create_project": "preflight",
+        "read_files": "scan",
+        "hash_files": "hash",
+        "plan_deploy": "delta",
+        "check_missing": "check",
+        "deploy_files": "upload",
+        "create_deployment": "release",
+    },
+}
+
+
+def generate_tree(root: Path, count: int, seed: int, binary_fraction: float = 0.25) -> None:
+    """Write count files of site-like text and incompressible binary under root"""
+    rng = random.Random(seed)
+    words = [b"static", b"site", b"deploy", b"hosting", b"<div>", b"</div>", b"class", b"function",
+             b"return", b"const", b"color:", b"margin", b"{", b"}", b"\n"]
+    text_pool = b" ".join(rng.choice(words) for _ in range(400_000))
+    binary_pool = bytes(rng.getrandbits(8) for _ in range(4 * 1024 * 1024))
+
+    for index in range(count):
+        directory = root / f"d{index // FILES_PER_DIRECTORY:04d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        if rng.random() < binary_fraction:
+            pool, extension = binary_pool, rng.choice(BINARY_EXTENSIONS)
+            size = min(int(rng.lognormvariate(9.5, 1.0)), 2 * 1024 * 1024)
+        else:
+            pool, extension = text_pool, rng.choice(TEXT_EXTENSIONS)
+            size = min(int(rng.lognormvariate(8.0, 1.2)), 512 * 1024)
+        offset = rng.randrange(len(pool) - size)
+        # The index prefix keeps every file's content (and hash) unique
+        content = f"{index}\n".encode() + pool[offset:offset + size]
+        (directory / f"f{index}{extension}").write_bytes(content)
+
+
+def ensure_tree(work_dir: Path, count: int, seed: int) -> Path:
+    """Generated tree for count files, reused if an earlier run already wrote it"""
+    root = work_dir / "trees" / f"{count}-{seed}"
+    marker = root.with_suffix(".done")
+    if not marker.exists():
+        shutil.rmtree(root, ignore_errors=True)
+        print(f"🌱 Generating {count} files in {root}")
+        generate_tree(root, count, seed)
+        marker.touch()
+    return root
+
+
+# Open phases of the current context, innermost last. The deploy scripts copy
+# their context into worker and background threads, so a phase's work on other
+# threads is billed to it, and a background phase never nests into the
+# phases the main thread opens meanwhile.
+_open_phases: contextvars.ContextVar = contextvars.ContextVar("bench_phases", default=())
+
+
+class PhaseRecorder:
+    """Exclusive wall time, requests and bytes sent per deploy phase
+
+    Requests and bytes are counted on the client, through the deployer's
+    DeployMetrics, and billed to the innermost phase open where they were made.
+    """
+
+    def __init__(self, metrics):
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.Lock()
+
+        observe_request, count_stream = metrics.observe_request, metrics.count_stream
+
+        def observed(method: str, seconds: float, sent_bytes: int) -> None:
+            observe_request(method, seconds, sent_bytes)
+            self.bill(1, sent_bytes)
+
+        def counted(chunks):
+            for chunk in count_stream(chunks):
+                self.bill(0, len(chunk))
+                yield chunk
+
+        metrics.observe_request = observed
+        metrics.count_stream = counted
+
+    def bill(self, request_count: int, sent_bytes: int) -> None:
+        stack = _open_phases.get()
+        if stack:
+            with self.lock:
+                stack[-1]["requests"] += request_count
+                stack[-1]["bytes"] += sent_bytes
+
+    def wrap(self, deployer, method_name: str, phase: str) -> None:
+        method = getattr(deployer, method_name)
+
+        @functools.wraps(method)
+        def recorded(*args, **kwargs):
+            stack = _open_phases.get()
+            frame = {"thread": threading.get_ident(), "nested": 0.0, "requests": 0, "bytes": 0}
+            token = _open_phases.set(stack + (frame,))
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                _open_phases.reset(token)
+                with self.lock:
+                    entry = self.phases.setdefault(phase, {"seconds": 0.0, "requests": 0, "bytes": 0})
+                    entry["seconds"] += seconds - frame["nested"]
+                    entry["requests"] += frame["requests"]
+                    entry["bytes"] += frame["bytes"]
+                    entry["peak_rss_mb"] = peak_rss_mb()
+                    # Only the caller's own thread waits for the nested call
+                    if stack and stack[-1]["thread"] == frame["thread"]:
+                        stack[-1]["nested"] += seconds
+
+        setattr(deployer, method_name, recorded)
+
+
+def server_stats(stats_url: str) -> List[float]:
+    """[time, requests, bytes] as counted by the fake API"""
+    with urllib.request.urlopen(stats_url) as response:
+        stats = json.load(response)
+    return [time.perf_counter(), stats["requests"], stats["bytes"]]
+
+
+def run_one(config: argparse.Namespace) -> None:
+    """Child process: deploy config.tree once and write measurements to config.result"""
+    api_base = os.environ["FIREBASE_API_BASE"].split("/firebase/")[0]
+    stats_url = api_base + STATS_PATH
+    options = dict(full_upload=config.full_upload, jobs=config.jobs, scan_workers=config.scan_workers)
+
+    if config.run_one == "firebase":
+        module = load_script(SCRIPTS_DIR / "firebase-deploy-standalone.py")
+        deployer = module.FirebaseDeployer("bench-project", "bench-token", config.tree, clone=config.clone, **options)
+    else:
+        module = load_script(SCRIPTS_DIR / "cloudflare-deploy.py")
+        deployer = module.CloudflareDeployer("bench-account", "bench-token", "bench-project", config.tree, **options)
+
+    recorder = PhaseRecorder(deployer.metrics)
+    for method_name, phase in PHASES[config.run_one].items():
+        recorder.wrap(deployer, method_name, phase)
+
+    start = server_stats(stats_url)
+    deployer.deploy()
+    end = server_stats(stats_url)
+
+    result = {
+        "seconds": end[0] - start[0],
+        "requests": end[1] - start[1],
+        "bytes": end[2] - start[2],
+        "peak_rss_mb": peak_rss_mb(),
+        "phases": recorder.phases,
+    }
+    with open(config.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+class Benchmark:
+    """Drive child deploys against one FakeDeployAPI and collect their results"""
+
+    def __init__(self, config: argparse.Namespace):
+        self.config = config
+        self.work_dir = Path(config.work_dir)
+        self.api = FakeDeployAPI(config.latency_ms, config.bandwidth_mbps, config.error_rate, config.seed)
+
+    def child_args(self, provider: str, tree: Path, result: str) -> List[str]:
+        args = [sys.executable, str(Path(__file__).resolve()), f"--run-one={provider}", f"--tree={tree}",
+                f"--result={result}", f"--jobs={self.config.jobs}", f"--scan-workers={self.config.scan_workers}"]
+        if self.config.full_upload:
+            args.append("--full-upload")
+        if self.config.clone:
+            args.append("--clone")
+        return args
+
+    def run_deploy(self, provider: str, count: int, scenario: str, tree: Path, cache_dir: Path) -> dict:
+        env = dict(os.environ, DEPLOY_CACHE_DIR=str(cache_dir), **self.api.environment())
+        log_path = self.work_dir / "logs" / f"{provider}-{count}-{scenario}.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as result_file:
+            result_path = result_file.name
+        try:
+            errors_before = self.api.stats()["errors"]
+            with open(log_path, "w", encoding="utf-8") as log:
+                completed = subprocess.run(self.child_args(provider, tree, result_path),
+                                           env=env, stdout=log, stderr=subprocess.STDOUT)
+            if completed.returncode != 0:
+                raise Exception(f"{provider} deploy of {count} files ({scenario}) failed, see {log_path}")
+            with open(result_path, encoding="utf-8") as f:
+                result = json.load(f)
+        finally:
+            os.remove(result_path)
+
+        result.update(provider=provider, files=count, scenario=scenario,
+                      injected_errors=self.api.stats()["errors"] - errors_before)
+        return result
+
+    def run(self) -> List[dict]:
+        self.api.start()
+        results = []
+        try:
+            for count in self.config.files:
+                tree = ensure_tree(self.work_dir, count, self.config.seed)
+                for provider in self.config.providers:
+                    self.api.reset()
+                    cache_dir = self.work_dir / "cache" / f"{provider}-{count}"
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                    for scenario in SCENARIOS:
+                        print(f"⏱️  {provider} {count} files ({scenario})...")
+                        result = self.run_deploy(provider, count, scenario, tree, cache_dir)
+                        print_result(result)
+                        results.append(result)
+        finally:
+            self.api.stop()
+        return results
+
+
+def print_result(result: dict) -> None:
+    print(f"   {result['seconds']:.2f}s, {result['requests']} requests, "
+          f"{result['bytes'] / 1024 / 1024:.1f} MB sent, peak RSS {result['peak_rss_mb']:.0f} MB"
+          + (f", {result['injected_errors']} injected errors" if result["injected_errors"] else ""))
+    for phase, entry in result["phases"].items():
+        print(f"     {phase:<10} {entry['seconds']:8.2f}s {entry['requests']:7d} req "
+              f"{entry['bytes'] / 1024 / 1024:9.1f} MB  rss {entry['peak_rss_mb']:.0f} MB")
+
+
+def get_config() -> argparse.Namespace:
+    """Get configuration from CLI args"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the deploy scripts against a local stand-in for the Firebase and Cloudflare APIs"
+    )
+    parser.add_argument("--files", default="100,1000,10000",
+                        help="Comma-separated tree sizes to benchmark (default: 100,1000,10000)")
+    parser.add_argument("--providers", default=",".join(PROVIDERS),
+                        help="Comma-separated providers to benchmark (default: firebase,cloudflare)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request (default: 0)")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0,
+                        help="Upload bandwidth per connection in Mbit/s (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 503 (default: 0)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for tree generation and error injection")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "deploy-bench"),
+                        help="Where generated trees, caches and deploy logs are kept")
+    parser.add_argument("--json", help="Write all results as JSON to this file")
+    parser.add_argument("--full-upload", action="store_true", help="Benchmark the inline upload mode")
+    parser.add_argument("--clone", action="store_true", help="Firebase: benchmark delta deploys")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Concurrent upload requests (default: {DEFAULT_JOBS})")
+    parser.add_argument("--scan-workers", type=int, default=DEFAULT_SCAN_WORKERS,
+                        help=f"Parallel workers for scanning and hashing (default: {DEFAULT_SCAN_WORKERS})")
+    # Used by the benchmark to run a single deploy in a child process
+    parser.add_argument("--run-one", choices=PROVIDERS, help=argparse.SUPPRESS)
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    args.files = [int(count) for count in args.files.split(",") if count]
+    args.providers = [provider for provider in args.providers.split(",") if provider]
+    for provider in args.providers:
+        if provider not in PROVIDERS:
+            parser.error(f"unknown provider {provider!r}")
+    return args
+
+
+def main():
+    """Main entry point"""
+    try:
+        config = get_config()
+        if config.run_one:
+            run_one(config)
+            return
+
+        results = Benchmark(config).run()
+
+        if config.json:
+            with open(config.json, "w", encoding="utf-8") as f:
+                json.dump({"results": results}, f, indent=2)
+            print(f"\n📋 Results written to {config.json}")
+
+    except Exception as e:
+        print(f"\n❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
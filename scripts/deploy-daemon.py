@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+"""
+Deploy Daemon
+
+Long-running deploy service. Every deploy script run pays for interpreter
+startup, importing requests, TLS handshakes and reading its caches from disk;
+the daemon pays once and keeps all of it warm between deploys: HTTP sessions
+and their kept-alive connections per credential, the hashing process pool
+and each directory's stat index. Jobs are accepted over a
+local HTTP endpoint (a Unix socket, or TCP with a shared secret) and queued
+under the same concurrency limits as deploy-batch.py.
+
+Requirements:
+- Python 3.7+
+- requests library (pip install requests)
+- deploy-batch.py, firebase-deploy-standalone.py and cloudflare-deploy.py next to this script
+
+Usage:
+    python3 deploy-daemon.py --socket=/run/sycord/deploy.sock --max-sites=8 --allow-dir=/srv/sites
+    DEPLOY_DAEMON_SECRET=... python3 deploy-daemon.py --port=8787 --per-account=2
+
+API (JSON):
+    POST /jobs        Queue a deploy. Body: the fields of a deploy-batch.py job
+                      (provider, project, dir, channel, branch, account, token).
+                      Returns 202 with the job's id and status.
+    GET  /jobs        Status of recent jobs
+    GET  /jobs/<id>   Status of one job: queued, running, ok or failed, with
+                      url, error, timings and metrics; ?log=1 adds its output
+    GET  /health      Queue and worker counts
+
+Example:
+    curl --unix-socket /run/sycord/deploy.sock http://localhost/jobs -H 'Content-Type: application/json' \\
+      -d '{"provider": "firebase", "project": "my-project", "dir": "./public"}'
+
+By default the daemon listens on a Unix socket in the cache directory,
+created with mode 600 so only its owner can connect. TCP is off unless a port
+is given, and then every request must carry "Authorization: Bearer <secret>"
+with the secret from DEPLOY_DAEMON_SECRET or --secret-file. POST bodies must
+be application/json, and a job's dir must lie inside one of the --allow-dir
+roots (default: the daemon's working directory). Tokens are never included
+in job status.
+"""
+
+import os
+import sys
+import argparse
+import contextvars
+import hmac
+import io
+import json
+import re
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from deploy_common import JobOutput, StatIndex, get_cache_dir, load_script
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+batch = load_script(SCRIPTS_DIR / "deploy-batch.py")
+
+DEFAULT_SOCKET_NAME = "deploy-daemon.sock"
+# Finished jobs kept for status polling; older ones are forgotten first
+MAX_FINISHED_JOBS = 1000
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class DaemonJob:
+    """A queued deploy and what is known about it so far"""
+
+    def __init__(self, job, job_id: str):
+        self.job = job
+        self.id = job_id
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.result: dict = {}
+        self.log = io.StringIO()
+
+    def describe(self, include_log: bool = False) -> dict:
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "provider": self.job.provider,
+            "project": self.job.project,
+            "target": self.job.channel if self.job.provider == "firebase" else self.job.branch,
+            "dir": self.job.deploy_dir,
+            "submitted_at": self.submitted_at,
+        }
+        if self.started_at is not None:
+            info["queued_seconds"] = round(self.started_at - self.submitted_at, 3)
+        info.update({key: value for key, value in self.result.items() if key not in info})
+        if include_log:
+            info["log"] = self.log.getvalue()
+        return info
+
+
+class DeployDaemon(batch.BatchDeployer):
+    """BatchDeployer that takes jobs from a queue and keeps per-site caches in memory between them"""
+
+    def __init__(self, roots: Sequence[str] = (), **options):
+        super().__init__([], **options)
+        self.roots: List[Path] = [Path(root).resolve() for root in roots or [os.getcwd()]]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_sites)
+        self.records: "OrderedDict[str, DaemonJob]" = OrderedDict()
+        self.stat_indexes: Dict[Path, StatIndex] = {}
+        self.output: Optional[JobOutput] = None
+
+    def deployer_options(self, job) -> dict:
+        options = super().deployer_options(job)
+        # Hand over the index earlier deploys of the same directory already loaded; only the first reads it from disk
+        deploy_dir = Path(job.deploy_dir).resolve()
+        with self.lock:
+            if deploy_dir not in self.stat_indexes:
+                self.stat_indexes[deploy_dir] = StatIndex.for_directory(deploy_dir)
+            options["stat_index"] = self.stat_indexes[deploy_dir]
+        return options
+
+    def submit(self, fields: dict) -> DaemonJob:
+        """Validate and queue one job"""
+        job = batch.job_from_row(fields)
+        job.deploy_dir = str(self.allowed_dir(job.deploy_dir))
+        record = DaemonJob(job, uuid.uuid4().hex[:12])
+        with self.lock:
+            self.records[record.id] = record
+            self.forget_finished()
+        print(f"📥 {record.job.label} queued as {record.id}")
+        self.executor.submit(contextvars.copy_context().run, self.run_record, record)
+        return record
+
+    def allowed_dir(self, deploy_dir: str) -> Path:
+        """deploy_dir with symlinks resolved, if it lies inside one of the allowed roots"""
+        path = Path(deploy_dir).resolve()
+        for root in self.roots:
+            if path == root or root in path.parents:
+                return path
+        raise Exception(f"dir must be inside {', '.join(str(root) for root in self.roots)}")
+
+    def run_record(self, record: DaemonJob) -> None:
+        record.status = "running"
+        record.started_at = time.time()
+        try:
+            record.result = self.run_job(record.job, self.output, record.log)
+        except Exception as e:
+            record.result = {"status": "failed", "error": str(e)}
+        record.status = record.result.get("status", "failed")
+
+    def forget_finished(self) -> None:
+        finished = [job_id for job_id, record in self.records.items() if record.status in ("ok", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.records[job_id]
+
+    def get(self, job_id: str) -> Optional[DaemonJob]:
+        with self.lock:
+            return self.records.get(job_id)
+
+    def health(self) -> dict:
+        with self.lock:
+            statuses = [record.status for record in self.records.values()]
+        return {
+            "status": "ok",
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "max_sites": self.max_sites,
+            "sessions": len(self.sessions),
+        }
+
+    def shutdown(self) -> None:
+        """Let running and queued jobs finish"""
+        self.executor.shutdown(wait=True)
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this every reply waits on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def authorized(self) -> bool:
+        """Check the shared secret when the server has one, replying 401 if it does not match"""
+        secret = getattr(self.server, "secret", None)
+        if secret is None:
+            return True
+        expected = f"Bearer {secret}".encode("utf-8")
+        if hmac.compare_digest(self.headers.get("Authorization", "").encode("utf-8"), expected):
+            return True
+        self.close_connection = True
+        self.reply(401, {"error": "Missing or wrong Authorization header"})
+        return False
+
+    def reply(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        daemon = self.server.daemon
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/health":
+            self.reply(200, daemon.health())
+        elif url.path == "/jobs":
+            with daemon.lock:
+                records = list(daemon.records.values())
+            self.reply(200, {"jobs": [record.describe() for record in records]})
+        elif re.fullmatch(r"/jobs/[0-9a-f]+", url.path):
+            record = daemon.get(url.path.rsplit("/", 1)[1])
+            if record is None:
+                self.reply(404, {"error": "No such job"})
+            else:
+                self.reply(200, record.describe(include_log=query.get("log") == ["1"]))
+        else:
+            self.reply(404, {"error": f"No route for GET {url.path}"})
+
+    def do_POST(self):
+        # Bodies of rejected requests are not read, so the connection cannot be reused
+        if not self.authorized():
+            return
+        if urlsplit(self.path).path != "/jobs":
+            self.close_connection = True
+            self.reply(404, {"error": f"No route for POST {self.path}"})
+            return
+        # Browsers send form and text/plain bodies cross-origin without a preflight; JSON needs one
+        if self.headers.get_content_type() != "application/json":
+            self.close_connection = True
+            self.reply(415, {"error": "Content-Type must be application/json"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self.reply(400, {"error": "Invalid Content-Length header"})
+            return
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.reply(413, {"error": "Request body too large"})
+            return
+        try:
+            fields = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(fields, dict):
+                raise Exception("Request body must be a JSON object")
+            record = self.server.daemon.submit(fields)
+        except Exception as e:
+            self.reply(400, {"error": str(e)})
+            return
+        self.reply(202, record.describe())
+
+
+class UnixDaemonHandler(DaemonHandler):
+    # TCP_NODELAY does not exist for Unix sockets
+    disable_nagle_algorithm = False
+
+    def address_string(self) -> str:
+        return "unix"
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(daemon: DeployDaemon, socket_path: Optional[str], host: str, port: Optional[int],
+                  secret: Optional[str] = None):
+    """HTTP server on host:port if a port is given, else on a Unix socket
+
+    A TCP server requires every request to carry the shared secret.
+    """
+    if port is None:
+        Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # Only the owner may connect: anyone who can submit jobs can deploy with the daemon's defaults
+        old_umask = os.umask(0o177)
+        try:
+            server = UnixHTTPServer(socket_path, UnixDaemonHandler)
+        finally:
+            os.umask(old_umask)
+        address = f"unix:{socket_path}"
+    else:
+        if not secret:
+            raise Exception("TCP needs a shared secret: set DEPLOY_DAEMON_SECRET or --secret-file")
+        server = ThreadingHTTPServer((host, port), DaemonHandler)
+        server.daemon_threads = True
+        server.secret = secret
+        address = f"http://{host}:{server.server_address[1]}"
+    server.daemon = daemon
+    return server, address
+
+
+def get_config() -> argparse.Namespace:
+    """Get configuration from CLI args or environment variables"""
+    parser = argparse.ArgumentParser(
+        description="Keep deploy sessions and caches warm and accept deploy jobs over a local socket"
+    )
+    parser.add_argument("--socket",
+                        help=f"Unix socket to listen on (default: {DEFAULT_SOCKET_NAME} in the cache directory)")
+    parser.add_argument("--port", type=int, help="Listen on this TCP port instead of a Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--secret-file", help="File holding the shared secret TCP requests must send")
+    parser.add_argument("--allow-dir", action="append", default=[], metavar="DIR",
+                        help="Only deploy directories inside this one (repeatable, default: working directory)")
+    batch.add_batch_arguments(parser)
+
+    args = parser.parse_args()
+
+    port = args.port if args.port is not None else os.getenv("DEPLOY_DAEMON_PORT")
+    socket_path = args.socket or os.getenv("DEPLOY_DAEMON_SOCKET")
+    if port is not None and socket_path:
+        raise Exception("Use either a Unix socket or a TCP port, not both")
+
+    secret = os.getenv("DEPLOY_DAEMON_SECRET")
+    secret_file = args.secret_file or os.getenv("DEPLOY_DAEMON_SECRET_FILE")
+    if secret_file:
+        with open(secret_file, "r", encoding="utf-8") as f:
+            secret = f.read().strip()
+
+    return argparse.Namespace(
+        socket=socket_path or str(get_cache_dir() / DEFAULT_SOCKET_NAME),
+        host=args.host,
+        port=int(port) if port is not None else None,
+        secret=secret,
+        roots=args.allow_dir + [root for root in os.getenv("DEPLOY_DAEMON_ROOTS", "").split(os.pathsep) if root],
+        **batch.batch_options(args),
+    )
+
+
+def main():
+    """Main entry point"""
+    try:
+        config = get_config()
+
+        daemon = DeployDaemon(
+            roots=config.roots, max_sites=config.max_sites, per_provider=config.per_provider,
+            per_account=config.per_account, log_dir=config.log_dir, deploy_options=config.deploy_options,
+            firebase_options=config.firebase_options,
+        )
+        server, address = create_server(daemon, config.socket, config.host, config.port, config.secret)
+
+        # Stop cleanly on SIGTERM as well as Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+
+        with daemon.running() as output:
+            daemon.output = output
+            print(f"\n🛰️  Deploy daemon listening on {address} (up to {daemon.max_sites} site(s) at a time)")
+            print(f"📂 Deploying only inside {', '.join(str(root) for root in daemon.roots)}\n")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            print("\n🛑 Shutting down, waiting for queued and running deploys...")
+            server.server_close()
+            daemon.shutdown()
+
+        if config.port is None and os.path.exists(config.socket):
+            os.remove(config.socket)
+
+    except Exception as e:
+        print(f"\n❌ Deploy daemon failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
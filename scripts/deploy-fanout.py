@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+"""
+Fan-out Deployment Script
+
+Deploys one build directory to Firebase Hosting and Cloudflare Pages at the
+same time. The directory is scanned once and every file is hashed for both
+providers in a single pass; the two deploys then run in parallel from that
+shared file list, so a dual-hosted site takes about as long as the slower
+provider instead of the sum of both.
+
+Requirements:
+- Python 3.7+
+- requests library (pip install requests)
+- firebase-deploy-standalone.py and cloudflare-deploy.py next to this script
+
+Usage:
+    python3 deploy-fanout.py --dir=./out --firebase-project=my-project --cloudflare-project=my-site
+
+Environment Variables (alternative to CLI args):
+    FIREBASE_PROJECT_ID - Your Firebase project ID
+    FIREBASE_ACCESS_TOKEN - Your Google OAuth access token
+    DEPLOY_CHANNEL - Firebase channel (default: live)
+    CLOUDFLARE_ACCOUNT_ID - Your Cloudflare Account ID
+    CLOUDFLARE_API_TOKEN - Your Cloudflare API token
+    CLOUDFLARE_PROJECT_NAME - Your Pages project name
+    DEPLOY_BRANCH - Cloudflare deployment branch (default: main)
+    DEPLOY_DIR - Directory containing files to deploy (default: ./out)
+
+A provider is skipped when its project is not configured. Each provider
+still applies its own ignore file (.firebaseignore, .cfignore) and file size
+limit to the shared scan. With --optimize and --fingerprint, files are
+minified and assets fingerprinted once, and both targets deploy the same
+rewritten files. The --report file includes each
+target's deploy metrics. The exit status is 1 if any target failed.
+"""
+
+import os
+import sys
+import argparse
+import contextvars
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+from deploy_common import (
+    DEFAULT_JOBS, DEFAULT_SCAN_WORKERS, DeployFile, DigestSet, IgnoreRules, JobOutput, StatIndex,
+    load_script, read_files
+)
+from deploy_assets import fingerprint_files
+from deploy_compress import DEFAULT_GZIP_LEVEL
+from deploy_optimize import optimize_files
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+class FanoutDeployer:
+    """Scan a directory once and deploy it to several providers concurrently"""
+
+    def __init__(self, deploy_dir: str, deployers: dict, scan_workers: int = DEFAULT_SCAN_WORKERS,
+                 scan_processes: bool = True, exclude=(), default_excludes: bool = True,
+                 optimize: bool = False, strip_html_comments: bool = False, fingerprint: bool = False,
+                 fingerprint_scripts: bool = False):
+        self.deploy_dir = Path(deploy_dir)
+        self.deployers = deployers
+        self.scan_workers = scan_workers
+        self.scan_processes = scan_processes
+        self.optimize = optimize
+        self.strip_html_comments = strip_html_comments
+        self.fingerprint = fingerprint
+        self.fingerprint_scripts = fingerprint_scripts
+        # Provider ignore files are applied per target by select_files
+        self.ignore_rules = IgnoreRules.for_directory(self.deploy_dir, None, exclude, default_excludes)
+
+    def scan(self) -> List[DeployFile]:
+        """Read the directory once, with the most permissive of the providers' size limits"""
+        print(f"📂 Reading files from: {self.deploy_dir}")
+
+        max_file_size_mb = max(deployer.MAX_FILE_SIZE_MB for deployer in self.deployers.values())
+        files = read_files(self.deploy_dir, max_file_size_mb, self.scan_workers, self.ignore_rules)
+        print(f"✅ Found {len(files)} file(s)")
+        return files
+
+    def optimize_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Minify once for every target"""
+        files, _ = optimize_files(files, self.deploy_dir, self.scan_workers, self.scan_processes,
+                                  self.strip_html_comments)
+        return files
+
+    def fingerprint_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Fingerprint once for every target; the rewritten files are then hashed like the rest"""
+        stat_index = StatIndex.for_directory(self.deploy_dir)
+        files = fingerprint_files(files, self.deploy_dir, stat_index, self.scan_workers, self.scan_processes,
+                                  self.fingerprint_scripts)
+        stat_index.save()
+        return files
+
+    def hash_files(self, files: List[DeployFile]) -> None:
+        """Compute every provider's digests in one pass and store them in the stat index
+
+        The deployers then find all digests cached and don't read the files again.
+        """
+        hashing = [deployer for deployer in self.deployers.values() if not deployer.full_upload]
+        if not hashing:
+            return
+
+        digests = [deployer.file_digest() for deployer in hashing]
+        kind = digests[0][0]
+        stat_index = StatIndex.for_directory(self.deploy_dir)
+        stat_index.digest_all(
+            files, kind, DigestSet(*(compute for _, compute in digests)), self.scan_workers, self.scan_processes
+        )
+        print(f"🔢 {stat_index.hits} unchanged file(s) reused cached hashes, {stat_index.misses} hashed")
+        stat_index.save()
+
+        # Reload so each deployer sees the new digests in its own index instance
+        for deployer in hashing:
+            deployer.stat_index = StatIndex.for_directory(self.deploy_dir)
+
+    def deploy_target(self, name: str, files: List[DeployFile], output: JobOutput) -> dict:
+        result = {"target": name}
+        log = io.StringIO()
+        start = time.perf_counter()
+        token = output.current.set(log)
+        try:
+            deployed = self.deployers[name].deploy(files)
+            if isinstance(deployed, tuple):
+                result.update(status="ok", url=deployed[0], deployment_id=deployed[1])
+            else:
+                result.update(status="ok", url=deployed)
+        except Exception as e:
+            print(f"\n❌ Deployment failed: {e}")
+            result.update(status="failed", error=str(e))
+        finally:
+            output.current.reset(token)
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        result["metrics"] = self.deployers[name].metrics.summary()
+        result["log"] = log.getvalue()
+        return result
+
+    def deploy(self) -> List[dict]:
+        """Scan and hash once, then deploy to every target in parallel"""
+        print(f"\n🔀 Fan-out Deployment Tool (Python): {', '.join(self.deployers)}\n")
+
+        start = time.perf_counter()
+        files = self.scan()
+        if not files:
+            raise Exception("No files found to deploy")
+        if self.optimize:
+            files = self.optimize_files(files)
+        if self.fingerprint:
+            files = self.fingerprint_files(files)
+        self.hash_files(files)
+        prepare_seconds = time.perf_counter() - start
+
+        output = JobOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.deployers)) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self.deploy_target, name, files, output)
+                    for name in self.deployers
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            sys.stdout = output.stream
+
+        for result in results:
+            print(f"\n──── {result['target']} ────")
+            print(result.pop("log").rstrip())
+
+        print("\n⏱️  Timings:")
+        print(f"   scan + hash: {prepare_seconds:.2f}s")
+        for result in results:
+            print(f"   {result['target']}: {result['seconds']:.2f}s")
+        print(f"   total: {time.perf_counter() - start:.2f}s")
+        return results
+
+
+def get_config() -> argparse.Namespace:
+    """Get configuration from CLI args or environment variables"""
+    parser = argparse.ArgumentParser(
+        description="Deploy one static site to Firebase Hosting and Cloudflare Pages in parallel"
+    )
+    parser.add_argument("--dir", help="Directory to deploy (default: ./out)")
+    parser.add_argument("--firebase-project", help="Firebase project ID")
+    parser.add_argument("--firebase-token", help="Google OAuth access token")
+    parser.add_argument("--channel", help="Firebase channel (default: live)")
+    parser.add_argument("--cloudflare-account", help="Cloudflare Account ID")
+    parser.add_argument("--cloudflare-token", help="Cloudflare API token")
+    parser.add_argument("--cloudflare-project", help="Cloudflare Pages project name")
+    parser.add_argument("--branch", help="Cloudflare deployment branch (default: main)")
+    parser.add_argument("--report", help="Write per-target results as JSON to this file")
+    parser.add_argument("--full-upload", action="store_true",
+                        help="Send every file inline instead of only missing content")
+    parser.add_argument("--jobs", type=int, help=f"Concurrent upload requests per target (default: {DEFAULT_JOBS})")
+    parser.add_argument("--scan-workers", type=int,
+                        help=f"Parallel workers for scanning and hashing (default: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument("--scan-threads", action="store_true",
+                        help="Hash on threads instead of processes (for I/O-bound trees such as network mounts)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip matching files or directories (repeatable)")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="Also deploy .git, node_modules, source maps and editor temp files")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Minify HTML, CSS and JavaScript before upload")
+    parser.add_argument("--strip-html-comments", action="store_true",
+                        help="With --optimize, also remove HTML comments (breaks React and Vue hydration markers)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Serve content-hashed copies of referenced assets as immutable")
+    parser.add_argument("--fingerprint-scripts", action="store_true",
+                        help="With --fingerprint, also fingerprint classic scripts (not for webpack publicPath 'auto')")
+    parser.add_argument("--headers", metavar="FILE",
+                        help="JSON list of {\"glob\", \"headers\"} rules replacing the default cache policy")
+    parser.add_argument("--clone", action="store_true",
+                        help="Firebase: clone the released version and upload only what changed")
+    parser.add_argument("--compression-level", type=int,
+                        help=f"Firebase: gzip level for uploaded files (default: {DEFAULT_GZIP_LEVEL})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue interrupted deploys of the same directory from their last checkpoint")
+
+    args = parser.parse_args()
+
+    return argparse.Namespace(
+        deploy_dir=args.dir or os.getenv("DEPLOY_DIR", "./out"),
+        firebase_project=args.firebase_project or os.getenv("FIREBASE_PROJECT_ID"),
+        firebase_token=args.firebase_token or os.getenv("FIREBASE_ACCESS_TOKEN"),
+        channel=args.channel or os.getenv("DEPLOY_CHANNEL", "live"),
+        cloudflare_account=args.cloudflare_account or os.getenv("CLOUDFLARE_ACCOUNT_ID"),
+        cloudflare_token=args.cloudflare_token or os.getenv("CLOUDFLARE_API_TOKEN"),
+        cloudflare_project=args.cloudflare_project or os.getenv("CLOUDFLARE_PROJECT_NAME"),
+        branch=args.branch or os.getenv("DEPLOY_BRANCH", "main"),
+        report=args.report or os.getenv("DEPLOY_REPORT"),
+        full_upload=args.full_upload or os.getenv("DEPLOY_FULL_UPLOAD") == "1",
+        jobs=args.jobs or int(os.getenv("DEPLOY_JOBS", DEFAULT_JOBS)),
+        scan_workers=args.scan_workers or int(os.getenv("DEPLOY_SCAN_WORKERS", DEFAULT_SCAN_WORKERS)),
+        scan_processes=not (args.scan_threads or os.getenv("DEPLOY_SCAN_THREADS") == "1"),
+        exclude=args.exclude + [glob for glob in os.getenv("DEPLOY_EXCLUDE", "").split(",") if glob],
+        default_excludes=not args.no_default_excludes,
+        clone=args.clone or os.getenv("DEPLOY_CLONE") == "1",
+        compression_level=args.compression_level or int(os.getenv("DEPLOY_COMPRESSION_LEVEL", DEFAULT_GZIP_LEVEL)),
+        resume=args.resume or os.getenv("DEPLOY_RESUME") == "1",
+        optimize=args.optimize or os.getenv("DEPLOY_OPTIMIZE") == "1",
+        strip_html_comments=args.strip_html_comments or os.getenv("DEPLOY_STRIP_HTML_COMMENTS") == "1",
+        fingerprint=args.fingerprint or os.getenv("DEPLOY_FINGERPRINT") == "1",
+        fingerprint_scripts=args.fingerprint_scripts or os.getenv("DEPLOY_FINGERPRINT_SCRIPTS") == "1",
+        headers_file=args.headers or os.getenv("DEPLOY_HEADERS"),
+    )
+
+
+def main():
+    """Main entry point"""
+    try:
+        config = get_config()
+
+        options = dict(
+            full_upload=config.full_upload, jobs=config.jobs,
+            scan_workers=config.scan_workers, scan_processes=config.scan_processes,
+            exclude=config.exclude, default_excludes=config.default_excludes, resume=config.resume,
+            headers_file=config.headers_file,
+        )
+        deployers = {}
+
+        if config.firebase_project:
+            if not config.firebase_token:
+                print("❌ Error: Firebase access token is required")
+                print("Provide via --firebase-token=xxx or FIREBASE_ACCESS_TOKEN env var")
+                sys.exit(1)
+            firebase = load_script(SCRIPTS_DIR / "firebase-deploy-standalone.py")
+            deployers["firebase"] = firebase.FirebaseDeployer(
+                config.firebase_project, config.firebase_token, config.deploy_dir, config.channel,
+                compression_level=config.compression_level, clone=config.clone, **options,
+            )
+
+        if config.cloudflare_project:
+            if not config.cloudflare_account or not config.cloudflare_token:
+                print("❌ Error: Cloudflare Account ID and API token are required")
+                print("Provide via --cloudflare-account/--cloudflare-token or "
+                      "CLOUDFLARE_ACCOUNT_ID/CLOUDFLARE_API_TOKEN env vars")
+                sys.exit(1)
+            cloudflare = load_script(SCRIPTS_DIR / "cloudflare-deploy.py")
+            deployers["cloudflare"] = cloudflare.CloudflareDeployer(
+                config.cloudflare_account, config.cloudflare_token, config.cloudflare_project,
+                config.deploy_dir, config.branch, **options,
+            )
+
+        if not deployers:
+            print("❌ Error: No deploy target configured")
+            print("Provide --firebase-project and/or --cloudflare-project")
+            sys.exit(1)
+
+        fanout = FanoutDeployer(
+            config.deploy_dir, deployers, scan_workers=config.scan_workers, scan_processes=config.scan_processes,
+            exclude=config.exclude, default_excludes=config.default_excludes,
+            optimize=config.optimize, strip_html_comments=config.strip_html_comments,
+            fingerprint=config.fingerprint, fingerprint_scripts=config.fingerprint_scripts,
+        )
+        results = fanout.deploy()
+
+        if config.report:
+            with open(config.report, "w", encoding="utf-8") as f:
+                json.dump({"targets": results}, f, indent=2)
+            print(f"\n📋 Report written to {config.report}")
+
+        failed = [result for result in results if result["status"] != "ok"]
+        for result in results:
+            if result["status"] == "ok":
+                print(f"\n🌐 {result['target']}: {result['url']}")
+        if failed:
+            print(f"\n❌ {len(failed)} target(s) failed: {', '.join(result['target'] for result in failed)}")
+            sys.exit(1)
+        print("\n🎉 Deployment successful!\n")
+
+    except Exception as e:
+        print(f"\n❌ Deployment failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
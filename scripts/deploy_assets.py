@@ -0,0 +1,383 @@
+"""
+Asset fingerprinting and cache-control policy for the deployment scripts
+
+The optional fingerprint stage gives every static asset that an HTML or CSS
+file references a content-hashed copy under /_fp/ (for example
+/css/site.css -> /_fp/css/site.3f2a1b9c.css) and points those references at
+the copy. Rewritten HTML and CSS are written to the cache dir; files in the
+deploy directory are never modified. The original paths stay deployed, so
+links from outside, hard-coded URLs in scripts and /favicon.ico keep working.
+The copies have the same content as the originals, so both providers store
+them once.
+
+A header policy is a list of {"glob": ..., "headers": {...}} rules, in the
+format of Firebase Hosting's version config. When several rules match a
+path, the later rule wins. The default revalidates HTML and anything else on
+every request, caches other static assets for an hour, and caches /_fp/
+copies for a year as immutable. Firebase receives the rules as the version
+config; Cloudflare receives them as a generated _headers file, merged ahead
+of the site's own _headers.
+"""
+
+import os
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote, unquote
+
+from deploy_common import DEFAULT_SCAN_WORKERS, DeployFile, StatIndex, content_digest, get_cache_dir, temp_path
+
+FINGERPRINT_PREFIX = "/_fp"
+FINGERPRINT_LENGTH = 8
+# Assets that get fingerprinted copies when an HTML or CSS file references them
+FINGERPRINT_EXTENSIONS = {
+    "css", "png", "jpg", "jpeg", "gif", "svg", "webp", "avif", "ico",
+    "woff", "woff2", "ttf", "otf", "eot", "mp4", "webm", "mp3",
+}
+# Only fingerprinted on request: a script that loads chunks relative to its own
+# URL (webpack's publicPath "auto", document.currentScript) would look for them
+# under /_fp/
+SCRIPT_EXTENSIONS = {"js"}
+DOCUMENT_EXTENSIONS = {"html", "htm"}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_HEADER_POLICY = [
+    {"glob": "**", "headers": {"Cache-Control": "public, max-age=0, must-revalidate"}},
+    {"glob": "**/*.@(" + "|".join(sorted(FINGERPRINT_EXTENSIONS | SCRIPT_EXTENSIONS)) + ")",
+     "headers": {"Cache-Control": "public, max-age=3600"}},
+    {"glob": FINGERPRINT_PREFIX + "/**", "headers": {"Cache-Control": IMMUTABLE_CACHE_CONTROL}},
+]
+# Cloudflare Pages reads at most this many rules from _headers
+MAX_CLOUDFLARE_HEADER_RULES = 100
+
+_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)(\s[^>]*)?>")
+_ATTRIBUTE = re.compile(r"""([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_REFERENCE_ATTRIBUTES = {"src", "href", "poster", "data-src"}
+_CSS_URL = re.compile(r"""url\(\s*(?:"([^"]*)"|'([^']*)'|([^'")\s]+))\s*\)""")
+_CSS_IMPORT = re.compile(r"""@import\s+(?:"([^"]*)"|'([^']*)')""")
+# Path characters left unescaped when a reference is rewritten
+_URL_SAFE = "/@+,=~"
+_EXTERNAL = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//|#)")
+
+
+def _is_css(path: str) -> bool:
+    return path.lower().endswith(".css")
+
+
+def fingerprinted_path(path: str, sha: str) -> str:
+    """/css/site.css -> /_fp/css/site.<hash>.css"""
+    directory, name = posixpath.split(path)
+    stem, extension = posixpath.splitext(name)
+    return f"{FINGERPRINT_PREFIX}{directory.rstrip('/')}/{stem}.{sha[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def resolve_reference(reference: str, base_path: str) -> Optional[Tuple[str, str]]:
+    """Site path a reference in base_path points to, and its ?query/#fragment suffix
+
+    Returns None for external URLs, data: URIs and fragment-only links.
+    """
+    reference = reference.strip()
+    if not reference or _EXTERNAL.match(reference):
+        return None
+    cut = min([index for index in (reference.find("?"), reference.find("#")) if index >= 0], default=len(reference))
+    path, suffix = unquote(reference[:cut]), reference[cut:]
+    if not path:
+        return None
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(base_path), path)
+    return posixpath.normpath(path), suffix
+
+
+class Fingerprinter:
+    """Fingerprint the assets of one deploy directory
+
+    Rewritten documents are written to <cache>/fingerprint/<dir key>/ and only
+    replaced when their content changes, so an unchanged page keeps its stat
+    data and the stat index keeps its cached digests.
+    """
+
+    def __init__(self, deploy_dir: Path, stat_index: StatIndex, workers: int = DEFAULT_SCAN_WORKERS,
+                 processes: bool = True, scripts: bool = False):
+        self.stat_index = stat_index
+        self.workers = workers
+        self.processes = processes
+        self.extensions = FINGERPRINT_EXTENSIONS | SCRIPT_EXTENSIONS if scripts else FINGERPRINT_EXTENSIONS
+        key = hashlib.sha256(str(deploy_dir.resolve()).encode("utf-8")).hexdigest()[:16]
+        self.build_dir = get_cache_dir() / "fingerprint" / key
+
+    def run(self, files: Sequence[DeployFile]) -> Tuple[List[DeployFile], int]:
+        """Return the files to deploy with fingerprinted copies added, and how many copies there are"""
+        by_path = {file.path: file for file in files}
+        texts = {
+            file.path: file.source.read_bytes().decode("utf-8", errors="surrogateescape")
+            for file in files if file.extension.lower() in DOCUMENT_EXTENSIONS | {"css"}
+        }
+
+        # Every referenced asset except CSS can be hashed straight from disk
+        referenced = set()
+        for path, text in texts.items():
+            referenced.update(self.references(path, text, by_path))
+        plain = [by_path[path] for path in sorted(referenced) if not _is_css(path)]
+        shas = {path: digests["sha256"] for path, digests in self.stat_index.digest_all(
+            plain, "sha256", content_digest, self.workers, self.processes
+        ).items()}
+
+        # A stylesheet's fingerprint depends on the fingerprints it references
+        rewritten: Dict[str, str] = {}
+        for path in sorted(texts):
+            if _is_css(path):
+                self.rewrite_css(path, texts, by_path, shas, rewritten, set())
+
+        result = dict(by_path)
+        for path, text in texts.items():
+            if not _is_css(path):
+                rewritten[path] = self.rewrite_html(path, text, by_path, shas)
+        for path, text in rewritten.items():
+            if text != texts[path]:
+                result[path] = self.write(by_path[path], text)
+
+        copies = 0
+        for path, sha in shas.items():
+            if path in referenced:
+                copy = result[path]
+                result[fingerprinted_path(path, sha)] = DeployFile(
+                    fingerprinted_path(path, sha), copy.source, copy.size, copy.mtime_ns, copy.inode
+                )
+                copies += 1
+
+        self.prune({path for path in rewritten if rewritten[path] != texts[path]})
+        return sorted(result.values(), key=lambda file: file.path), copies
+
+    def is_asset(self, path: str, by_path: Dict[str, DeployFile]) -> bool:
+        return path in by_path and by_path[path].extension.lower() in self.extensions
+
+    def references(self, path: str, text: str, by_path: Dict[str, DeployFile]) -> Set[str]:
+        """Fingerprintable assets referenced by an HTML or CSS file"""
+        found = set()
+        if _is_css(path):
+            references = [next(group for group in match.groups() if group is not None)
+                          for pattern in (_CSS_URL, _CSS_IMPORT) for match in pattern.finditer(text)]
+        else:
+            references = [reference for _, reference in self.html_references(text)]
+            references += [next(group for group in match.groups() if group is not None)
+                           for match in _CSS_URL.finditer(text)]
+        for reference in references:
+            resolved = resolve_reference(reference, path)
+            if resolved and self.is_asset(resolved[0], by_path):
+                found.add(resolved[0])
+        return found
+
+    @staticmethod
+    def html_references(text: str) -> Iterable[Tuple[Tuple[int, int], str]]:
+        """(span, value) of every asset reference in tag attributes, srcset entries included
+
+        ES module scripts are skipped: their relative imports would not
+        resolve from a copy under /_fp/.
+        """
+        for tag in _TAG.finditer(text):
+            if not tag.group(2):
+                continue
+            attributes = {match.group(1).lower(): match for match in _ATTRIBUTE.finditer(tag.group(2))}
+
+            def value(name: str) -> str:
+                match = attributes.get(name)
+                return (match.group(2) if match.group(2) is not None else match.group(3)).lower() if match else ""
+
+            if value("type") == "module" or "modulepreload" in value("rel").split():
+                continue
+            offset = tag.start(2)
+            for name, match in attributes.items():
+                group = 2 if match.group(2) is not None else 3
+                start = offset + match.start(group)
+                if name in _REFERENCE_ATTRIBUTES:
+                    yield (start, offset + match.end(group)), match.group(group)
+                elif name in ("srcset", "imagesrcset"):
+                    position = 0
+                    for candidate in match.group(group).split(","):
+                        url = candidate.strip().split(" ")[0] if candidate.strip() else ""
+                        if url:
+                            url_start = start + position + candidate.index(url)
+                            yield (url_start, url_start + len(url)), url
+                        position += len(candidate) + 1
+
+    def target(self, reference: str, base_path: str, by_path: Dict[str, DeployFile],
+               shas: Dict[str, str], absolute: bool) -> Optional[str]:
+        """What a reference should become, or None to leave it as it is
+
+        absolute also turns relative references to other local files into
+        site-absolute ones, which a copy under /_fp/ needs.
+        """
+        resolved = resolve_reference(reference, base_path)
+        if not resolved:
+            return None
+        path, suffix = resolved
+        if path in shas:
+            return quote(fingerprinted_path(path, shas[path]), safe=_URL_SAFE) + suffix
+        if absolute and not reference.strip().startswith("/"):
+            return quote(path, safe=_URL_SAFE) + suffix
+        return None
+
+    def rewrite_css(self, path: str, texts: Dict[str, str], by_path: Dict[str, DeployFile],
+                    shas: Dict[str, str], rewritten: Dict[str, str], visiting: Set[str]) -> None:
+        """Rewrite a stylesheet after the stylesheets it references, then hash it"""
+        if path in rewritten or path in visiting:
+            return
+        visiting.add(path)
+        text = texts[path]
+        for match in _CSS_IMPORT.finditer(text):
+            resolved = resolve_reference(match.group(1) or match.group(2), path)
+            if resolved and resolved[0] in texts and _is_css(resolved[0]):
+                self.rewrite_css(resolved[0], texts, by_path, shas, rewritten, visiting)
+        for match in _CSS_URL.finditer(text):
+            reference = next(group for group in match.groups() if group is not None)
+            resolved = resolve_reference(reference, path)
+            if resolved and resolved[0] in texts and _is_css(resolved[0]):
+                self.rewrite_css(resolved[0], texts, by_path, shas, rewritten, visiting)
+        visiting.discard(path)
+
+        def replace(match: "re.Match") -> str:
+            index = next(i for i, group in enumerate(match.groups(), 1) if group is not None)
+            new = self.target(match.group(index), path, by_path, shas, absolute=True)
+            if new is None:
+                return match.group(0)
+            return match.string[match.start():match.start(index)] + new + match.string[match.end(index):match.end()]
+
+        text = _CSS_IMPORT.sub(replace, _CSS_URL.sub(replace, text))
+        rewritten[path] = text
+        shas[path] = hashlib.sha256(text.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+    def rewrite_html(self, path: str, text: str, by_path: Dict[str, DeployFile], shas: Dict[str, str]) -> str:
+        replacements = []
+        for span, reference in self.html_references(text):
+            new = self.target(reference, path, by_path, shas, absolute=False)
+            if new is not None:
+                replacements.append((span, new))
+        for match in _CSS_URL.finditer(text):
+            index = next(i for i, group in enumerate(match.groups(), 1) if group is not None)
+            new = self.target(match.group(index), path, by_path, shas, absolute=False)
+            if new is not None:
+                replacements.append(((match.start(index), match.end(index)), new))
+
+        parts = []
+        last = 0
+        for (start, end), new in sorted(replacements):
+            if start < last:
+                continue
+            parts.append(text[last:start])
+            parts.append(new)
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def write(self, file: DeployFile, text: str) -> DeployFile:
+        """Store a rewritten document, leaving it untouched if the content is the same"""
+        target = self.build_dir / file.path.lstrip("/")
+        data = text.encode("utf-8", errors="surrogateescape")
+        try:
+            unchanged = target.read_bytes() == data
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = temp_path(target)
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, target)
+        stat = target.stat()
+        return DeployFile(file.path, target, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def prune(self, keep: Set[str]) -> None:
+        """Delete rewritten documents the site no longer has"""
+        if not self.build_dir.is_dir():
+            return
+        for stored in self.build_dir.rglob("*"):
+            if stored.is_file() and "/" + stored.relative_to(self.build_dir).as_posix() not in keep:
+                try:
+                    stored.unlink()
+                except OSError:
+                    pass
+
+
+def fingerprint_files(files: Sequence[DeployFile], deploy_dir: Path, stat_index: StatIndex,
+                      workers: int = DEFAULT_SCAN_WORKERS, processes: bool = True,
+                      scripts: bool = False) -> List[DeployFile]:
+    """Add fingerprinted copies of referenced assets and point HTML and CSS at them"""
+    print("🔖 Fingerprinting assets...")
+    files, copies = Fingerprinter(deploy_dir, stat_index, workers, processes, scripts).run(files)
+    print(f"✅ {copies} asset(s) fingerprinted under {FINGERPRINT_PREFIX}/")
+    return files
+
+
+def load_header_policy(path: Optional[str] = None) -> List[dict]:
+    """Header rules from a JSON file, or the default policy"""
+    if not path:
+        return DEFAULT_HEADER_POLICY
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            policy = json.load(f)
+    except (OSError, ValueError) as e:
+        raise Exception(f"Failed to read header policy {path}: {e}")
+
+    if not isinstance(policy, list) or not all(
+        isinstance(rule, dict) and isinstance(rule.get("glob"), str) and isinstance(rule.get("headers"), dict)
+        for rule in policy
+    ):
+        raise Exception(f"Header policy {path} must be a list of {{\"glob\": ..., \"headers\": {{...}}}} rules")
+    return policy
+
+
+def cloudflare_patterns(glob: str) -> List[str]:
+    """_headers URL patterns for a glob; @(a|b) alternatives become one pattern each"""
+    alternatives = re.search(r"@\(([^)]*)\)", glob)
+    if alternatives:
+        return [
+            pattern
+            for option in alternatives.group(1).split("|")
+            for pattern in cloudflare_patterns(glob[:alternatives.start()] + option + glob[alternatives.end():])
+        ]
+
+    # A _headers splat matches across slashes, like **
+    pattern = re.sub(r"(?:\*\*/)*\*\*(?:/\*)?|\*", "*", "/" + glob.lstrip("/"))
+    if pattern.count("*") > 1 or re.search(r"[?\[\]{}!]", pattern):
+        raise Exception(f"Header glob {glob} cannot be expressed in Cloudflare _headers (one * at most)")
+    return [pattern]
+
+
+def cloudflare_headers_file(policy: Sequence[dict], site_headers: str = "") -> str:
+    """Render the policy as a _headers file, followed by the site's own _headers rules
+
+    Cloudflare applies every matching rule and joins repeated headers, so each
+    rule first detaches the headers it sets; the last matching rule wins, as
+    it does on Firebase.
+    """
+    blocks = []
+    for rule in policy:
+        for pattern in cloudflare_patterns(rule["glob"]):
+            lines = [pattern]
+            if blocks:
+                lines += [f"  ! {name}" for name in rule["headers"]]
+            lines += [f"  {name}: {value}" for name, value in rule["headers"].items()]
+            blocks.append("\n".join(lines))
+
+    if len(blocks) > MAX_CLOUDFLARE_HEADER_RULES:
+        raise Exception(f"Header policy needs {len(blocks)} _headers rules, "
+                        f"Cloudflare reads at most {MAX_CLOUDFLARE_HEADER_RULES}")
+    if site_headers.strip():
+        blocks.append(_detach_policy_headers(site_headers.strip(), policy))
+    return "\n\n".join(blocks) + "\n"
+
+
+def _detach_policy_headers(site_headers: str, policy: Sequence[dict]) -> str:
+    """Let the site's own rules replace policy headers instead of being joined to them"""
+    names = {name.lower() for rule in policy for name in rule["headers"]}
+    lines = []
+    for line in site_headers.splitlines():
+        setting = line.strip()
+        if line[:1].isspace() and ":" in setting and not setting.startswith(("!", "#")):
+            name = setting.split(":", 1)[0].strip()
+            if name.lower() in names:
+                lines.append(f"  ! {name}")
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+"""
+Shared blob store for the deployment scripts
+
+A SQLite index next to the compressed-artifact cache records, for every
+content hash, how large its artifact is and when a deploy last used it, so
+the cache can be trimmed least-recently-used first once it outgrows its
+budget. The same database remembers which hashes each Cloudflare Pages
+project is known to hold, so assets shared between deploys are referenced
+without being checked or sent again. Firebase needs no such record:
+populateFiles already answers which hashes it lacks in the same request.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from deploy_common import get_cache_dir
+from deploy_compress import CompressedCache
+
+DEFAULT_MAX_CACHE_MB = 2048
+# Evict down to this fraction of the budget so every deploy doesn't evict again
+EVICT_TO_FRACTION = 0.9
+# How long a hash recorded as present is trusted without asking the provider
+PRESENT_TTL_SECONDS = 24 * 60 * 60
+# SQLite's default limit on bound parameters is 999
+QUERY_CHUNK = 500
+
+
+class BlobStore:
+    """LRU index over CompressedCache artifacts plus per-scope upload status"""
+
+    def __init__(self, path: Path, cache_root: Path, max_bytes: int):
+        self.path = path
+        self.cache_root = cache_root
+        self.max_bytes = max_bytes
+        self.opened_at = time.time()
+        self.lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Several deploys may share the store; wait for each other's writes
+        self.db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "kind TEXT NOT NULL, sha TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (kind, sha))"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS present ("
+                "scope TEXT NOT NULL, hash TEXT NOT NULL, seen_at REAL NOT NULL, "
+                "PRIMARY KEY (scope, hash))"
+            )
+        if not self.db.execute("SELECT 1 FROM blobs LIMIT 1").fetchone():
+            self._index_existing()
+
+    @classmethod
+    def default(cls, max_cache_mb: Optional[int] = None) -> "BlobStore":
+        """Store for the default cache dir, sized by DEPLOY_BLOB_CACHE_MB"""
+        if max_cache_mb is None:
+            max_cache_mb = int(os.getenv("DEPLOY_BLOB_CACHE_MB", DEFAULT_MAX_CACHE_MB))
+        cache_dir = get_cache_dir()
+        return cls(cache_dir / "blobs.sqlite", CompressedCache.default().root, max_cache_mb * 1024 * 1024)
+
+    def _index_existing(self) -> None:
+        """Adopt artifacts written before the index existed, oldest first by mtime"""
+        rows = []
+        for artifact in self.cache_root.glob("*/*/*.gz"):
+            try:
+                stat = artifact.stat()
+            except OSError:
+                continue
+            rows.append((artifact.parent.parent.name, artifact.stem, stat.st_size, stat.st_mtime))
+        if rows:
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)", rows)
+
+    def touch(self, cache: CompressedCache, content_shas: Iterable[str]) -> None:
+        """Record that this deploy uses the artifacts for content_shas"""
+        now = time.time()
+        shas = list(dict.fromkeys(content_shas))
+        with self.lock:
+            known = {row[0] for row in self.db.execute("SELECT sha FROM blobs WHERE kind = ?", (cache.kind,))}
+
+        new_rows = []
+        for sha in shas:
+            if sha in known:
+                continue
+            try:
+                new_rows.append((cache.kind, sha, cache.artifact_path(sha).stat().st_size, now))
+            except OSError:
+                pass
+
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE blobs SET last_used = ? WHERE kind = ? AND sha = ?",
+                [(now, cache.kind, sha) for sha in shas if sha in known],
+            )
+            self.db.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)", new_rows)
+
+    def evict(self) -> Tuple[int, int]:
+        """Delete least recently used artifacts until the cache fits its budget
+
+        Artifacts used since this store was opened are never evicted. Returns
+        the number of artifacts and bytes removed.
+        """
+        with self.lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0, 0
+
+            target = self.max_bytes * EVICT_TO_FRACTION
+            victims = []
+            for kind, sha, size, last_used in self.db.execute(
+                "SELECT kind, sha, size, last_used FROM blobs ORDER BY last_used"
+            ):
+                if total <= target or last_used >= self.opened_at:
+                    break
+                victims.append((kind, sha, size))
+                total -= size
+
+        removed_bytes = 0
+        for kind, sha, size in victims:
+            try:
+                os.remove(CompressedCache.path_for(self.cache_root, kind, sha))
+                removed_bytes += size
+            except OSError:
+                pass
+
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM blobs WHERE kind = ? AND sha = ?", [(k, s) for k, s, _ in victims])
+            self.db.execute("DELETE FROM present WHERE seen_at < ?", (time.time() - PRESENT_TTL_SECONDS,))
+        return len(victims), removed_bytes
+
+    def present(self, scope: str, hashes: Iterable[str]) -> Set[str]:
+        """Which of hashes were recently recorded as held by scope"""
+        hashes = list(hashes)
+        cutoff = time.time() - PRESENT_TTL_SECONDS
+        found = set()
+        with self.lock:
+            for start in range(0, len(hashes), QUERY_CHUNK):
+                chunk = hashes[start:start + QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in self.db.execute(
+                    f"SELECT hash FROM present WHERE scope = ? AND seen_at >= ? AND hash IN ({placeholders})",
+                    [scope, cutoff] + chunk,
+                ))
+        return found
+
+    def mark_present(self, scope: str, hashes: Iterable[str]) -> None:
+        """Record that scope holds hashes (uploaded, or reported as already there)"""
+        now = time.time()
+        rows: List[Tuple[str, str, float]] = [(scope, file_hash, now) for file_hash in hashes]
+        if rows:
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO present VALUES (?, ?, ?)", rows)
+
+    def close(self) -> None:
+        self.db.close()
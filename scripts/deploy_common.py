@@ -0,0 +1,705 @@
+"""
+Shared helpers for the standalone deployment scripts
+
+Files are handled as raw bytes from disk to request body. Scanning only
+stat()s files; content is streamed in fixed-size chunks when it is hashed or
+encoded, so binary assets (images, fonts) survive unchanged and peak memory
+stays around the size of a single file.
+"""
+
+import os
+import base64
+import contextvars
+import fnmatch
+import hashlib
+import importlib.util
+import io
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from deploy_metrics import current_metrics
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_JOBS = 8
+MAX_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30
+DEFAULT_PREFLIGHT_TTL_SECONDS = 60 * 60
+DEFAULT_SCAN_WORKERS = os.cpu_count() or 4
+# Below this many files a process pool costs more to start than it saves
+MIN_FILES_FOR_PROCESS_POOL = 64
+CHUNK_SIZE = 3 * 256 * 1024  # 768 KiB; a multiple of 3 so base64 chunks concatenate cleanly
+
+
+@dataclass
+class DeployFile:
+    """A file to deploy, identified by its site path"""
+
+    path: str  # Site path with leading slash, e.g. /css/site.css
+    source: Path  # Absolute location on disk
+    size: int  # Size in bytes, from stat()
+    mtime_ns: int = 0
+    inode: int = 0
+
+    @property
+    def extension(self) -> str:
+        return Path(self.path).suffix.lstrip(".")
+
+
+def load_script(path: Path):
+    """Import one of the hyphen-named deploy scripts as a module"""
+    spec = importlib.util.spec_from_file_location(path.stem.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class JobOutput(io.TextIOBase):
+    """sys.stdout replacement that sends each job's prints to that job's log
+
+    The log is looked up in a context variable, which run_parallel copies into
+    its worker threads, so upload progress printed from them lands in the
+    right log too. Anything printed outside a job goes to the real stdout.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.current = contextvars.ContextVar("job_log", default=None)
+
+    def write(self, text: str) -> int:
+        return (self.current.get() or self.stream).write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def get_cache_dir() -> Path:
+    """Root directory for local deploy caches"""
+    return Path(os.getenv("DEPLOY_CACHE_DIR", Path.home() / ".cache" / "sycord-deploy"))
+
+
+def temp_path(path: Path) -> Path:
+    """Sibling of path to write before os.replace()
+
+    Unique per process and thread: the batch, daemon and fan-out scripts run
+    several deployers as threads of one process, sometimes on the same files.
+    """
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+class RetryingSession(requests.Session):
+    """Session that retries connection errors, 429 and 5xx with exponential backoff
+
+    A callable passed as `data` is called once per attempt, so streamed bodies
+    (generators) are rebuilt instead of being replayed half-consumed. Every
+    attempt is recorded in the current DeployMetrics, if one is active.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        super().__init__()
+        self.max_retries = max_retries
+        self.retry_count = 0
+        self._retry_lock = threading.Lock()
+
+    @staticmethod
+    def backoff_seconds(attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        # Full jitter so parallel workers don't retry in lockstep
+        return random.uniform(0.5, 1.0) * min(MAX_BACKOFF_SECONDS, 2 ** attempt)
+
+    def request(self, method, url, *args, **kwargs):
+        data = kwargs.get("data")
+        metrics = current_metrics.get()
+        attempt = 0
+
+        while True:
+            if callable(data):
+                kwargs["data"] = data()
+            if metrics is not None and hasattr(kwargs.get("data"), "__next__"):
+                kwargs["data"] = metrics.count_stream(kwargs["data"])
+
+            start = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if metrics is not None:
+                    metrics.observe_request(method, time.perf_counter() - start, 0)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_seconds(attempt)
+                reason = type(e).__name__
+            else:
+                if metrics is not None:
+                    body = response.request.body
+                    sent = len(body) if isinstance(body, (bytes, str)) else 0
+                    metrics.observe_request(method, time.perf_counter() - start, sent)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff_seconds(attempt, response)
+                reason = f"HTTP {response.status_code}"
+                response.close()
+
+            attempt += 1
+            with self._retry_lock:
+                self.retry_count += 1
+            if metrics is not None:
+                metrics.count("retries")
+            print(f"   ↻ {method} {url.split('?')[0]} failed ({reason}), retry {attempt}/{self.max_retries} "
+                  f"in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def create_session(jobs: int = DEFAULT_JOBS) -> RetryingSession:
+    """Retrying session whose per-host connection pool can serve `jobs` concurrent requests"""
+    session = RetryingSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(jobs, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run_parallel(func: Callable[[T], R], items: Sequence[T], jobs: int) -> List[R]:
+    """Run func over items on up to `jobs` threads and return results in order
+
+    The first failure cancels work that hasn't started yet and is re-raised.
+    """
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        # Workers run in a copy of the caller's context so context variables follow them
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def start_background(func: Callable[..., R], *args) -> "Future[R]":
+    """Run func(*args) on its own thread, in a copy of the caller's context"""
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(contextvars.copy_context().run, func, *args)
+    executor.shutdown(wait=False)
+    return future
+
+
+class PreflightCache:
+    """Remembers which projects recently passed their preflight checks
+
+    Entries are keyed by provider, project and a digest of the token, since a
+    check that passed for one token says nothing about another, and expire
+    after DEPLOY_PREFLIGHT_TTL seconds (0 turns the cache off).
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "PreflightCache":
+        ttl = float(os.getenv("DEPLOY_PREFLIGHT_TTL", DEFAULT_PREFLIGHT_TTL_SECONDS))
+        return cls(get_cache_dir() / "preflight.json", ttl)
+
+    @staticmethod
+    def key(provider: str, target: str, token: str) -> str:
+        token_digest = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+        return f"{provider}:{target}:{token_digest}"
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, entries: Dict[str, float]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = temp_path(self.path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Warning: Failed to write preflight cache: {e}")
+
+    def take(self, key: str) -> bool:
+        """Whether key passed recently; the entry is removed until remember() puts it back
+
+        Taking the entry means a deploy that fails after skipping its checks
+        runs them again next time instead of trusting the cache.
+        """
+        if self.ttl_seconds <= 0:
+            return False
+        with self.lock:
+            entries = self._load()
+            checked_at = entries.pop(key, None)
+            now = time.time()
+            entries = {k: t for k, t in entries.items() if now - t <= self.ttl_seconds}
+            self._store(entries)
+        return checked_at is not None and now - checked_at <= self.ttl_seconds
+
+    def remember(self, key: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self.lock:
+            entries = self._load()
+            entries[key] = time.time()
+            self._store(entries)
+
+
+@dataclass
+class DigestCounts:
+    """Files one digest_all caller found in the index (hits) and had to read (misses)"""
+
+    hits: int = 0
+    misses: int = 0
+
+
+class StatIndex:
+    """Persistent map of site path -> stat data and content digests
+
+    A digest is reused without opening the file as long as the file's size,
+    mtime_ns and inode still match what was recorded when it was computed.
+    Several digest kinds (one per provider hash scheme) are kept per file.
+    """
+
+    VERSION = 1
+    # Files modified this recently may still change within the same mtime tick
+    RACY_WINDOW_NS = 2 * 1_000_000_000
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.entries: Dict[str, dict] = {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def for_directory(cls, deploy_dir: Path, purpose: str = "") -> "StatIndex":
+        """Index stored in the cache dir, one per deploy directory
+
+        A stage that digests files other than the ones deployed under the same
+        paths passes a purpose to keep a separate index.
+        """
+        key = hashlib.sha256(str(deploy_dir.resolve()).encode("utf-8")).hexdigest()[:16]
+        if purpose:
+            key = f"{key}-{purpose}"
+        return cls(get_cache_dir() / "stat-index" / f"{key}.json")
+
+    def digest_all(self, files: Sequence[DeployFile], kind: str, compute: Callable[[DeployFile], Dict[str, str]],
+                   workers: int = DEFAULT_SCAN_WORKERS, processes: bool = True,
+                   counts: Optional[DigestCounts] = None) -> Dict[str, Dict[str, str]]:
+        """Return {path: digests} for files, computing the ones missing `kind` in parallel
+
+        compute returns a dict of digest kinds that includes `kind`; every kind
+        it returns is cached. It must be picklable (a module-level function or a
+        bound method of a simple object) so it can be sent to a process pool.
+        hits and misses add up over every call on the index; pass counts to
+        also get the numbers for this call alone.
+        """
+        digests = {}
+        stale = []
+
+        with self.lock:
+            for file in files:
+                entry = self.entries.get(file.path)
+                if entry and entry.get("stat") == _stat_key(file) and kind in entry.get("digests", {}):
+                    digests[file.path] = dict(entry["digests"])
+                else:
+                    stale.append(file)
+            self.hits += len(files) - len(stale)
+            self.misses += len(stale)
+            if counts is not None:
+                counts.hits += len(files) - len(stale)
+                counts.misses += len(stale)
+
+        values = map_parallel(compute, stale, workers, processes)
+        now_ns = time.time_ns()
+
+        with self.lock:
+            for file, value in zip(stale, values):
+                digests[file.path] = value
+                entry = self.entries.get(file.path)
+                if not entry or entry.get("stat") != _stat_key(file):
+                    entry = {"stat": _stat_key(file), "digests": {}}
+                    self.entries[file.path] = entry
+                if now_ns - file.mtime_ns > self.RACY_WINDOW_NS:
+                    entry["digests"].update(value)
+                    self.dirty = True
+
+        return {file.path: digests[file.path] for file in files}
+
+    def prune(self, files: Iterable[DeployFile]) -> None:
+        """Forget paths that are no longer part of the site"""
+        keep = {file.path for file in files}
+        with self.lock:
+            for path in [path for path in self.entries if path not in keep]:
+                del self.entries[path]
+                self.dirty = True
+
+    def save(self) -> None:
+        """Write the index atomically if anything changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = temp_path(self.path)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": self.VERSION, "entries": self.entries}, f, separators=(",", ":"))
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except OSError as e:
+                print(f"⚠️  Warning: Failed to write stat index: {e}")
+
+
+def _stat_key(file: DeployFile) -> List[int]:
+    return [file.size, file.mtime_ns, file.inode]
+
+
+_shared_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def set_process_pool(executor: Optional[ProcessPoolExecutor]) -> None:
+    """Make map_parallel reuse one process pool instead of starting one per call (None to stop)"""
+    global _shared_process_pool
+    _shared_process_pool = executor
+
+
+def map_parallel(func: Callable[[T], R], items: Sequence[T], workers: int, processes: bool = True) -> List[R]:
+    """Map a CPU-bound function over items on a process (or thread) pool, keeping order"""
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    if processes and len(items) >= MIN_FILES_FOR_PROCESS_POOL:
+        chunksize = max(1, len(items) // (workers * 4))
+        if _shared_process_pool is not None:
+            return list(_shared_process_pool.map(func, items, chunksize=chunksize))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items, chunksize=chunksize))
+
+    # hashlib and zlib release the GIL on large buffers, so threads still scale
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+class IgnoreRules:
+    """Compiled exclude globs, matched against paths relative to the deploy directory
+
+    Syntax follows .gitignore loosely: a pattern without a slash matches a
+    file or directory name at any depth, a pattern containing a slash matches
+    the relative path from the root, and a trailing slash restricts it to
+    directories. Ignoring a directory prunes it before it is walked.
+    """
+
+    DEFAULT_PATTERNS = (
+        ".git", ".svn", ".hg", "node_modules", "*.map",
+        ".DS_Store", "Thumbs.db", "*~", "*.swp", "*.swo", ".#*", "#*#",
+        ".firebaseignore", ".cfignore",
+    )
+
+    def __init__(self, patterns: Iterable[str]):
+        name_patterns = {False: [], True: []}
+        path_patterns = {False: [], True: []}
+
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern:
+                continue
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            # A slash anywhere but at the end anchors the pattern to the root, a leading one included
+            anchored = "/" in pattern
+            pattern = pattern.lstrip("/")
+            if not pattern:
+                continue
+            if anchored:
+                path_patterns[dir_only].append(fnmatch.translate(pattern))
+            else:
+                name_patterns[dir_only].append(fnmatch.translate(pattern))
+
+        # Patterns without a trailing slash apply to files and directories alike
+        self.file_name = self._compile(name_patterns[False])
+        self.file_path = self._compile(path_patterns[False])
+        self.dir_name = self._compile(name_patterns[False] + name_patterns[True])
+        self.dir_path = self._compile(path_patterns[False] + path_patterns[True])
+
+    @staticmethod
+    def _compile(translated: List[str]) -> Optional["re.Pattern"]:
+        return re.compile("|".join(translated)) if translated else None
+
+    @classmethod
+    def for_directory(cls, deploy_dir: Path, ignore_file: Optional[str], exclude: Sequence[str] = (),
+                      default_excludes: bool = True) -> "IgnoreRules":
+        """Default patterns, then the directory's ignore file (if any), then CLI excludes"""
+        patterns = list(cls.DEFAULT_PATTERNS) if default_excludes else []
+
+        if ignore_file:
+            try:
+                with open(deploy_dir / ignore_file, "r", encoding="utf-8") as f:
+                    patterns.extend(line for line in f.read().splitlines() if not line.startswith("#"))
+            except OSError:
+                pass
+
+        patterns.extend(exclude)
+        return cls(patterns)
+
+    def matches(self, relative_path: str, name: str, is_dir: bool) -> bool:
+        """Whether a path (relative, forward slashes) should be skipped"""
+        name_regex = self.dir_name if is_dir else self.file_name
+        path_regex = self.dir_path if is_dir else self.file_path
+        return bool(
+            (name_regex and name_regex.match(name))
+            or (path_regex and path_regex.match(relative_path))
+        )
+
+    def excludes_file(self, relative_path: str) -> bool:
+        """Whether a file or any directory above it is skipped, for file lists scanned elsewhere"""
+        parts = relative_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.matches("/".join(parts[:depth]), parts[depth - 1], True):
+                return True
+        return self.matches(relative_path, parts[-1], False)
+
+
+def _scan_dir(directory: str, relative_dir: str,
+              ignore: Optional[IgnoreRules]) -> Tuple[List[Tuple[str, os.stat_result]], List[Tuple[str, str]], int]:
+    """List one directory: (file path, stat) pairs, (subdir, relative subdir) pairs and the ignored count"""
+    files = []
+    subdirs = []
+    ignored = 0
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                try:
+                    # Don't follow directory symlinks, they can loop
+                    if entry.is_dir(follow_symlinks=False):
+                        if ignore and ignore.matches(relative_path, entry.name, True):
+                            ignored += 1
+                        else:
+                            subdirs.append((entry.path, relative_path))
+                    elif entry.is_file():
+                        # Checked before stat() so ignored files cost nothing
+                        if ignore and ignore.matches(relative_path, entry.name, False):
+                            ignored += 1
+                        else:
+                            files.append((entry.path, entry.stat()))
+                except OSError as e:
+                    print(f"⚠️  Warning: Failed to read {entry.name}: {e}")
+    except OSError as e:
+        print(f"⚠️  Warning: Failed to read {directory}: {e}")
+    return files, subdirs, ignored
+
+
+def walk_files(root: str, workers: int = DEFAULT_SCAN_WORKERS,
+               ignore: Optional[IgnoreRules] = None) -> Tuple[List[Tuple[str, os.stat_result]], int]:
+    """Recursively list files under root, scanning directories concurrently
+
+    Returns the (path, stat) pairs found and the number of ignored entries.
+    """
+    found = []
+    ignored = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = {executor.submit(_scan_dir, root, "", ignore)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, skipped = future.result()
+                found.extend(files)
+                ignored += skipped
+                pending.update(
+                    executor.submit(_scan_dir, subdir, relative_subdir, ignore)
+                    for subdir, relative_subdir in subdirs
+                )
+    return found, ignored
+
+
+def read_files(deploy_dir: Path, max_file_size_mb: float, workers: int = DEFAULT_SCAN_WORKERS,
+               ignore: Optional[IgnoreRules] = None) -> List[DeployFile]:
+    """List the files under deploy_dir, sorted by path, without reading their content
+
+    The size limit is enforced from stat() data, so oversized files are never opened.
+    """
+    if not deploy_dir.is_dir():
+        raise FileNotFoundError(f"Deploy directory not found: {deploy_dir}")
+
+    root = str(deploy_dir.resolve())
+    prefix_len = len(os.path.join(root, ""))
+    max_size = max_file_size_mb * 1024 * 1024
+    files = []
+
+    found, ignored = walk_files(root, workers, ignore)
+    if ignored:
+        print(f"🙈 Skipped {ignored} ignored path(s)")
+
+    for file_path, stat in found:
+        if stat.st_size > max_size:
+            size_mb = stat.st_size / 1024 / 1024
+            name = os.path.basename(file_path)
+            print(f"⚠️  Warning: {name} is {size_mb:.2f}MB (limit: {max_file_size_mb}MB), skipping...")
+            continue
+
+        # Get relative path with leading slash
+        relative_path = "/" + file_path[prefix_len:].replace(os.sep, "/")
+
+        files.append(DeployFile(relative_path, Path(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ino))
+
+    files.sort(key=lambda file: file.path)
+    return files
+
+
+def select_files(files: Sequence[DeployFile], max_file_size_mb: float,
+                 ignore: Optional[IgnoreRules] = None) -> List[DeployFile]:
+    """Narrow an already scanned file list to one target's ignore rules and size limit"""
+    max_size = max_file_size_mb * 1024 * 1024
+    selected = []
+    ignored = 0
+
+    for file in files:
+        if ignore and ignore.excludes_file(file.path.lstrip("/")):
+            ignored += 1
+        elif file.size > max_size:
+            size_mb = file.size / 1024 / 1024
+            print(f"⚠️  Warning: {file.source.name} is {size_mb:.2f}MB (limit: {max_file_size_mb}MB), skipping...")
+        else:
+            selected.append(file)
+
+    if ignored:
+        print(f"🙈 Skipped {ignored} ignored path(s)")
+    return selected
+
+
+class DigestSet:
+    """Several digest functions run as one picklable callable
+
+    Computing every provider's digests in one task reads each file once from
+    disk; the later passes hit the page cache.
+    """
+
+    def __init__(self, *computes: Callable[[DeployFile], Dict[str, str]]):
+        self.computes = computes
+
+    def __call__(self, file: DeployFile) -> Dict[str, str]:
+        digests = {}
+        for compute in self.computes:
+            digests.update(compute(file))
+        return digests
+
+
+def content_digest(file: DeployFile) -> Dict[str, str]:
+    """SHA-256 of a file's content"""
+    return {"sha256": sha256_file(file.source)}
+
+
+def cloudflare_digest(file: DeployFile) -> Dict[str, str]:
+    """Cloudflare Pages asset key for a file"""
+    return {"cloudflare": base64_file_hash(file.source, file.extension)}
+
+
+def iter_file_chunks(source: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the raw bytes of a file in chunks"""
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def sha256_file(source: Path) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    for chunk in iter_file_chunks(source):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def base64_file(source: Path) -> str:
+    """Return the base64 encoding of a file"""
+    return b"".join(iter_base64_chunks(source)).decode("ascii")
+
+
+def iter_base64_chunks(source: Path) -> Iterator[bytes]:
+    """Yield the base64 encoding of a file in chunks"""
+    for chunk in iter_file_chunks(source):
+        yield base64.b64encode(chunk)
+
+
+def base64_size(size: int) -> int:
+    """Length of the base64 encoding of size bytes"""
+    return (size + 2) // 3 * 4
+
+
+def batch_files(files: Iterable[DeployFile], max_bytes: int, max_files: int) -> List[List[DeployFile]]:
+    """Split files into batches bounded by base64-encoded size and file count
+
+    A file larger than max_bytes gets a batch of its own.
+    """
+    batches = []
+    batch = []
+    batch_bytes = 0
+
+    for file in files:
+        file_bytes = base64_size(file.size)
+        if batch and (len(batch) >= max_files or batch_bytes + file_bytes > max_bytes):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(file)
+        batch_bytes += file_bytes
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def stream_base64_map(key: str, files: Iterable[DeployFile]) -> Iterator[bytes]:
+    """Stream {key: {path: base64 content, ...}} as a JSON request body
+
+    Only one chunk of one file is in memory at a time; base64 needs no JSON escaping.
+    """
+    yield b"{" + json.dumps(key).encode("utf-8") + b":{"
+    for index, file in enumerate(files):
+        if index:
+            yield b","
+        yield json.dumps(file.path).encode("utf-8") + b':"'
+        yield from iter_base64_chunks(file.source)
+        yield b'"'
+    yield b"}}"
+
+
+def base64_file_hash(source: Path, extension: str) -> str:
+    """Cloudflare Pages asset key: hash of base64 content plus extension, truncated to 32 hex chars"""
+    digest = hashlib.sha256()
+    for chunk in iter_base64_chunks(source):
+        digest.update(chunk)
+    digest.update(extension.encode("utf-8"))
+    return digest.hexdigest()[:32]
@@ -0,0 +1,72 @@
+"""
+Pre-compression stage for the deployment scripts
+
+Compressed artifacts are kept in a content-addressed cache keyed by the
+SHA-256 of the original content and the compression level, so an unchanged
+asset is compressed once and reused by every later deploy, even after a
+rebuild rewrites it with a new mtime.
+"""
+
+import os
+import gzip
+import uuid
+from pathlib import Path
+from typing import Dict
+
+from deploy_common import DeployFile, get_cache_dir, iter_file_chunks, sha256_file
+
+DEFAULT_GZIP_LEVEL = 9
+
+
+class CompressedCache:
+    """gzip artifacts stored under <cache>/compressed/gzip-<level>/<sha[:2]>/<sha>.gz
+
+    Instances only hold a path and a level, so their bound methods can be
+    handed to a process pool.
+    """
+
+    def __init__(self, root: Path, level: int = DEFAULT_GZIP_LEVEL):
+        self.root = root
+        self.level = level
+
+    @classmethod
+    def default(cls, level: int = DEFAULT_GZIP_LEVEL) -> "CompressedCache":
+        return cls(get_cache_dir() / "compressed", level)
+
+    @property
+    def kind(self) -> str:
+        """Digest kind of the compressed content, as stored in the stat index"""
+        return f"gzip-{self.level}"
+
+    def artifact_path(self, content_sha: str) -> Path:
+        return self.path_for(self.root, self.kind, content_sha)
+
+    @staticmethod
+    def path_for(root: Path, kind: str, content_sha: str) -> Path:
+        return root / kind / content_sha[:2] / f"{content_sha}.gz"
+
+    def ensure(self, source: Path, content_sha: str) -> Path:
+        """Return the cached artifact for content_sha, compressing source if it's missing"""
+        artifact = self.artifact_path(content_sha)
+        if artifact.exists():
+            return artifact
+
+        artifact.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = artifact.with_name(f"{artifact.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            # Fixed mtime and no filename so equal content always gzips to equal bytes
+            with open(tmp_path, "wb") as out, \
+                    gzip.GzipFile(filename="", fileobj=out, mode="wb", mtime=0, compresslevel=self.level) as gz:
+                for chunk in iter_file_chunks(source):
+                    gz.write(chunk)
+            os.replace(tmp_path, artifact)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return artifact
+
+    def digests(self, file: DeployFile) -> Dict[str, str]:
+        """Content SHA-256 and SHA-256 of the compressed artifact, compressing on a cache miss"""
+        content_sha = sha256_file(file.source)
+        artifact = self.ensure(file.source, content_sha)
+        return {"sha256": content_sha, self.kind: sha256_file(artifact)}
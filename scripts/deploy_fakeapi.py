@@ -0,0 +1,319 @@
+"""
+Local stand-in for the Firebase Hosting and Cloudflare Pages APIs
+
+Implements just enough of both APIs for the deploy scripts to run end to end
+against localhost: uploaded hashes are remembered so incremental deploys
+behave as they would against the real services, and request bodies are
+counted and discarded. Latency, per-connection bandwidth and a rate of
+injected 503 errors are configurable, which is what deploy-bench.py uses it
+for.
+
+Point the scripts at a running instance with the variables returned by
+FakeDeployAPI.environment() (FIREBASE_API_BASE, FIREBASE_HOSTING_API_BASE and
+CLOUDFLARE_API_BASE).
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIREBASE_PREFIX = "/firebase/v1beta1"
+HOSTING_PREFIX = "/hosting/v1beta1"
+HOSTING_UPLOAD_PREFIX = "/hosting/upload"
+CLOUDFLARE_PREFIX = "/cloudflare/client/v4"
+CLOUDFLARE_UPLOAD_PREFIX = "/cloudflare/direct-upload"
+STATS_PATH = "/_bench/stats"
+
+Route = Tuple[str, Pattern, Callable]
+
+
+class FakeDeployAPI:
+    """In-memory Firebase Hosting + Cloudflare Pages API served on 127.0.0.1"""
+
+    def __init__(self, latency_ms: float = 0, bandwidth_mbps: float = 0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        # Bytes per second per connection; 0 means unlimited
+        self.bandwidth = bandwidth_mbps * 1024 * 1024 / 8
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.routes = self._routes()
+        self.reset()
+
+    # Lifecycle
+
+    def start(self) -> "FakeDeployAPI":
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def environment(self) -> Dict[str, str]:
+        """Environment variables that point the deploy scripts at this server"""
+        return {
+            "FIREBASE_API_BASE": self.url + FIREBASE_PREFIX,
+            "FIREBASE_HOSTING_API_BASE": self.url + HOSTING_PREFIX,
+            "CLOUDFLARE_API_BASE": self.url + CLOUDFLARE_PREFIX,
+        }
+
+    def reset(self) -> None:
+        """Forget all uploaded content and zero the counters"""
+        with self.lock:
+            self.blobs = set()
+            self.versions: Dict[str, Dict[str, str]] = {}
+            self.configs: Dict[str, dict] = {}
+            self.channels: Dict[str, str] = {}
+            self.assets = set()
+            self.deployments: List[dict] = []
+            self.counters = {"requests": 0, "bytes": 0, "errors": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+    # Request handling
+
+    def handle(self, method: str, path: str, body: bytes, headers) -> Tuple[int, dict]:
+        if path == STATS_PATH:
+            return 200, self.stats()
+
+        with self.lock:
+            self.counters["requests"] += 1
+            self.counters["bytes"] += len(body)
+            inject_error = self.error_rate and self.random.random() < self.error_rate
+            if inject_error:
+                self.counters["errors"] += 1
+
+        if self.bandwidth:
+            time.sleep(len(body) / self.bandwidth)
+        if self.latency:
+            time.sleep(self.latency)
+        if inject_error:
+            return 503, {"error": {"code": 503, "message": "Injected failure"}}
+
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path)
+            if route_method == method and match:
+                return handler(match, query, body, headers)
+        return 404, {"error": {"code": 404, "message": f"No fake route for {method} {url.path}"}}
+
+    def _routes(self) -> List[Route]:
+        version = r"(projects/[^/]+/sites/[^/]+/versions/[^/:]+)"
+        site = r"projects/([^/]+)/sites/([^/]+)"
+        pages = r"accounts/([^/]+)/pages/projects"
+        return [
+            ("GET", re.compile(rf"{FIREBASE_PREFIX}/projects/([^/]+)"), self.firebase_project),
+            ("GET", re.compile(rf"{HOSTING_PREFIX}/{site}"), self.hosting_site),
+            ("POST", re.compile(rf"{HOSTING_PREFIX}/{site}/versions"), self.create_version),
+            ("POST", re.compile(rf"{HOSTING_PREFIX}/{site}/versions:clone"), self.clone_version),
+            ("POST", re.compile(rf"{HOSTING_PREFIX}/{version}:populateFiles"), self.populate_files),
+            ("POST", re.compile(rf"{HOSTING_UPLOAD_PREFIX}/{version}/([0-9a-f]+)"), self.upload_blob),
+            ("GET", re.compile(rf"{HOSTING_PREFIX}/{version}/files"), self.list_files),
+            ("GET", re.compile(rf"{HOSTING_PREFIX}/{version}"), self.get_version),
+            ("PATCH", re.compile(rf"{HOSTING_PREFIX}/{version}"), self.finalize_version),
+            ("GET", re.compile(rf"{HOSTING_PREFIX}/{site}/channels/([^/]+)"), self.get_channel),
+            ("POST", re.compile(rf"{HOSTING_PREFIX}/{site}(?:/channels/([^/]+))?/releases"), self.create_release),
+            ("GET", re.compile(rf"{CLOUDFLARE_PREFIX}/{pages}/([^/]+)"), self.pages_project),
+            ("POST", re.compile(rf"{CLOUDFLARE_PREFIX}/{pages}"), self.pages_project),
+            ("GET", re.compile(rf"{CLOUDFLARE_PREFIX}/{pages}/([^/]+)/upload-token"), self.upload_token),
+            ("POST", re.compile(rf"{CLOUDFLARE_PREFIX}/pages/assets/check-missing"), self.check_missing),
+            ("POST", re.compile(rf"{CLOUDFLARE_PREFIX}/pages/assets/upload"), self.upload_assets),
+            ("POST", re.compile(rf"{CLOUDFLARE_PREFIX}/pages/assets/upsert-hashes"), self.ok),
+            ("POST", re.compile(rf"{CLOUDFLARE_PREFIX}/{pages}/([^/]+)/deployments"), self.create_deployment),
+            ("GET", re.compile(rf"{CLOUDFLARE_PREFIX}/{pages}/([^/]+)/deployments"), self.list_deployments),
+            ("POST", re.compile(rf"{CLOUDFLARE_UPLOAD_PREFIX}/([^/]+)"), self.ok),
+        ]
+
+    # Firebase Hosting
+
+    def firebase_project(self, match, query, body, headers):
+        return 200, {"projectId": match.group(1)}
+
+    def hosting_site(self, match, query, body, headers):
+        return 200, {"name": f"projects/{match.group(1)}/sites/{match.group(2)}"}
+
+    def _new_version(self, project: str, site: str, files: Dict[str, str], config: dict) -> str:
+        with self.lock:
+            # Unique like real version IDs, so per-version caches never mix up two servers' versions
+            name = f"projects/{project}/sites/{site}/versions/{uuid.uuid4().hex[:16]}"
+            self.versions[name] = files
+            self.configs[name] = config
+        return name
+
+    def create_version(self, match, query, body, headers):
+        name = self._new_version(match.group(1), match.group(2), {}, json.loads(body or b"{}").get("config", {}))
+        return 200, {"name": name, "status": "CREATED"}
+
+    def get_version(self, match, query, body, headers):
+        with self.lock:
+            config = self.configs.get(match.group(1))
+        if config is None:
+            return 404, {"error": {"code": 404, "message": "Version not found"}}
+        return 200, {"name": match.group(1), "config": config}
+
+    def clone_version(self, match, query, body, headers):
+        request = json.loads(body)
+        excludes = [re.compile(regex) for regex in request.get("exclude", {}).get("regexes", [])]
+        with self.lock:
+            source = dict(self.versions.get(request["sourceVersion"], {}))
+            config = self.configs.get(request["sourceVersion"], {})
+        files = {path: file_hash for path, file_hash in source.items() if not any(r.search(path) for r in excludes)}
+        name = self._new_version(match.group(1), match.group(2), files, config)
+        return 200, {"name": f"{name}/operations/clone", "done": True, "response": {"name": name}}
+
+    def populate_files(self, match, query, body, headers):
+        files = json.loads(body).get("files", {})
+        with self.lock:
+            self.versions.setdefault(match.group(1), {}).update(files)
+            required = sorted({file_hash for file_hash in files.values() if file_hash not in self.blobs})
+        upload_url = f"{self.url}{HOSTING_UPLOAD_PREFIX}/{match.group(1)}"
+        return 200, {"uploadRequiredHashes": required, "uploadUrl": upload_url}
+
+    def upload_blob(self, match, query, body, headers):
+        with self.lock:
+            self.blobs.add(match.group(2))
+        return 200, {}
+
+    def list_files(self, match, query, body, headers):
+        with self.lock:
+            files = sorted(self.versions.get(match.group(1), {}).items())
+        start = int(query.get("pageToken") or 0)
+        size = int(query.get("pageSize") or 1000)
+        page = {"files": [{"path": path, "hash": file_hash, "status": "ACTIVE"}
+                          for path, file_hash in files[start:start + size]]}
+        if start + size < len(files):
+            page["nextPageToken"] = str(start + size)
+        return 200, page
+
+    def finalize_version(self, match, query, body, headers):
+        if "config" in query.get("update_mask", "").split(","):
+            with self.lock:
+                self.configs[match.group(1)] = json.loads(body).get("config", {})
+        return 200, {"name": match.group(1), "status": "FINALIZED"}
+
+    def get_channel(self, match, query, body, headers):
+        with self.lock:
+            released = self.channels.get(f"{match.group(2)}/{match.group(3)}")
+        if not released:
+            return 404, {"error": {"code": 404, "message": "Channel not found"}}
+        return 200, {"name": match.group(3), "release": {"version": {"name": released}}}
+
+    def create_release(self, match, query, body, headers):
+        channel = match.group(3) or "live"
+        with self.lock:
+            self.channels[f"{match.group(2)}/{channel}"] = query.get("versionName", "")
+        return 200, {"name": f"projects/{match.group(1)}/sites/{match.group(2)}/releases/{int(time.time() * 1000)}"}
+
+    # Cloudflare Pages
+
+    def pages_project(self, match, query, body, headers):
+        return 200, {"success": True, "result": {"name": match.group(2) if match.lastindex > 1 else ""}}
+
+    def upload_token(self, match, query, body, headers):
+        return 200, {"success": True, "result": {"jwt": "fake-jwt"}}
+
+    def check_missing(self, match, query, body, headers):
+        hashes = json.loads(body).get("hashes", [])
+        with self.lock:
+            missing = [file_hash for file_hash in hashes if file_hash not in self.assets]
+        return 200, {"success": True, "result": missing}
+
+    def upload_assets(self, match, query, body, headers):
+        keys = [item["key"] for item in json.loads(body)]
+        with self.lock:
+            self.assets.update(keys)
+        return 200, {"success": True, "result": {"successful_key_count": len(keys)}}
+
+    def create_deployment(self, match, query, body, headers):
+        # JSON for inline deploys, a multipart form with a branch field otherwise
+        branch = re.search(rb'name="branch"\r\n\r\n([^\r]*)', body)
+        if branch:
+            branch = branch.group(1).decode("utf-8")
+        else:
+            branch = json.loads(body or b"{}").get("branch", "main")
+        with self.lock:
+            deployment_id = str(uuid.uuid4())
+            self.deployments.append({
+                "id": deployment_id,
+                "project": f"{match.group(1)}/{match.group(2)}",
+                "deployment_trigger": {"metadata": {"branch": branch}},
+                "latest_stage": {"name": "deploy", "status": "success"},
+            })
+        return 200, {"success": True, "result": {
+            "id": deployment_id,
+            "url": f"https://{deployment_id}.{match.group(2)}.pages.dev",
+            "upload_url": f"{self.url}{CLOUDFLARE_UPLOAD_PREFIX}/{deployment_id}",
+        }}
+
+    def list_deployments(self, match, query, body, headers):
+        with self.lock:
+            deployments = [deployment for deployment in reversed(self.deployments)
+                           if deployment["project"] == f"{match.group(1)}/{match.group(2)}"]
+        page = int(query.get("page") or 1)
+        per_page = int(query.get("per_page") or 25)
+        total_pages = max(1, -(-len(deployments) // per_page))
+        return 200, {
+            "success": True,
+            "result": deployments[(page - 1) * per_page:page * per_page],
+            "result_info": {"page": page, "per_page": per_page, "count": len(deployments), "total_pages": total_pages},
+        }
+
+    def ok(self, match, query, body, headers):
+        return 200, {"success": True, "result": {}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this every reply waits on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers up to the blank line
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def dispatch(self) -> None:
+        body = self.read_body()
+        status, payload = self.server.api.handle(self.command, self.path, body, self.headers)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = dispatch
@@ -0,0 +1,128 @@
+"""
+Checkpoint journal for resumable deploys
+
+The journal is an append-only JSON-lines file: every confirmed step (version
+created, batch populated, blob uploaded) is appended as one small record, so
+checkpointing costs O(1) per step even on 10k-file deploys. Loading replays
+the records in order. The journal is removed once a deploy completes.
+"""
+
+import os
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Set
+
+from deploy_common import get_cache_dir
+
+
+class DeployJournal:
+    """Replayable record of what a deploy has confirmed so far
+
+    Three kinds of records are kept:
+      - set:    top-level fields (version name, stage, ...)
+      - update: merges a mapping into a named dict (e.g. path -> hash populated)
+      - extend: adds items to a named set (e.g. hashes uploaded)
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.fields: Dict[str, Any] = {}
+        self.maps: Dict[str, Dict[str, Any]] = {}
+        self.sets: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def for_target(cls, provider: str, *key_parts: str) -> "DeployJournal":
+        """Journal for one deploy target, e.g. ("firebase", project, channel)"""
+        name = "-".join(part.replace("/", "_") for part in (provider,) + key_parts)
+        return cls(get_cache_dir() / "journals" / f"{name}.jsonl")
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def open(self, deploy_dir: Path, resume: bool) -> bool:
+        """Start a journal for deploy_dir, resuming the previous one if asked to
+
+        Returns True when earlier progress was loaded.
+        """
+        deploy_dir = str(deploy_dir.resolve())
+
+        if resume and self._replay() and self.fields.get("deploy_dir") == deploy_dir:
+            return True
+
+        self.fields, self.maps, self.sets = {}, {}, {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+        self.set(deploy_dir=deploy_dir, started_at=time.time())
+        return False
+
+    def _replay(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+        except OSError:
+            return False
+
+        valid_bytes = 0
+        for line in lines:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("Unterminated record")
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from an interrupted write; everything before it holds. Cut it off,
+                # or the next record appended would share its line and be lost on the following replay.
+                with open(self.path, "r+b") as f:
+                    f.truncate(valid_bytes)
+                break
+            self._apply(record)
+            valid_bytes += len(line)
+        return bool(self.fields)
+
+    def _apply(self, record: dict) -> None:
+        op = record.get("op")
+        if op == "set":
+            self.fields.update(record["fields"])
+        elif op == "update":
+            self.maps.setdefault(record["key"], {}).update(record["values"])
+        elif op == "extend":
+            self.sets.setdefault(record["key"], set()).update(record["values"])
+
+    def _append(self, record: dict) -> None:
+        with self.lock:
+            self._apply(record)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def set(self, **fields: Any) -> None:
+        self._append({"op": "set", "fields": fields})
+
+    def update(self, key: str, values: Dict[str, Any]) -> None:
+        if values:
+            self._append({"op": "update", "key": key, "values": values})
+
+    def extend(self, key: str, values: Iterable[str]) -> None:
+        values = list(values)
+        if values:
+            self._append({"op": "extend", "key": key, "values": values})
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self.fields.get(field, default)
+
+    def mapping(self, key: str) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.maps.get(key, {}))
+
+    def items(self, key: str) -> Set[str]:
+        with self.lock:
+            return set(self.sets.get(key, set()))
+
+    def clear(self) -> None:
+        """Drop the journal after a completed deploy"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,218 @@
+"""
+Instrumentation for the deployment scripts
+
+A DeployMetrics instance collects phase timings, request latencies, retry
+and byte counters for one deploy. It is made current for the duration of the
+deploy through a context variable, which run_parallel copies into its worker
+threads, so the shared HTTP session can attribute every request to the right
+deploy and phase even when several deploys share one session.
+
+Results are written as a JSON summary (--metrics-json) and optionally as a
+Chrome trace-event file (--trace) that chrome://tracing or Perfetto can open.
+"""
+
+import os
+import sys
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Upper bounds of the request latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Minimum seconds between two progress lines
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+current_metrics: contextvars.ContextVar = contextvars.ContextVar("deploy_metrics", default=None)
+_current_phase: contextvars.ContextVar = contextvars.ContextVar("deploy_phase", default="other")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB"""
+    # On Linux ru_maxrss survives exec, so a child process would report its
+    # parent's peak; VmHWM belongs to the current address space only
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class DeployMetrics:
+    """Phase spans, request latencies and counters for one deploy"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+        self.counters: Dict[str, int] = {}
+        self.latencies: Dict[str, List[float]] = {}
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["DeployMetrics"]:
+        """Make this the deploy that requests and spans on this thread are recorded for"""
+        token = current_metrics.set(self)
+        try:
+            yield self
+        finally:
+            current_metrics.reset(token)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        """Time a block; requests made inside it are attributed to the span's name"""
+        token = _current_phase.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _current_phase.reset(token)
+            with self.lock:
+                self.spans.append({
+                    "name": name, "start": start - self.started, "seconds": end - start,
+                    "thread": threading.get_ident(), "args": args,
+                })
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_request(self, method: str, seconds: float, sent_bytes: int) -> None:
+        key = f"{method} {_current_phase.get()}"
+        with self.lock:
+            self.latencies.setdefault(key, []).append(seconds)
+            self.counters["requests"] = self.counters.get("requests", 0) + 1
+            self.counters["bytes_sent"] = self.counters.get("bytes_sent", 0) + sent_bytes
+
+    def count_stream(self, chunks: Iterable) -> Iterator:
+        """Pass a streamed request body through, counting its bytes as sent"""
+        for chunk in chunks:
+            self.count("bytes_sent", len(chunk))
+            yield chunk
+
+    def summary(self) -> dict:
+        """Everything recorded so far as a JSON-serialisable dict"""
+        with self.lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+            latencies = {key: sorted(values) for key, values in self.latencies.items()}
+
+        phases: Dict[str, dict] = {}
+        for span in spans:
+            entry = phases.setdefault(span["name"], {"seconds": 0.0, "calls": 0})
+            entry["seconds"] = round(entry["seconds"] + span["seconds"], 6)
+            entry["calls"] += 1
+
+        requests = {}
+        for key, values in latencies.items():
+            buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for value in values:
+                index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if value * 1000 <= bound),
+                             len(LATENCY_BUCKETS_MS))
+                buckets[index] += 1
+            requests[key] = {
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 0.5) * 1000, 3),
+                "p90_ms": round(_percentile(values, 0.9) * 1000, 3),
+                "p99_ms": round(_percentile(values, 0.99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+                "histogram_ms": dict(zip([f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"], buckets)),
+            }
+
+        hits, misses = counters.get("stat_index_hits", 0), counters.get("stat_index_misses", 0)
+        return {
+            "seconds": round(time.perf_counter() - self.started, 6),
+            "phases": phases,
+            "batches": [dict(span["args"], phase=span["name"], seconds=round(span["seconds"], 6))
+                        for span in spans if span["args"]],
+            "requests": requests,
+            "counters": counters,
+            "stat_index_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+    def write_json(self, path: str, **extra) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(extra, **self.summary()), f, indent=2)
+
+    def write(self, metrics_json: Optional[str] = None, trace: Optional[str] = None, **extra) -> None:
+        """Write the JSON summary and/or trace file, whichever paths are given"""
+        if metrics_json:
+            self.write_json(metrics_json, **extra)
+            print(f"📊 Metrics written to {metrics_json}")
+        if trace:
+            self.write_trace(trace)
+            print(f"📊 Trace written to {trace}")
+
+    def write_trace(self, path: str) -> None:
+        """Write spans in Chrome trace-event format"""
+        with self.lock:
+            spans = list(self.spans)
+        events = [{
+            "name": span["name"], "ph": "X", "pid": os.getpid(), "tid": span["thread"],
+            "ts": round(span["start"] * 1_000_000), "dur": round(span["seconds"] * 1_000_000),
+            "args": span["args"],
+        } for span in spans]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def phase(name: str) -> Callable:
+    """Decorator timing a deployer method as a span of self.metrics
+
+    The deployer's metrics are made current for the call, so requests are
+    attributed to it even when a caller such as the fan-out script invokes
+    single methods rather than deploy().
+    """
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            with self.metrics.activate(), self.metrics.span(name):
+                return method(self, *args, **kwargs)
+        return timed
+    return decorate
+
+
+class Progress:
+    """Thread-safe progress counter that prints at most one line every few seconds"""
+
+    def __init__(self, label: str, total: int, total_bytes: Optional[int] = None,
+                 interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.label = label
+        self.total = total
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.done = 0
+        self.done_bytes = 0
+        self.lock = threading.Lock()
+        self.last_printed = time.monotonic()
+
+    def advance(self, count: int = 1, nbytes: int = 0) -> None:
+        with self.lock:
+            self.done += count
+            self.done_bytes += nbytes
+            now = time.monotonic()
+            if self.done < self.total and now - self.last_printed < self.interval:
+                return
+            self.last_printed = now
+            line = f"   {self.label} {self.done}/{self.total} ({self.done * 100 // max(self.total, 1)}%)"
+            if self.total_bytes is not None:
+                line += f", {self.done_bytes / 1024 / 1024:.1f}/{self.total_bytes / 1024 / 1024:.1f} MB"
+            print(line)
@@ -0,0 +1,406 @@
+"""
+Minification stage for the deployment scripts
+
+HTML, CSS and JavaScript are minified conservatively, without third-party
+tools:
+- CSS: comments are removed and whitespace is collapsed.
+- JavaScript: comments are removed and whitespace is collapsed, but line
+  breaks are kept, so automatic semicolon insertion behaves as before.
+- HTML: runs of whitespace between and inside tags are collapsed. Inline
+  <style> and <script> blocks are minified the same way; <pre> and <textarea>
+  are left alone. Comments are kept unless comment stripping is asked for:
+  server-rendered React and Vue pages, SSI and Knockout templates carry
+  markers in them.
+License comments (/*! ... */) are kept. A file the minifier cannot take
+apart is deployed unchanged.
+
+Results are cached under <cache>/optimized/v<OPTIMIZER_VERSION>/ by the
+SHA-256 of the input, so an unchanged file is minified once. Bump
+OPTIMIZER_VERSION whenever the output of a minifier changes.
+"""
+
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from deploy_common import (
+    DEFAULT_SCAN_WORKERS, DeployFile, StatIndex, content_digest, get_cache_dir, map_parallel, temp_path
+)
+
+OPTIMIZER_VERSION = 2
+# Extension -> minifier
+OPTIMIZE_KINDS = {"html": "html", "htm": "html", "css": "css", "js": "js", "mjs": "js"}
+
+_CSS_TOKEN = re.compile(r"""
+    (?P<comment>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<url>url\(\s*(?:"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[^)]*)\s*\))
+  | (?P<space>\s+)
+  | (?P<punct>[{};,:>])
+  | (?P<word>(?:(?!url\()[^\s"'/{};,:>])+|.)
+""", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+# No space is needed after these CSS tokens, or before the ones in _CSS_TIGHT_BEFORE
+_CSS_TIGHT_AFTER = set("{};,:>")
+_CSS_TIGHT_BEFORE = set("{};,>)")
+
+_JS_WORD = re.compile(r"[A-Za-z0-9_$\\\x80-\U0010ffff]+")
+_JS_WORD_CHAR = re.compile(r"[A-Za-z0-9_$\\\x80-\U0010ffff]")
+# After these words a / starts a regular expression rather than a division
+_JS_REGEX_AFTER_WORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else",
+    "yield", "await",
+}
+# A line break after these characters, or before "}", can go without changing how the code parses
+_JS_NO_BREAK_AFTER = set("{;,")
+
+_HTML_TOKEN = re.compile(r"""
+    (?P<comment><!--.*?(?:-->|\Z))
+  | (?P<raw><(?P<raw_name>script|style|pre|textarea)\b(?:"[^"]*"|'[^']*'|[^'">])*>.*?(?:</(?P=raw_name)\s*>|\Z))
+  | (?P<tag></?[a-zA-Z!?](?:"[^"]*"|'[^']*'|[^'">])*>)
+  | (?P<text>[^<]+|<)
+""", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+_HTML_RAW = re.compile(r"(<(\w+)\b(?:\"[^\"]*\"|'[^']*'|[^'\">])*>)(.*?)(</\2\s*>|\Z)", re.DOTALL | re.IGNORECASE)
+_TAG_SPACE = re.compile(r"(\"[^\"]*\"|'[^']*')|\s*=\s*|\s+")
+_SCRIPT_TYPE = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+_JS_TYPES = {"text/javascript", "application/javascript", "module", "text/ecmascript"}
+
+
+class MinifyError(Exception):
+    pass
+
+
+def minify_css(text: str) -> str:
+    out: List[str] = []
+    space = False
+    for match in _CSS_TOKEN.finditer(text):
+        kind, value = match.lastgroup, match.group()
+        if kind == "comment" and not value.startswith("/*!"):
+            kind = "space"
+        if kind == "space":
+            space = bool(out)
+            continue
+        if space and out[-1][-1] not in _CSS_TIGHT_AFTER and value[0] not in _CSS_TIGHT_BEFORE:
+            out.append(" ")
+        space = False
+        if value == "}" and out and out[-1] == ";":
+            out.pop()
+        out.append(value)
+    return "".join(out)
+
+
+def _skip_string(text: str, i: int) -> int:
+    """Index after the string literal starting at text[i]"""
+    quote = text[i]
+    i += 1
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == "\n":
+            break
+        i += 1
+    raise MinifyError("Unterminated string")
+
+
+def _skip_template(text: str, i: int) -> int:
+    """Index after the template literal starting at text[i], nested ${...} included"""
+    i += 1
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+        elif char == "`":
+            return i + 1
+        elif text.startswith("${", i):
+            i = _skip_code(text, i + 2)
+        else:
+            i += 1
+    raise MinifyError("Unterminated template literal")
+
+
+def _skip_code(text: str, i: int) -> int:
+    """Index after the "}" closing a template substitution that starts at text[i]"""
+    depth = 0
+    while i < len(text):
+        char = text[i]
+        if char in "\"'":
+            i = _skip_string(text, i)
+            continue
+        if char == "`":
+            i = _skip_template(text, i)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    raise MinifyError("Unterminated template substitution")
+
+
+def _skip_regex(text: str, i: int) -> int:
+    """Index after the regular expression literal (flags included) starting at text[i]"""
+    i += 1
+    in_class = False
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            break
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(text) and _JS_WORD_CHAR.match(text[i]):
+                i += 1
+            return i
+        i += 1
+    raise MinifyError("Unterminated regular expression")
+
+
+def minify_js(text: str) -> str:
+    out: List[str] = []
+    # Pending whitespace: None, " " or "\n"
+    gap: Optional[str] = None
+    # Last significant token, to tell a regular expression from a division
+    previous = ""
+    i = 0
+    if text.startswith("#!"):
+        end = text.find("\n")
+        end = len(text) if end < 0 else end
+        out.append(text[:end])
+        gap = "\n"
+        i = end
+
+    while i < len(text):
+        char = text[i]
+        if char.isspace():
+            end = i
+            while end < len(text) and text[end].isspace():
+                end += 1
+            if out:
+                gap = "\n" if "\n" in text[i:end] or gap == "\n" else " "
+            i = end
+            continue
+
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end < 0 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                raise MinifyError("Unterminated comment")
+            end += 2
+            comment = text[i:end]
+            if comment.startswith("/*!"):
+                token = comment
+            else:
+                if out:
+                    gap = "\n" if "\n" in comment or gap == "\n" else (gap or " ")
+                i = end
+                continue
+        elif char in "\"'":
+            end = _skip_string(text, i)
+            token = text[i:end]
+        elif char == "`":
+            end = _skip_template(text, i)
+            token = text[i:end]
+        elif char == "/" and (not previous or previous in _JS_REGEX_AFTER_WORDS
+                              or (not _JS_WORD_CHAR.match(previous[-1]) and previous[-1] not in ")]}\"'`"
+                                  and previous not in ("++", "--"))):
+            end = _skip_regex(text, i)
+            token = text[i:end]
+        elif text.startswith(("++", "--"), i):
+            # A / after a postfix increment is a division
+            token = text[i:i + 2]
+            end = i + 2
+        else:
+            word = _JS_WORD.match(text, i)
+            token = word.group() if word else char
+            end = i + len(token)
+        i = end
+
+        if gap and out:
+            last, first = out[-1][-1], token[0]
+            if gap == "\n":
+                if last not in _JS_NO_BREAK_AFTER and first != "}":
+                    out.append("\n")
+            elif ((_JS_WORD_CHAR.match(last) and _JS_WORD_CHAR.match(first))
+                  or (last in "+-" and first in "+-") or (last == "/" and first == "/")
+                  or (last.isdigit() and first == ".")):
+                out.append(" ")
+        gap = None
+        out.append(token)
+        if not token.startswith("/*"):
+            previous = token
+    return "".join(out)
+
+
+def _minify_tag(tag: str) -> str:
+    tag = _TAG_SPACE.sub(lambda match: match.group(1) or ("=" if "=" in match.group() else " "), tag)
+    return re.sub(r"\s+(/?>)$", r"\1", tag)
+
+
+def minify_html(text: str, strip_comments: bool = False) -> str:
+    out: List[str] = []
+    for match in _HTML_TOKEN.finditer(text):
+        kind, value = match.lastgroup, match.group()
+        if kind == "comment":
+            # Conditional comments carry markup for old browsers
+            if not strip_comments or value.startswith(("<!--[if", "<!--<![endif]", "<!--!")):
+                out.append(value)
+        elif kind == "raw":
+            out.append(_minify_raw(value))
+        elif kind == "tag":
+            out.append(_minify_tag(value))
+        else:
+            value = re.sub(r"\s+", lambda space: "\n" if "\n" in space.group() else " ", value)
+            # Whitespace left on both sides of a removed comment
+            if value.isspace() and out and out[-1].isspace():
+                out[-1] = "\n" if "\n" in out[-1] + value else " "
+            else:
+                out.append(value)
+    return "".join(out)
+
+
+def _minify_raw(block: str) -> str:
+    """A <script>, <style>, <pre> or <textarea> element; only the first two are minified"""
+    match = _HTML_RAW.match(block)
+    if not match:
+        return block
+    open_tag, name, body, close_tag = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+    try:
+        if name == "style":
+            body = minify_css(body)
+        elif name == "script" and "src=" not in open_tag.lower():
+            script_type = _SCRIPT_TYPE.search(open_tag)
+            if not script_type or script_type.group(1).lower() in _JS_TYPES:
+                body = minify_js(body)
+    except MinifyError:
+        pass
+    if name in ("style", "script"):
+        open_tag = _minify_tag(open_tag)
+    return open_tag + body + close_tag
+
+
+MINIFIERS = {"html": minify_html, "css": minify_css, "js": minify_js}
+
+
+def optimize_file(item: Tuple[str, str, str, bool]) -> None:
+    """Minify source into target; the original is copied when it cannot be minified
+
+    Takes one (source, kind, target, strip_html_comments) tuple so it can be
+    mapped over a process pool.
+    """
+    source, kind, target, strip_html_comments = item
+    data = Path(source).read_bytes()
+    try:
+        text = data.decode("utf-8", errors="surrogateescape")
+        text = minify_html(text, strip_html_comments) if kind == "html" else MINIFIERS[kind](text)
+        data = text.encode("utf-8", errors="surrogateescape")
+    except (MinifyError, RecursionError):
+        pass
+
+    target_path = Path(target)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path(target_path)
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, target_path)
+
+
+class Optimizer:
+    """Minify the HTML, CSS and JavaScript of one deploy directory through the result cache"""
+
+    def __init__(self, deploy_dir: Path, workers: int = DEFAULT_SCAN_WORKERS, processes: bool = True,
+                 strip_html_comments: bool = False):
+        self.workers = workers
+        self.processes = processes
+        self.strip_html_comments = strip_html_comments
+        # Input hashes are kept apart from the index of the deployed (minified) files
+        self.stat_index = StatIndex.for_directory(deploy_dir, "optimize")
+        self.cache_root = get_cache_dir() / "optimized"
+        self.cache_dir = self.cache_root / f"v{OPTIMIZER_VERSION}"
+
+    @staticmethod
+    def kind(file: DeployFile) -> Optional[str]:
+        name = file.path.lower()
+        if name.endswith((".min.js", ".min.css")):
+            return None
+        return OPTIMIZE_KINDS.get(file.extension.lower())
+
+    def artifact_path(self, sha: str, kind: str, extension: str) -> Path:
+        # HTML minified with and without its comments is cached apart
+        if kind == "html" and self.strip_html_comments:
+            sha += "-nocomments"
+        return self.cache_dir / sha[:2] / f"{sha}.{extension}"
+
+    def run(self, files: Sequence[DeployFile]) -> Tuple[List[DeployFile], Dict[str, List[int]]]:
+        """Return files with minified sources swapped in, and [files, bytes before, bytes after] per kind"""
+        candidates = [file for file in files if self.kind(file)]
+        digests = self.stat_index.digest_all(candidates, "sha256", content_digest, self.workers, self.processes)
+        self.stat_index.prune(candidates)
+        self.stat_index.save()
+        self.remove_old_versions()
+
+        artifacts = {
+            file.path: self.artifact_path(digests[file.path]["sha256"], self.kind(file), file.extension.lower())
+            for file in candidates
+        }
+        pending = {}
+        for file in candidates:
+            if not artifacts[file.path].exists():
+                pending[str(artifacts[file.path])] = (
+                    str(file.source), self.kind(file), str(artifacts[file.path]), self.strip_html_comments
+                )
+        map_parallel(optimize_file, list(pending.values()), self.workers, self.processes)
+
+        optimized = {}
+        report: Dict[str, List[int]] = {}
+        for file in candidates:
+            stat = artifacts[file.path].stat()
+            totals = report.setdefault(self.kind(file), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += file.size
+            if stat.st_size < file.size:
+                optimized[file.path] = DeployFile(
+                    file.path, artifacts[file.path], stat.st_size, stat.st_mtime_ns, stat.st_ino
+                )
+                totals[2] += stat.st_size
+            else:
+                totals[2] += file.size
+
+        return [optimized.get(file.path, file) for file in files], report
+
+    def remove_old_versions(self) -> None:
+        """Drop results of earlier optimizer versions, which are never read again"""
+        if not self.cache_root.is_dir():
+            return
+        for entry in self.cache_root.iterdir():
+            if entry.is_dir() and entry != self.cache_dir:
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+def optimize_files(files: Sequence[DeployFile], deploy_dir: Path, workers: int = DEFAULT_SCAN_WORKERS,
+                   processes: bool = True,
+                   strip_html_comments: bool = False) -> Tuple[List[DeployFile], Dict[str, List[int]]]:
+    """Minify HTML, CSS and JavaScript, printing the bytes saved per file type"""
+    print("✨ Optimizing HTML, CSS and JavaScript...")
+    files, report = Optimizer(deploy_dir, workers, processes, strip_html_comments).run(files)
+
+    saved = sum(before - after for _, before, after in report.values())
+    print(f"✅ Saved {saved / 1024:.2f} KB")
+    for kind, (count, before, after) in sorted(report.items()):
+        percent = (before - after) * 100 / before if before else 0
+        print(f"   {kind}: {count} file(s), {before / 1024:.2f} KB → {after / 1024:.2f} KB (-{percent:.1f}%)")
+    return files, report
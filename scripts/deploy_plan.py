@@ -0,0 +1,154 @@
+"""
+Deploy plans for the deployment scripts
+
+A plan compares the local path -> hash map with the file listing of what is
+live on the target and sorts every path into added, changed, unchanged or
+deleted. A plan with no changes is a no-op and the deploy is skipped.
+
+Listings of live versions are cached per version (Firebase) or deployment
+(Cloudflare) ID. Both are immutable once released, so a cached listing never
+goes stale, and the next plan against the same version needs no API calls.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from deploy_common import DeployFile, temp_path
+
+# Listings kept per target; the oldest are dropped first
+MAX_CACHED_LISTINGS = 20
+# Paths printed per category by a dry run; the JSON plan lists all of them
+MAX_PRINTED_PATHS = 50
+
+
+@dataclass
+class DeployPlan:
+    """What a deploy changes on the target"""
+
+    provider: str
+    target: str  # Firebase channel or Cloudflare branch
+    base: Optional[str]  # Live version or deployment the plan is against, None if nothing is live
+    remote_known: bool  # False when the live files could not be listed; everything counts as added
+    config_changed: bool
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    sizes: Dict[str, int] = field(default_factory=dict)  # Local path -> size
+
+    @property
+    def no_op(self) -> bool:
+        return self.remote_known and not (self.added or self.changed or self.deleted or self.config_changed)
+
+    def total_bytes(self, paths: Sequence[str]) -> int:
+        return sum(self.sizes.get(path, 0) for path in paths)
+
+    def summary(self) -> dict:
+        """The plan as JSON-serializable data"""
+        return {
+            "provider": self.provider,
+            "target": self.target,
+            "base": self.base,
+            "remote_known": self.remote_known,
+            "no_op": self.no_op,
+            "config_changed": self.config_changed,
+            "totals": {
+                "added": {"files": len(self.added), "bytes": self.total_bytes(self.added)},
+                "changed": {"files": len(self.changed), "bytes": self.total_bytes(self.changed)},
+                "unchanged": {"files": len(self.unchanged), "bytes": self.total_bytes(self.unchanged)},
+                "deleted": {"files": len(self.deleted)},
+            },
+            "added": self.added,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+        }
+
+    def print_summary(self, list_paths: bool = False) -> None:
+        if not self.base:
+            print(f"📋 Nothing deployed to {self.target} yet, every file is new")
+        elif not self.remote_known:
+            print(f"📋 Files of {self.base} are unknown here, planning as if nothing were live")
+        print(f"📋 {len(self.added)} added ({self.total_bytes(self.added) / 1024:.2f} KB), "
+              f"{len(self.changed)} changed ({self.total_bytes(self.changed) / 1024:.2f} KB), "
+              f"{len(self.unchanged)} unchanged ({self.total_bytes(self.unchanged) / 1024:.2f} KB), "
+              f"{len(self.deleted)} deleted")
+        if self.config_changed and self.base:
+            print("📋 Header policy changed")
+
+        if list_paths:
+            for marker, paths in (("+", self.added), ("~", self.changed), ("-", self.deleted)):
+                for path in paths[:MAX_PRINTED_PATHS]:
+                    print(f"   {marker} {path}")
+                if len(paths) > MAX_PRINTED_PATHS:
+                    print(f"   {marker} ... and {len(paths) - MAX_PRINTED_PATHS} more")
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"📋 Plan written to {path}")
+
+
+def plan_changes(provider: str, target: str, base: Optional[str], files: Sequence[DeployFile],
+                 hashes: Dict[str, str], remote: Optional[Dict[str, str]], config_changed: bool) -> DeployPlan:
+    """Sort local files against the live listing (None when it is unknown)"""
+    plan = DeployPlan(provider, target, base, remote is not None or base is None, config_changed,
+                      sizes={file.path: file.size for file in files})
+    remote = remote or {}
+    for file in files:
+        if file.path not in remote:
+            plan.added.append(file.path)
+        elif remote[file.path] != hashes[file.path]:
+            plan.changed.append(file.path)
+        else:
+            plan.unchanged.append(file.path)
+    plan.deleted = sorted(path for path in remote if path not in hashes)
+    return plan
+
+
+class ListingCache:
+    """File listings of immutable remote versions, one JSON file per version ID"""
+
+    def __init__(self, directory: Path, keep: int = MAX_CACHED_LISTINGS):
+        self.directory = directory
+        self.keep = keep
+
+    def path_for(self, version_id: str) -> Path:
+        # Firebase version names are paths; the last segment is unique per site
+        return self.directory / f"{version_id.rsplit('/', 1)[-1]}.json"
+
+    def get(self, version_id: str) -> Optional[dict]:
+        """{"files": {path: hash}, "config": ...} for version_id, if cached"""
+        try:
+            with open(self.path_for(version_id), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("version") != version_id:
+            return None
+        return cached
+
+    def put(self, version_id: str, files: Dict[str, str], config) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.path_for(version_id)
+            tmp_path = temp_path(path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": version_id, "files": files, "config": config}, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Warning: Failed to write listing cache: {e}")
+            return
+        self.prune()
+
+    def prune(self) -> None:
+        """Drop all but the most recently written listings"""
+        try:
+            listings = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+            for path in listings[self.keep:]:
+                path.unlink()
+        except OSError:
+            pass
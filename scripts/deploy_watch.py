@@ -0,0 +1,128 @@
+"""
+Watch mode for the deployment scripts
+
+The deploy directory is polled with stat() only, nothing is read. Once files
+stop changing for the debounce window, the whole batch of changes is
+redeployed. Each redeploy is a full deploy run over the file list from the
+watcher's last scan; the changed paths are only logged. The directory is not
+walked again, unchanged files hit the stat index without being opened, and
+only content the target does not hold yet is uploaded, but every file still
+goes through the lookup, planning and (on Firebase) populate steps.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from deploy_common import DEFAULT_SCAN_WORKERS, DeployFile, IgnoreRules, walk_files
+
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+POLL_SECONDS = 0.5
+# Changed paths listed when a redeploy starts
+MAX_LISTED_CHANGES = 5
+
+
+class DirectoryWatcher:
+    """Poll a deploy directory and report settled batches of changes"""
+
+    def __init__(self, deploy_dir: Path, ignore: Optional[IgnoreRules] = None,
+                 workers: int = DEFAULT_SCAN_WORKERS, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 poll_seconds: float = POLL_SECONDS):
+        self.deploy_dir = deploy_dir
+        self.ignore = ignore
+        self.workers = workers
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = min(poll_seconds, debounce_seconds) if debounce_seconds > 0 else poll_seconds
+        self.files: Dict[str, DeployFile] = self.scan()
+
+    def scan(self) -> Dict[str, DeployFile]:
+        """path -> DeployFile for every file under the directory, from stat() data only"""
+        if not self.deploy_dir.is_dir():
+            raise FileNotFoundError(f"Deploy directory not found: {self.deploy_dir}")
+
+        root = str(self.deploy_dir.resolve())
+        prefix_len = len(os.path.join(root, ""))
+        found, _ = walk_files(root, self.workers, self.ignore)
+        files = {}
+        for file_path, stat in found:
+            path = "/" + file_path[prefix_len:].replace(os.sep, "/")
+            files[path] = DeployFile(path, Path(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        return files
+
+    @staticmethod
+    def changed_paths(before: Dict[str, DeployFile], after: Dict[str, DeployFile]) -> List[str]:
+        """Paths added, modified or deleted between two scans"""
+        changed = [
+            path for path, file in after.items()
+            if path not in before or (file.size, file.mtime_ns, file.inode) != (
+                before[path].size, before[path].mtime_ns, before[path].inode
+            )
+        ]
+        changed.extend(path for path in before if path not in after)
+        return sorted(changed)
+
+    def wait_for_changes(self) -> Tuple[List[DeployFile], List[str]]:
+        """Block until files change and then stay unchanged for the debounce window
+
+        Returns the new file list and every path changed since the last call.
+        """
+        while True:
+            current = self.scan()
+            if not self.changed_paths(self.files, current):
+                time.sleep(self.poll_seconds)
+                continue
+
+            settled_at = time.monotonic() + self.debounce_seconds
+            while time.monotonic() < settled_at:
+                time.sleep(self.poll_seconds)
+                latest = self.scan()
+                if self.changed_paths(current, latest):
+                    # Still being written, restart the window
+                    settled_at = time.monotonic() + self.debounce_seconds
+                current = latest
+
+            # An edit that was undone within the window leaves nothing to deploy
+            changed = self.changed_paths(self.files, current)
+            if changed:
+                break
+
+        self.files = current
+        return sorted(current.values(), key=lambda file: file.path), changed
+
+
+def describe_changes(changed: Sequence[str]) -> str:
+    """The first few changed paths, for the log"""
+    listed = ", ".join(changed[:MAX_LISTED_CHANGES])
+    if len(changed) > MAX_LISTED_CHANGES:
+        listed += f" and {len(changed) - MAX_LISTED_CHANGES} more"
+    return listed
+
+
+def watch_and_deploy(deploy: Callable[[List[DeployFile]], str], watcher: DirectoryWatcher) -> str:
+    """Deploy the watched directory, then redeploy after every settled batch of changes until Ctrl+C
+
+    deploy gets the complete file list each time, not just the changed paths.
+    The first deploy's errors are raised; later failures are reported and the
+    next change retries. Returns the URL of the last successful deploy.
+    """
+    site_url = deploy(sorted(watcher.files.values(), key=lambda file: file.path))
+    print(f"\n👀 Watching {watcher.deploy_dir} for changes (Ctrl+C to stop)")
+    print(f"🌐 Preview: {site_url}")
+
+    try:
+        while True:
+            files, changed = watcher.wait_for_changes()
+            print(f"\n🔄 {len(changed)} change(s): {describe_changes(changed)}")
+            start = time.perf_counter()
+            try:
+                site_url = deploy(files)
+            except Exception as e:
+                print(f"\n❌ Redeploy failed: {e}")
+                print("👀 Still watching, the next change will retry")
+                continue
+            print(f"\n⚡ Redeployed in {time.perf_counter() - start:.2f}s: {site_url}")
+            print("👀 Watching for changes...")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped watching")
+    return site_url
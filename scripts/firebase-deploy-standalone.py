@@ -19,15 +19,56 @@ Environment Variables (alternative to CLI args):
     FIREBASE_ACCESS_TOKEN - Your Google OAuth access token
     DEPLOY_DIR - Directory containing files to deploy (default: ./public)
     DEPLOY_CHANNEL - Deployment channel (default: live, can be preview or custom)
+
+Uploads are incremental: each file is gzipped and identified by the SHA-256 of
+its gzipped content, and only the blobs Firebase reports as missing are sent.
+Gzipped artifacts are cached by content hash, so unchanged files are compressed
+only once across deploys.
+
+With --clone, the version currently released on the channel is cloned
+server-side and only added or changed paths are populated; deleted paths are
+excluded from the clone. API calls then scale with the size of the change.
+Pass --full-upload to send every file inline in a single request instead.
+
+Each deploy is planned against the released version first: its file list is
+fetched page by page and cached per version ID. If nothing would change, the
+deploy is skipped. --dry-run prints the added, changed, unchanged and deleted
+paths with byte totals without deploying; --plan-json writes them as JSON.
+
+The project and Hosting checks run in the background while files are read
+and compressed. After a successful deploy they are skipped for an hour
+(DEPLOY_PREFLIGHT_TTL seconds, 0 to always check).
+
+Progress is checkpointed to a journal under DEPLOY_CACHE_DIR, and failed
+requests are retried with backoff. If a deploy still fails, re-run it with
+--resume (or DEPLOY_RESUME=1) to skip the uploads it already confirmed.
+
+Cache-Control headers come from a per-glob policy (--headers, default:
+revalidate HTML, cache static assets for an hour). --fingerprint adds
+content-hashed copies of the assets HTML and CSS reference under /_fp/,
+points the references at them and serves them as immutable for a year.
+Scripts are only fingerprinted with --fingerprint-scripts.
+--optimize minifies HTML, CSS and JavaScript before upload; results are
+cached by content, so only changed files are minified again. HTML comments
+are kept unless --strip-html-comments is given.
+
+--watch keeps running after the first deploy and redeploys whenever files in
+the directory change, once they have been left alone for --debounce seconds
+(default 0.5). Redeploys clone the last release, so only changed files are
+uploaded. Combine it with --channel=preview to iterate on a preview channel.
+
+--metrics-json writes phase timings, request latency histograms, retry and
+byte counters and peak memory as JSON; --trace writes the phases as a Chrome
+trace-event file.
 """
 
 import os
 import sys
 import argparse
-import json
-import base64
+import re
+import time
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 try:
     import requests
@@ -36,26 +77,90 @@ except ImportError:
     print("Install it with: pip install requests")
     sys.exit(1)
 
+from deploy_common import (
+    DEFAULT_JOBS, DEFAULT_SCAN_WORKERS, DeployFile, DigestCounts, IgnoreRules, PreflightCache, StatIndex, batch_files,
+    create_session, get_cache_dir, read_files, run_parallel, select_files, start_background, stream_base64_map
+)
+from deploy_assets import fingerprint_files, load_header_policy
+from deploy_blobstore import BlobStore
+from deploy_compress import DEFAULT_GZIP_LEVEL, CompressedCache
+from deploy_journal import DeployJournal
+from deploy_metrics import DeployMetrics, Progress, phase
+from deploy_optimize import optimize_files
+from deploy_plan import DeployPlan, ListingCache, plan_changes
+from deploy_watch import DEFAULT_DEBOUNCE_SECONDS, DirectoryWatcher, watch_and_deploy
+
+# Overridable so the script can be pointed at a proxy or a local stand-in API
+FIREBASE_API_BASE = os.getenv("FIREBASE_API_BASE", "https://firebase.googleapis.com/v1beta1")
+HOSTING_API_BASE = os.getenv("FIREBASE_HOSTING_API_BASE", "https://firebasehosting.googleapis.com/v1beta1")
+
+# Upper bounds for one populateFiles request
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+MAX_BATCH_FILES = 1000
+
+# Page size when listing a version's files
+LIST_FILES_PAGE_SIZE = 1000
+# Keep each clone exclude regex comfortably below API request limits
+MAX_EXCLUDE_REGEX_LENGTH = 4000
+# Operations are polled after 0.1s, then at doubling intervals up to OPERATION_POLL_SECONDS
+FIRST_OPERATION_POLL_SECONDS = 0.1
+OPERATION_POLL_SECONDS = 1
+OPERATION_TIMEOUT_SECONDS = 300
+
 
 class FirebaseDeployer:
     """Firebase Hosting deployment using REST API"""
 
-    def __init__(self, project_id: str, access_token: str, deploy_dir: str, channel: str = "live"):
+    MAX_FILE_SIZE_MB = 10  # Firebase limit
+
+    def __init__(self, project_id: str, access_token: str, deploy_dir: str, channel: str = "live",
+                 full_upload: bool = False, jobs: int = DEFAULT_JOBS,
+                 scan_workers: int = DEFAULT_SCAN_WORKERS, scan_processes: bool = True,
+                 exclude: Sequence[str] = (), default_excludes: bool = True,
+                 compression_level: int = DEFAULT_GZIP_LEVEL, clone: bool = False, resume: bool = False,
+                 optimize: bool = False, strip_html_comments: bool = False, fingerprint: bool = False,
+                 fingerprint_scripts: bool = False, headers_file: Optional[str] = None,
+                 dry_run: bool = False, plan_json: Optional[str] = None,
+                 session: Optional[requests.Session] = None, stat_index: Optional[StatIndex] = None):
         self.project_id = project_id
         self.access_token = access_token
         self.deploy_dir = Path(deploy_dir)
         self.channel = channel
-        self.session = requests.Session()
+        self.full_upload = full_upload
+        self.jobs = jobs
+        self.scan_workers = scan_workers
+        self.scan_processes = scan_processes
+        self.ignore_rules = IgnoreRules.for_directory(self.deploy_dir, ".firebaseignore", exclude, default_excludes)
+        self.stat_index = stat_index or StatIndex.for_directory(self.deploy_dir)
+        self.compressed_cache = CompressedCache.default(compression_level)
+        self.blob_store = BlobStore.default()
+        self.clone = clone
+        self.optimize = optimize
+        self.strip_html_comments = strip_html_comments
+        self.fingerprint = fingerprint
+        self.fingerprint_scripts = fingerprint_scripts
+        self.header_policy = load_header_policy(headers_file)
+        self.listings = ListingCache(get_cache_dir() / "firebase" / project_id / "versions")
+        self.resume = resume
+        self.dry_run = dry_run
+        self.plan_json = plan_json
+        self.journal = DeployJournal.for_target("firebase", project_id, channel)
+        self.metrics = DeployMetrics()
+        self.preflight_cache = PreflightCache.default()
+        self.preflight_key = PreflightCache.key("firebase", project_id, access_token)
+        # A caller deploying several sites can pass one session to share its connection pool
+        self.session = session or create_session(jobs)
         self.session.headers.update({
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         })
 
+    @phase("preflight")
     def check_project_exists(self) -> bool:
         """Check if Firebase project exists"""
         print(f"🔍 Checking if Firebase project exists: {self.project_id}")
 
-        url = f"https://firebase.googleapis.com/v1beta1/projects/{self.project_id}"
+        url = f"{FIREBASE_API_BASE}/projects/{self.project_id}"
         response = self.session.get(url)
 
         if response.status_code == 200:
@@ -70,12 +175,13 @@ class FirebaseDeployer:
             print("\nCreate project at: https://console.firebase.google.com/")
             return False
 
+    @phase("preflight")
     def check_hosting_initialized(self) -> bool:
         """Check if Hosting is initialized for the site"""
         site_id = self.project_id
         print(f"🔍 Checking if Hosting is initialized for site: {site_id}")
 
-        url = f"https://firebasehosting.googleapis.com/v1beta1/projects/{self.project_id}/sites/{site_id}"
+        url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}"
         response = self.session.get(url)
 
         if response.status_code == 200:
@@ -89,59 +195,59 @@ class FirebaseDeployer:
             print("3. Return here and run the script again")
             return False
 
-    def read_files(self) -> List[Dict[str, str]]:
-        """Read all files from deploy directory"""
-        print(f"\n📂 Reading files from: {self.deploy_dir}")
-
-        if not self.deploy_dir.exists():
-            raise FileNotFoundError(f"Deploy directory not found: {self.deploy_dir}")
-
-        files = []
-        MAX_FILE_SIZE_MB = 10  # Firebase limit
-
-        for file_path in self.deploy_dir.rglob("*"):
-            if file_path.is_file():
-                try:
-                    # Read file content with error handling
-                    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                        content = f.read()
+    def preflight(self) -> None:
+        """Check the project and its Hosting site, unless a recent deploy already did"""
+        if self.preflight_cache.take(self.preflight_key):
+            print("✅ Project and Hosting checked by a recent deploy")
+            return
 
-                    # Validate file size
-                    size_mb = len(content.encode("utf-8")) / 1024 / 1024
-                    if size_mb > MAX_FILE_SIZE_MB:
-                        print(f"⚠️  Warning: {file_path.name} is {size_mb:.2f}MB (limit: {MAX_FILE_SIZE_MB}MB), skipping...")
-                        continue
+        if not self.check_project_exists():
+            raise Exception("Project check failed")
+        if not self.check_hosting_initialized():
+            raise Exception("Hosting not initialized")
 
-                    # Get relative path with leading slash
-                    relative_path = "/" + str(file_path.relative_to(self.deploy_dir)).replace("\\", "/")
+    @phase("scan")
+    def read_files(self) -> List[DeployFile]:
+        """List all files in the deploy directory"""
+        print(f"\n📂 Reading files from: {self.deploy_dir}")
 
-                    files.append({
-                        "path": relative_path,
-                        "content": content
-                    })
-                except Exception as e:
-                    print(f"⚠️  Warning: Failed to read {file_path.name}: {e}")
-                    # Continue with other files
+        files = read_files(self.deploy_dir, self.MAX_FILE_SIZE_MB, self.scan_workers, self.ignore_rules)
 
         print(f"✅ Found {len(files)} file(s)")
         return files
 
+    @phase("scan")
+    def select_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Apply this target's ignore rules and size limit to files scanned elsewhere"""
+        files = select_files(files, self.MAX_FILE_SIZE_MB, self.ignore_rules)
+        print(f"\n📂 Deploying {len(files)} scanned file(s) from: {self.deploy_dir}")
+        return files
+
+    @phase("optimize")
+    def optimize_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Swap in minified copies of HTML, CSS and JavaScript"""
+        optimized, report = optimize_files(files, self.deploy_dir, self.scan_workers, self.scan_processes,
+                                           self.strip_html_comments)
+        for kind, (count, before, after) in report.items():
+            self.metrics.count(f"optimize_saved_bytes_{kind}", before - after)
+        return optimized
+
+    @phase("fingerprint")
+    def fingerprint_files(self, files: List[DeployFile]) -> List[DeployFile]:
+        """Add fingerprinted copies of the assets HTML and CSS reference"""
+        fingerprinted = fingerprint_files(files, self.deploy_dir, self.stat_index, self.scan_workers,
+                                          self.scan_processes, self.fingerprint_scripts)
+        self.metrics.count("fingerprinted", len(fingerprinted) - len(files))
+        return fingerprinted
+
+    @phase("version")
     def create_hosting_version(self) -> str:
         """Create a new hosting version"""
         site_id = self.project_id
         print("📝 Creating new hosting version...")
 
-        url = f"https://firebasehosting.googleapis.com/v1beta1/projects/{self.project_id}/sites/{site_id}/versions"
-        payload = {
-            "config": {
-                "headers": [{
-                    "glob": "**",
-                    "headers": {
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                }]
-            }
-        }
+        url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}/versions"
+        payload = {"config": self.version_config()}
 
         response = self.session.post(url, json=payload)
         response.raise_for_status()
@@ -151,50 +257,315 @@ class FirebaseDeployer:
         print(f"✅ Version created: {version_name}")
         return version_name
 
-    def upload_files(self, version_name: str, files: List[Dict[str, str]]) -> None:
-        """Upload files to the version"""
+    def version_config(self) -> dict:
+        """Serving config carrying the header policy"""
+        return {"headers": [{"glob": rule["glob"], "headers": rule["headers"]} for rule in self.header_policy]}
+
+    @phase("diff")
+    def get_version_config(self, version_name: str) -> dict:
+        """Serving config of an existing version"""
+        response = self.session.get(f"{HOSTING_API_BASE}/{version_name}")
+        response.raise_for_status()
+
+        config = response.json().get("config", {})
+        return {"headers": [{"glob": rule.get("glob"), "headers": rule.get("headers")}
+                            for rule in config.get("headers", [])]}
+
+    def upload_files(self, version_name: str, files: List[DeployFile],
+                     digests: Optional[Dict[str, Dict[str, str]]] = None) -> Optional[Dict[str, str]]:
+        """Upload files to the version, returning path -> hash when uploads are hash-based"""
+        if self.full_upload:
+            self.upload_files_inline(version_name, files)
+            return None
+
+        if digests is None:
+            digests = self.compress_files(files)
+        return self.upload_files_by_hash(version_name, files, digests)
+
+    @phase("upload")
+    def upload_files_inline(self, version_name: str, files: List[DeployFile]) -> None:
+        """Upload every file's content inline in size-bounded populateFiles batches"""
         print(f"📤 Uploading {len(files)} file(s)...")
 
-        # Convert files to base64
-        file_list = {}
-        for file in files:
-            # Encode content to base64
-            content_bytes = file["content"].encode("utf-8")
-            base64_content = base64.b64encode(content_bytes).decode("utf-8")
-            file_list[file["path"]] = base64_content
+        # Skip files a previous attempt already populated, unless they changed since
+        populated = self.journal.mapping("inline_populated")
+        pending = [file for file in files if populated.get(file.path) != [file.size, file.mtime_ns]]
+        if len(pending) < len(files):
+            print(f"   ↩️  {len(files) - len(pending)} file(s) already uploaded by the interrupted deploy")
+
+        url = f"{HOSTING_API_BASE}/{version_name}:populateFiles"
+        batches = batch_files(pending, MAX_BATCH_BYTES, MAX_BATCH_FILES)
+        self.metrics.count("bytes_raw", sum(file.size for file in pending))
+
+        def upload_batch(numbered_batch: Tuple[int, List[DeployFile]]) -> None:
+            index, batch = numbered_batch
+            batch_bytes = sum(file.size for file in batch)
+            print(f"   📦 Batch {index}/{len(batches)}: {len(batch)} file(s), {batch_bytes / 1024:.2f} KB")
 
-            size_kb = len(file["content"]) / 1024
-            print(f"   - {file['path']} ({size_kb:.2f} KB)")
+            with self.metrics.span("upload_batch", index=index, files=len(batch), bytes=batch_bytes):
+                # Stream the base64 payload instead of building it in memory
+                response = self.session.post(url, data=lambda: stream_base64_map("files", batch))
+                response.raise_for_status()
+            self.journal.update("inline_populated", {file.path: [file.size, file.mtime_ns] for file in batch})
 
-        url = f"https://firebasehosting.googleapis.com/v1beta1/{version_name}:populateFiles"
-        payload = {"files": file_list}
+        run_parallel(upload_batch, list(enumerate(batches, 1)), self.jobs)
+
+        print("✅ Files uploaded successfully")
+
+    def file_digest(self) -> Tuple[str, Callable[[DeployFile], Dict[str, str]]]:
+        """Digest kind and picklable function files are content-addressed with"""
+        return self.compressed_cache.kind, self.compressed_cache.digests
+
+    @phase("encode")
+    def compress_files(self, files: List[DeployFile]) -> Dict[str, Dict[str, str]]:
+        """Gzip files into the compressed-artifact cache and return their digests"""
+        print(f"🗜️  Compressing {len(files)} file(s)...")
+
+        kind, compute = self.file_digest()
+        # Counted per call: the fingerprint pass digests the same index before this stage
+        counts = DigestCounts()
+        digests = self.stat_index.digest_all(files, kind, compute, self.scan_workers, self.scan_processes, counts)
+        self.blob_store.touch(self.compressed_cache, (file_digests["sha256"] for file_digests in digests.values()))
+
+        print(f"   {counts.hits} unchanged file(s) reused cached hashes, {counts.misses} hashed")
+        self.metrics.count("stat_index_hits", counts.hits)
+        self.metrics.count("stat_index_misses", counts.misses)
+        self.stat_index.prune(files)
+        self.stat_index.save()
+        return digests
+
+    @phase("upload")
+    def upload_files_by_hash(self, version_name: str, files: List[DeployFile],
+                             digests: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+        """Send file hashes and upload only the content Firebase doesn't already have"""
+        # Map each path to the SHA-256 of its gzipped content
+        kind = self.compressed_cache.kind
+        file_hashes = {file.path: digests[file.path][kind] for file in files}
+        blobs = {file_hashes[file.path]: file for file in files}
+
+        # Paths a previous attempt already populated with the same hash are skipped
+        populated = self.journal.mapping("populated")
+        paths = [path for path in file_hashes if populated.get(path) != file_hashes[path]]
+        if len(paths) < len(file_hashes):
+            print(f"   ↩️  {len(file_hashes) - len(paths)} path(s) already populated by the interrupted deploy")
+
+        url = f"{HOSTING_API_BASE}/{version_name}:populateFiles"
+
+        def populate_batch(start: int) -> None:
+            batch = {path: file_hashes[path] for path in paths[start:start + MAX_BATCH_FILES]}
+            with self.metrics.span("populate_batch", index=start // MAX_BATCH_FILES + 1, files=len(batch)):
+                response = self.session.post(url, json={"files": batch})
+                response.raise_for_status()
+
+            populate_data = response.json()
+            required = populate_data.get("uploadRequiredHashes", [])
+            if populate_data.get("uploadUrl"):
+                self.journal.set(upload_url=populate_data["uploadUrl"])
+            self.journal.extend("required", required)
+            self.journal.update("populated", batch)
+
+        run_parallel(populate_batch, range(0, len(paths), MAX_BATCH_FILES), self.jobs)
+
+        # Everything Firebase asked for, in this or an interrupted attempt, minus what was confirmed.
+        # A hash shared by several paths is only uploaded once.
+        required = self.journal.items("required") - self.journal.items("uploaded")
+        required_hashes = [file_hash for file_hash in dict.fromkeys(file_hashes.values()) if file_hash in required]
+        upload_url = self.journal.get("upload_url")
+        self.metrics.count("blobs_required", len(required_hashes))
+        self.metrics.count("blobs_present", len(blobs) - len(required_hashes))
+
+        if not required_hashes:
+            print("✅ All files already present, nothing to upload")
+            return file_hashes
+
+        if not upload_url:
+            raise Exception("No upload URL received from Firebase")
+
+        print(f"📤 Uploading {len(required_hashes)} of {len(blobs)} file(s) with {self.jobs} worker(s)...")
+        progress = Progress("📤", len(required_hashes))
+
+        def upload_blob(file_hash: str) -> int:
+            file = blobs[file_hash]
+            artifact = self.compressed_cache.ensure(file.source, digests[file.path]["sha256"])
+            compressed_size = artifact.stat().st_size
+
+            # A callable body is re-read on every retry attempt
+            upload_response = self.session.post(
+                f"{upload_url}/{file_hash}",
+                data=artifact.read_bytes,
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            upload_response.raise_for_status()
+            self.journal.extend("uploaded", [file_hash])
+            progress.advance()
+            return compressed_size
+
+        sent_bytes = sum(run_parallel(upload_blob, required_hashes, self.jobs))
+        raw_bytes = sum(blobs[file_hash].size for file_hash in required_hashes)
+        self.metrics.count("bytes_raw", raw_bytes)
+        self.metrics.count("bytes_compressed", sent_bytes)
+
+        print(f"✅ Files uploaded successfully ({raw_bytes / 1024:.2f} KB → {sent_bytes / 1024:.2f} KB gzipped)")
+        return file_hashes
+
+    @phase("diff")
+    def get_released_version(self) -> Optional[str]:
+        """Name of the version currently released on the channel, if any"""
+        site_id = self.project_id
+        url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}/channels/{self.channel}"
+        response = self.session.get(url)
+
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        return response.json().get("release", {}).get("version", {}).get("name")
+
+    @phase("diff")
+    def list_version_files(self, version_name: str) -> Dict[str, str]:
+        """Return path -> hash for every file in a version, following pagination"""
+        url = f"{HOSTING_API_BASE}/{version_name}/files"
+        files = {}
+        page_token = None
+
+        while True:
+            params = {"pageSize": LIST_FILES_PAGE_SIZE}
+            if page_token:
+                params["pageToken"] = page_token
+
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+
+            data = response.json()
+            for file in data.get("files", []):
+                files[file["path"]] = file["hash"]
+
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                return files
+
+    def version_listing(self, version_name: str) -> dict:
+        """Files and config of a version, listed once and then read from the listing cache"""
+        listing = self.listings.get(version_name)
+        if listing is None:
+            print(f"🔍 Listing files of {version_name}...")
+            listing = {"files": self.list_version_files(version_name), "config": self.get_version_config(version_name)}
+            self.listings.put(version_name, listing["files"], listing["config"])
+        return listing
+
+    @phase("diff")
+    def plan_deploy(self, files: List[DeployFile], digests: Dict[str, Dict[str, str]],
+                    base_version: Optional[str]) -> DeployPlan:
+        """Compare the local files with base_version (None when nothing is released)"""
+        kind = self.compressed_cache.kind
+        hashes = {file.path: digests[file.path][kind] for file in files}
+        remote = None
+        config_changed = False
+        if base_version:
+            listing = self.version_listing(base_version)
+            remote = listing["files"]
+            config_changed = listing["config"] != self.version_config()
+        return plan_changes("firebase", self.channel, base_version, files, hashes, remote, config_changed)
+
+    @staticmethod
+    def exclude_regexes(paths: List[str]) -> List[str]:
+        """Anchored regexes matching exactly the given paths, batched by length"""
+        regexes = []
+        batch = []
+        batch_length = 0
+
+        for path in sorted(paths):
+            escaped = re.escape(path)
+            if batch and batch_length + len(escaped) > MAX_EXCLUDE_REGEX_LENGTH:
+                regexes.append("^(?:" + "|".join(batch) + ")$")
+                batch = []
+                batch_length = 0
+            batch.append(escaped)
+            batch_length += len(escaped) + 1
+
+        if batch:
+            regexes.append("^(?:" + "|".join(batch) + ")$")
+        return regexes
+
+    def wait_for_operation(self, operation: dict) -> dict:
+        """Poll a long-running operation until it is done and return its response"""
+        deadline = time.time() + OPERATION_TIMEOUT_SECONDS
+        delay = FIRST_OPERATION_POLL_SECONDS
+
+        while not operation.get("done"):
+            if time.time() > deadline:
+                raise Exception(f"Timed out waiting for operation {operation.get('name')}")
+            time.sleep(delay)
+            delay = min(delay * 2, OPERATION_POLL_SECONDS)
+
+            response = self.session.get(f"{HOSTING_API_BASE}/{operation['name']}")
+            response.raise_for_status()
+            operation = response.json()
+
+        if "error" in operation:
+            raise Exception(f"Operation failed: {operation['error'].get('message', operation['error'])}")
+        return operation.get("response", {})
+
+    @phase("version")
+    def clone_version(self, source_version: str, exclude_paths: List[str]) -> str:
+        """Clone a version server-side, leaving out exclude_paths"""
+        site_id = self.project_id
+        print(f"📝 Cloning {source_version}...")
+
+        url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}/versions:clone"
+        payload = {"sourceVersion": source_version, "finalize": False}
+        if exclude_paths:
+            payload["exclude"] = {"regexes": self.exclude_regexes(exclude_paths)}
 
         response = self.session.post(url, json=payload)
         response.raise_for_status()
 
-        print("✅ Files uploaded successfully")
+        version_name = self.wait_for_operation(response.json())["name"]
+        print(f"✅ Version created: {version_name}")
+        return version_name
+
+    def deploy_delta(self, files: List[DeployFile], plan: DeployPlan, version_name: Optional[str] = None,
+                     digests: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+        """Clone the plan's base version and patch in the local changes
+
+        Pass version_name to continue with a clone made by an interrupted deploy.
+        Returns the new version name.
+        """
+        if not version_name:
+            # Changed paths are excluded too so populateFiles adds them fresh
+            version_name = self.clone_version(plan.base, plan.deleted + plan.changed)
+            self.journal.set(version_name=version_name, base_version=plan.base)
+
+        upload = set(plan.added + plan.changed)
+        changed = [file for file in files if file.path in upload]
+        if changed:
+            self.upload_files_by_hash(version_name, changed, digests)
+        return version_name
 
+    @phase("finalize")
     def finalize_version(self, version_name: str) -> None:
         """Finalize the version"""
         print("🔨 Finalizing version...")
 
-        url = f"https://firebasehosting.googleapis.com/v1beta1/{version_name}?update_mask=status"
-        payload = {"status": "FINALIZED"}
+        # Setting the config here too covers versions cloned from an older policy
+        url = f"{HOSTING_API_BASE}/{version_name}?update_mask=status,config"
+        payload = {"status": "FINALIZED", "config": self.version_config()}
 
         response = self.session.patch(url, json=payload)
         response.raise_for_status()
 
         print("✅ Version finalized")
 
+    @phase("release")
     def create_release(self, version_name: str) -> str:
         """Create a release to deploy the version"""
         site_id = self.project_id
         print(f"🚀 Creating release on channel: {self.channel}...")
 
         if self.channel == "live":
-            url = f"https://firebasehosting.googleapis.com/v1beta1/projects/{self.project_id}/sites/{site_id}/releases?versionName={version_name}"
+            url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}/releases?versionName={version_name}"
         else:
-            url = f"https://firebasehosting.googleapis.com/v1beta1/projects/{self.project_id}/sites/{site_id}/channels/{self.channel}/releases?versionName={version_name}"
+            url = f"{HOSTING_API_BASE}/projects/{self.project_id}/sites/{site_id}/channels/{self.channel}/releases?versionName={version_name}"
 
         payload = {"message": "Deployed via Python standalone script"}
 
@@ -206,36 +577,106 @@ class FirebaseDeployer:
         print(f"✅ Release created: {release_name}")
         return release_name
 
-    def deploy(self) -> str:
-        """Main deployment workflow"""
-        print("\n🔥 Firebase Hosting Deployment Tool (Python)\n")
+    @phase("deploy")
+    def deploy(self, files: Optional[List[DeployFile]] = None) -> str:
+        """Main deployment workflow
 
-        # Step 1: Check project exists
-        if not self.check_project_exists():
-            raise Exception("Project check failed")
+        Pass files to deploy a list that was already scanned instead of reading the directory.
+        """
+        print("\n🔥 Firebase Hosting Deployment Tool (Python)\n")
 
-        # Step 2: Check hosting initialized
-        if not self.check_hosting_initialized():
-            raise Exception("Hosting not initialized")
+        # Steps 1-2: Check the project and Hosting in the background while files are read and encoded
+        preflight = None if self.dry_run else start_background(self.preflight)
 
-        # Step 3: Read files
-        files = self.read_files()
+        # Step 3: Read and compress files
+        files = self.read_files() if files is None else self.select_files(files)
         if not files:
             raise Exception("No files found to deploy")
-
-        # Step 4: Create version
-        version_name = self.create_hosting_version()
-
-        # Step 5: Upload files
-        self.upload_files(version_name, files)
-
-        # Step 6: Finalize version
-        self.finalize_version(version_name)
+        if self.optimize:
+            files = self.optimize_files(files)
+        if self.fingerprint:
+            files = self.fingerprint_files(files)
+        self.metrics.count("files", len(files))
+        # A dry run needs the hashes to plan even with --full-upload
+        digests = None if self.full_upload and not self.dry_run else self.compress_files(files)
+
+        if self.dry_run:
+            plan = self.plan_deploy(files, digests, self.get_released_version())
+            self.report_plan(plan)
+            return self.site_url()
+
+        preflight.result()
+
+        # Pick up an interrupted deploy of the same directory if asked to
+        resumed = self.journal.open(self.deploy_dir, self.resume)
+        version_name = self.journal.get("version_name") if resumed else None
+        base_version = self.journal.get("base_version") if resumed else None
+        plan = None
+
+        if version_name:
+            print(f"↩️  Resuming interrupted deploy of {version_name}")
+            if base_version:
+                plan = self.plan_deploy(files, digests, base_version)
+        elif not self.full_upload:
+            # Plan against the live release and skip the deploy if nothing would change
+            plan = self.plan_deploy(files, digests, self.get_released_version())
+            self.report_plan(plan)
+            if plan.no_op:
+                self.journal.clear()
+                self.preflight_cache.remember(self.preflight_key)
+                print("✅ Released version already matches, nothing to deploy")
+                return self.site_url()
+            if self.clone:
+                base_version = plan.base
+                if not base_version:
+                    print("ℹ️  Nothing released on this channel yet, deploying all files")
+
+        if self.journal.get("stage") != "finalized":
+            if base_version:
+                # Steps 4-5: Clone the released version and patch in the changes
+                version_name = self.deploy_delta(files, plan, version_name, digests)
+            else:
+                # Step 4: Create version
+                if not version_name:
+                    version_name = self.create_hosting_version()
+                    self.journal.set(version_name=version_name)
+
+                # Step 5: Upload files
+                self.upload_files(version_name, files, digests)
+
+            # Step 6: Finalize version
+            self.finalize_version(version_name)
+            self.journal.set(stage="finalized")
 
         # Step 7: Create release
         self.create_release(version_name)
 
-        # Construct site URL
+        if digests is not None:
+            # The next plan against this release needn't list it
+            kind = self.compressed_cache.kind
+            self.listings.put(version_name, {file.path: digests[file.path][kind] for file in files},
+                              self.version_config())
+        self.journal.clear()
+        self.preflight_cache.remember(self.preflight_key)
+
+        evicted, evicted_bytes = self.blob_store.evict()
+        if evicted:
+            print(f"🧹 Evicted {evicted} least recently used cached artifact(s), "
+                  f"{evicted_bytes / 1024 / 1024:.1f} MB")
+
+        return self.site_url()
+
+    def report_plan(self, plan: DeployPlan) -> None:
+        """Print the plan, record its totals and write it as JSON if asked to"""
+        plan.print_summary(list_paths=self.dry_run)
+        for category in ("added", "changed", "deleted"):
+            self.metrics.count(f"plan_{category}", len(getattr(plan, category)))
+        self.metrics.count("plan_upload_bytes", plan.total_bytes(plan.added + plan.changed))
+        if self.plan_json:
+            plan.write_json(self.plan_json)
+
+    def site_url(self) -> str:
+        """Public URL of the deployed channel"""
         if self.channel == "live":
             site_url = f"https://{self.project_id}.web.app"
         else:
@@ -244,7 +685,7 @@ class FirebaseDeployer:
         return site_url
 
 
-def get_config() -> Tuple[str, str, str, str]:
+def get_config() -> argparse.Namespace:
     """Get configuration from CLI args or environment variables"""
     parser = argparse.ArgumentParser(
         description="Deploy static website to Firebase Hosting using REST API"
@@ -253,29 +694,88 @@ def get_config() -> Tuple[str, str, str, str]:
     parser.add_argument("--token", help="Google OAuth access token")
     parser.add_argument("--dir", default="./public", help="Directory to deploy (default: ./public)")
     parser.add_argument("--channel", default="live", help="Deployment channel (default: live)")
+    parser.add_argument("--full-upload", action="store_true",
+                        help="Send every file inline instead of only the ones Firebase is missing")
+    parser.add_argument("--jobs", type=int, help=f"Concurrent upload requests (default: {DEFAULT_JOBS})")
+    parser.add_argument("--scan-workers", type=int,
+                        help=f"Parallel workers for scanning and hashing (default: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument("--scan-threads", action="store_true",
+                        help="Hash on threads instead of processes (for I/O-bound trees such as network mounts)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip matching files or directories (repeatable; also read from .firebaseignore)")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="Also deploy .git, node_modules, source maps and editor temp files")
+    parser.add_argument("--clone", action="store_true",
+                        help="Clone the released version server-side and upload only the changes")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted deploy of the same directory from its last checkpoint")
+    parser.add_argument("--compression-level", type=int, choices=range(1, 10), metavar="1-9",
+                        help=f"gzip level for uploaded files (default: {DEFAULT_GZIP_LEVEL})")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Minify HTML, CSS and JavaScript before upload")
+    parser.add_argument("--strip-html-comments", action="store_true",
+                        help="With --optimize, also remove HTML comments (breaks React and Vue hydration markers)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Serve content-hashed copies of referenced assets as immutable")
+    parser.add_argument("--fingerprint-scripts", action="store_true",
+                        help="With --fingerprint, also fingerprint classic scripts (not for webpack publicPath 'auto')")
+    parser.add_argument("--headers", metavar="FILE",
+                        help="JSON list of {\"glob\", \"headers\"} rules replacing the default cache policy")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print what would be added, changed and deleted without deploying")
+    parser.add_argument("--plan-json", metavar="FILE", help="Write the deploy plan to this file as JSON")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and redeploy whenever files change (e.g. to a preview target)")
+    parser.add_argument("--debounce", type=float, metavar="SECONDS",
+                        help=f"With --watch, wait until files stop changing (default: {DEFAULT_DEBOUNCE_SECONDS}s)")
+    parser.add_argument("--metrics-json", help="Write phase timings, request latencies and counters to this file")
+    parser.add_argument("--trace", help="Write a Chrome trace-event file of the deploy phases")
 
     args = parser.parse_args()
 
-    project_id = args.project or os.getenv("FIREBASE_PROJECT_ID")
-    access_token = args.token or os.getenv("FIREBASE_ACCESS_TOKEN")
-    deploy_dir = args.dir or os.getenv("DEPLOY_DIR", "./public")
-    channel = args.channel or os.getenv("DEPLOY_CHANNEL", "live")
-
-    return project_id, access_token, deploy_dir, channel
+    return argparse.Namespace(
+        project_id=args.project or os.getenv("FIREBASE_PROJECT_ID"),
+        access_token=args.token or os.getenv("FIREBASE_ACCESS_TOKEN"),
+        deploy_dir=args.dir or os.getenv("DEPLOY_DIR", "./public"),
+        channel=args.channel or os.getenv("DEPLOY_CHANNEL", "live"),
+        full_upload=args.full_upload or os.getenv("DEPLOY_FULL_UPLOAD") == "1",
+        jobs=args.jobs or int(os.getenv("DEPLOY_JOBS", DEFAULT_JOBS)),
+        scan_workers=args.scan_workers or int(os.getenv("DEPLOY_SCAN_WORKERS", DEFAULT_SCAN_WORKERS)),
+        scan_processes=not (args.scan_threads or os.getenv("DEPLOY_SCAN_THREADS") == "1"),
+        exclude=args.exclude + [glob for glob in os.getenv("DEPLOY_EXCLUDE", "").split(",") if glob],
+        default_excludes=not args.no_default_excludes,
+        compression_level=args.compression_level or int(os.getenv("DEPLOY_COMPRESSION_LEVEL", DEFAULT_GZIP_LEVEL)),
+        clone=args.clone or os.getenv("DEPLOY_CLONE") == "1",
+        resume=args.resume or os.getenv("DEPLOY_RESUME") == "1",
+        optimize=args.optimize or os.getenv("DEPLOY_OPTIMIZE") == "1",
+        strip_html_comments=args.strip_html_comments or os.getenv("DEPLOY_STRIP_HTML_COMMENTS") == "1",
+        fingerprint=args.fingerprint or os.getenv("DEPLOY_FINGERPRINT") == "1",
+        fingerprint_scripts=args.fingerprint_scripts or os.getenv("DEPLOY_FINGERPRINT_SCRIPTS") == "1",
+        headers_file=args.headers or os.getenv("DEPLOY_HEADERS"),
+        dry_run=args.dry_run or os.getenv("DEPLOY_DRY_RUN") == "1",
+        plan_json=args.plan_json or os.getenv("DEPLOY_PLAN_JSON"),
+        watch=args.watch or os.getenv("DEPLOY_WATCH") == "1",
+        debounce=args.debounce if args.debounce is not None else float(
+            os.getenv("DEPLOY_WATCH_DEBOUNCE", DEFAULT_DEBOUNCE_SECONDS)
+        ),
+        metrics_json=args.metrics_json or os.getenv("DEPLOY_METRICS_JSON"),
+        trace=args.trace or os.getenv("DEPLOY_TRACE"),
+    )
 
 
 def main():
     """Main entry point"""
+    deployer = None
     try:
-        project_id, access_token, deploy_dir, channel = get_config()
+        config = get_config()
 
         # Validate configuration
-        if not project_id:
+        if not config.project_id:
             print("❌ Error: Firebase project ID is required")
             print("Provide via --project=my-project or FIREBASE_PROJECT_ID env var")
             sys.exit(1)
 
-        if not access_token:
+        if not config.access_token:
             print("❌ Error: Access token is required")
             print("Provide via --token=ya29.xxx or FIREBASE_ACCESS_TOKEN env var")
             print("\nTo get an access token:")
@@ -285,8 +785,33 @@ def main():
             sys.exit(1)
 
         # Create deployer and deploy
-        deployer = FirebaseDeployer(project_id, access_token, deploy_dir, channel)
-        site_url = deployer.deploy()
+        deployer = FirebaseDeployer(
+            config.project_id, config.access_token, config.deploy_dir, config.channel,
+            full_upload=config.full_upload, jobs=config.jobs,
+            scan_workers=config.scan_workers, scan_processes=config.scan_processes,
+            exclude=config.exclude, default_excludes=config.default_excludes,
+            compression_level=config.compression_level, resume=config.resume,
+            # Watch redeploys clone the last release so only changed files are sent
+            clone=config.clone or (config.watch and not config.full_upload),
+            optimize=config.optimize, strip_html_comments=config.strip_html_comments,
+            fingerprint=config.fingerprint, fingerprint_scripts=config.fingerprint_scripts,
+            headers_file=config.headers_file,
+            dry_run=config.dry_run, plan_json=config.plan_json,
+        )
+        try:
+            if config.watch and not config.dry_run:
+                watcher = DirectoryWatcher(deployer.deploy_dir, deployer.ignore_rules, config.scan_workers,
+                                           config.debounce)
+                site_url = watch_and_deploy(deployer.deploy, watcher)
+            else:
+                site_url = deployer.deploy()
+        finally:
+            deployer.metrics.write(config.metrics_json, config.trace, provider="firebase",
+                                   project=config.project_id, channel=config.channel)
+
+        if config.dry_run:
+            print("\n📋 Dry run, nothing was deployed\n")
+            return
 
         # Success!
         print("\n🎉 Deployment successful!")
@@ -294,6 +819,8 @@ def main():
 
     except Exception as e:
         print(f"\n❌ Deployment failed: {e}")
+        if deployer is not None and deployer.journal.exists():
+            print("💡 Run again with --resume to continue from the last confirmed upload")
         sys.exit(1)
 
 
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The deploy scripts import their shared modules by name from scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,276 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from deploy_common import (
+    CHUNK_SIZE, DeployFile, DigestCounts, IgnoreRules, StatIndex, base64_file, base64_size, batch_files,
+    cloudflare_digest, content_digest, stream_base64_map
+)
+
+
+def test_name_pattern_matches_at_any_depth():
+    rules = IgnoreRules(["assets"])
+    assert rules.matches("assets", "assets", True)
+    assert rules.matches("blog/assets", "assets", True)
+    assert rules.matches("blog/assets", "assets", False)
+
+
+def test_leading_slash_anchors_to_root():
+    rules = IgnoreRules(["/assets"])
+    assert rules.matches("assets", "assets", True)
+    assert rules.matches("assets", "assets", False)
+    assert not rules.matches("blog/assets", "assets", True)
+    assert not rules.matches("blog/assets", "assets", False)
+
+
+def test_anchored_directory_pattern():
+    rules = IgnoreRules(["/assets/"])
+    assert rules.matches("assets", "assets", True)
+    assert not rules.matches("assets", "assets", False)
+    assert not rules.matches("blog/assets", "assets", True)
+
+
+def test_trailing_slash_restricts_to_directories():
+    rules = IgnoreRules(["build/"])
+    assert rules.matches("build", "build", True)
+    assert rules.matches("docs/build", "build", True)
+    assert not rules.matches("build", "build", False)
+
+
+def test_path_pattern_matches_from_root():
+    rules = IgnoreRules(["drafts/*.html"])
+    assert rules.matches("drafts/a.html", "a.html", False)
+    assert not rules.matches("blog/drafts/a.html", "a.html", False)
+
+
+def test_excludes_file_checks_parent_directories():
+    rules = IgnoreRules(["/assets", "node_modules"])
+    assert rules.excludes_file("assets/app.js")
+    assert not rules.excludes_file("blog/assets/app.js")
+    assert rules.excludes_file("blog/node_modules/x/index.js")
+
+
+def test_blank_and_root_patterns_are_ignored():
+    rules = IgnoreRules(["", "  ", "/"])
+    assert not rules.matches("index.html", "index.html", False)
+
+
+# Well outside StatIndex.RACY_WINDOW_NS
+OLD_MTIME_NS = 1_600_000_000 * 1_000_000_000
+
+
+def write_file(path, content, mtime_ns=OLD_MTIME_NS):
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def deploy_file(path):
+    stat = path.stat()
+    return DeployFile("/" + path.name, path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class CountingDigest:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file):
+        self.calls += 1
+        return content_digest(file)
+
+
+def digest(index, path, compute):
+    counts = DigestCounts()
+    digests = index.digest_all([deploy_file(path)], "sha256", compute, workers=1, counts=counts)
+    return digests["/" + path.name]["sha256"], counts
+
+
+def test_stat_index_reuses_digest_of_unchanged_file(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    compute = CountingDigest()
+
+    first, counts = digest(index, source, compute)
+    assert (counts.hits, counts.misses) == (0, 1)
+    second, counts = digest(index, source, compute)
+    assert (counts.hits, counts.misses) == (1, 0)
+    assert first == second
+    assert compute.calls == 1
+    assert (index.hits, index.misses) == (1, 1)
+
+
+def test_stat_index_survives_save_and_load(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    digest(index, source, content_digest)
+    index.save()
+
+    compute = CountingDigest()
+    _, counts = digest(StatIndex(tmp_path / "index.json"), source, compute)
+    assert counts.hits == 1
+    assert compute.calls == 0
+
+
+def test_stat_index_invalidated_by_size(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    digest(index, source, content_digest)
+
+    # Same mtime, different size
+    write_file(source, b"hello world")
+    value, counts = digest(index, source, content_digest)
+    assert counts.misses == 1
+    assert value == content_digest(deploy_file(source))["sha256"]
+
+
+def test_stat_index_invalidated_by_mtime(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    digest(index, source, content_digest)
+
+    # Same size, different content and mtime
+    write_file(source, b"jello", OLD_MTIME_NS + 1)
+    value, counts = digest(index, source, content_digest)
+    assert counts.misses == 1
+    assert value == content_digest(deploy_file(source))["sha256"]
+
+
+def test_stat_index_invalidated_by_inode(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    digest(index, source, content_digest)
+
+    # Replaced by a new file with the same size and mtime
+    replacement = tmp_path / "a.txt.new"
+    write_file(replacement, b"jello")
+    os.replace(replacement, source)
+    value, counts = digest(index, source, content_digest)
+    assert counts.misses == 1
+    assert value == content_digest(deploy_file(source))["sha256"]
+
+
+def test_stat_index_does_not_trust_racy_files(tmp_path):
+    source = tmp_path / "a.txt"
+    # Modified just now: a write within the same mtime tick would go unnoticed
+    write_file(source, b"hello", time.time_ns())
+    index = StatIndex(tmp_path / "index.json")
+    compute = CountingDigest()
+
+    digest(index, source, compute)
+    _, counts = digest(index, source, compute)
+    assert counts.misses == 1
+    assert compute.calls == 2
+    assert not index.dirty
+
+    # Once the mtime is older than the window the digest is kept
+    os.utime(source, ns=(OLD_MTIME_NS, OLD_MTIME_NS))
+    digest(index, source, compute)
+    _, counts = digest(index, source, compute)
+    assert counts.hits == 1
+    assert compute.calls == 3
+
+
+def test_stat_index_keeps_digest_kinds_apart(tmp_path):
+    source = tmp_path / "a.txt"
+    write_file(source, b"hello")
+    index = StatIndex(tmp_path / "index.json")
+    digest(index, source, content_digest)
+
+    counts = DigestCounts()
+    index.digest_all([deploy_file(source)], "other", lambda file: {"other": "x"}, workers=1, counts=counts)
+    assert counts.misses == 1
+    # Both kinds are now cached
+    _, counts = digest(index, source, content_digest)
+    assert counts.hits == 1
+
+
+def test_stat_index_prune_forgets_removed_paths(tmp_path):
+    kept, removed = tmp_path / "kept.txt", tmp_path / "removed.txt"
+    write_file(kept, b"kept")
+    write_file(removed, b"removed")
+    index = StatIndex(tmp_path / "index.json")
+    index.digest_all([deploy_file(kept), deploy_file(removed)], "sha256", content_digest, workers=1)
+    index.save()
+
+    index.prune([deploy_file(kept)])
+    assert index.dirty
+    assert set(index.entries) == {"/kept.txt"}
+    index.save()
+    assert set(StatIndex(tmp_path / "index.json").entries) == {"/kept.txt"}
+
+
+# Empty, around one chunk, and past the second chunk boundary
+STREAM_SIZES = [0, 1, 2, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 2 * CHUNK_SIZE + 2]
+
+
+@pytest.mark.parametrize("size", STREAM_SIZES)
+def test_base64_file_matches_b64encode(tmp_path, size):
+    content = os.urandom(size)
+    source = tmp_path / "blob.bin"
+    source.write_bytes(content)
+    assert base64_file(source) == base64.b64encode(content).decode("ascii")
+    assert base64_size(size) == len(base64.b64encode(content))
+
+
+def test_stream_base64_map_matches_b64encode(tmp_path):
+    contents = {}
+    files = []
+    for size in STREAM_SIZES:
+        source = tmp_path / f"{size}.bin"
+        contents[f"/{size}.bin"] = os.urandom(size)
+        source.write_bytes(contents[f"/{size}.bin"])
+        files.append(DeployFile(f"/{size}.bin", source, size))
+
+    body = json.loads(b"".join(stream_base64_map("files", files)))
+    assert list(body) == ["files"]
+    assert body["files"] == {path: base64.b64encode(content).decode("ascii") for path, content in contents.items()}
+
+
+def test_stream_base64_map_without_files():
+    assert json.loads(b"".join(stream_base64_map("files", []))) == {"files": {}}
+
+
+def test_cloudflare_digest(tmp_path):
+    content = os.urandom(CHUNK_SIZE + 5)
+    source = tmp_path / "app.js"
+    source.write_bytes(content)
+    expected = hashlib.sha256(base64.b64encode(content) + b"js").hexdigest()[:32]
+    assert cloudflare_digest(DeployFile("/app.js", source, len(content))) == {"cloudflare": expected}
+
+
+def sized_files(*sizes):
+    return [DeployFile(f"/{index}.bin", Path(f"/site/{index}.bin"), size) for index, size in enumerate(sizes)]
+
+
+def test_batch_files_respects_byte_limit():
+    # 300 bytes encode to 400
+    batches = batch_files(sized_files(300, 300, 300, 300), max_bytes=800, max_files=10)
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert all(sum(base64_size(file.size) for file in batch) <= 800 for batch in batches)
+
+
+def test_batch_files_respects_count_limit():
+    batches = batch_files(sized_files(*[1] * 7), max_bytes=10_000, max_files=3)
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+
+def test_batch_files_gives_oversized_file_its_own_batch():
+    files = sized_files(30, 3000, 30)
+    batches = batch_files(files, max_bytes=400, max_files=10)
+    assert batches == [[files[0]], [files[1]], [files[2]]]
+
+
+def test_batch_files_keeps_order():
+    files = sized_files(*range(1, 20))
+    batches = batch_files(files, max_bytes=40, max_files=4)
+    assert [file for batch in batches for file in batch] == files
+    assert batch_files([], max_bytes=40, max_files=4) == []
@@ -0,0 +1,76 @@
+import json
+
+from deploy_journal import DeployJournal
+
+
+def interrupted_journal(tmp_path, deploy_dir):
+    """Journal of a deploy that populated two paths and uploaded one of two required hashes"""
+    journal = DeployJournal(tmp_path / "journal.jsonl")
+    journal.open(deploy_dir, resume=False)
+    journal.set(version="sites/p/versions/1", upload_url="https://upload.example/v1")
+    journal.update("populated", {"/index.html": "aaa", "/app.css": "bbb"})
+    journal.extend("required", ["aaa", "bbb"])
+    journal.extend("uploaded", ["aaa"])
+    return journal.path
+
+
+def test_resume_replays_partial_journal(tmp_path):
+    path = interrupted_journal(tmp_path, tmp_path)
+
+    journal = DeployJournal(path)
+    assert journal.open(tmp_path, resume=True)
+    assert journal.get("version") == "sites/p/versions/1"
+    assert journal.get("upload_url") == "https://upload.example/v1"
+    assert journal.mapping("populated") == {"/index.html": "aaa", "/app.css": "bbb"}
+    # Hashes confirmed by the interrupted deploy are not uploaded again
+    assert journal.items("required") - journal.items("uploaded") == {"bbb"}
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = interrupted_journal(tmp_path, tmp_path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "extend", "key": "uploaded", "values": ["bbb"]})[:20])
+
+    journal = DeployJournal(path)
+    assert journal.open(tmp_path, resume=True)
+    assert journal.items("uploaded") == {"aaa"}
+
+    # Records appended after resuming are replayed as well
+    journal.extend("uploaded", ["bbb"])
+    resumed = DeployJournal(path)
+    assert resumed.open(tmp_path, resume=True)
+    assert resumed.items("uploaded") == {"aaa", "bbb"}
+
+
+def test_without_resume_starts_over(tmp_path):
+    path = interrupted_journal(tmp_path, tmp_path)
+
+    journal = DeployJournal(path)
+    assert not journal.open(tmp_path, resume=False)
+    assert journal.get("version") is None
+    assert journal.items("uploaded") == set()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_journal_of_another_directory_is_not_resumed(tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    path = interrupted_journal(tmp_path, other)
+
+    journal = DeployJournal(path)
+    assert not journal.open(tmp_path, resume=True)
+    assert journal.mapping("populated") == {}
+
+
+def test_missing_journal_starts_fresh(tmp_path):
+    journal = DeployJournal(tmp_path / "journals" / "missing.jsonl")
+    assert not journal.open(tmp_path, resume=True)
+    assert journal.exists()
+    assert journal.get("deploy_dir") == str(tmp_path.resolve())
+
+
+def test_clear_removes_journal(tmp_path):
+    journal = DeployJournal(interrupted_journal(tmp_path, tmp_path))
+    journal.clear()
+    assert not journal.exists()
+    journal.clear()
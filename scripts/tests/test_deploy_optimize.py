@@ -0,0 +1,107 @@
+import pytest
+
+from deploy_optimize import MinifyError, minify_css, minify_html, minify_js
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("a = b / c / d;", "a=b/c/d;"),
+    ("a = (b) / 2", "a=(b)/2"),
+    ("a = arr[0] / 2", "a=arr[0]/2"),
+    ("x = y++ / 2", "x=y++/2"),
+    ("x = y-- / z / 2", "x=y--/z/2"),
+    ("x = /ab+c/gi.test(s)", "x=/ab+c/gi.test(s)"),
+    ("return /x/.test(y)", "return/x/.test(y)"),
+    ("x = typeof /a/", "x=typeof/a/"),
+    ("f(a, /=+/g)", "f(a,/=+/g)"),
+    ("var re = /[/]/;", "var re=/[/]/;"),
+    ("var re = /a\\/\\/b/; // c", "var re=/a\\/\\/b/;"),
+])
+def test_js_regex_or_division(source, expected):
+    assert minify_js(source) == expected
+
+
+@pytest.mark.parametrize("source, expected", [
+    ('s = "// not a comment"; t = \'/* nor */\'', 's="// not a comment";t=\'/* nor */\''),
+    ('s = "a  \\"  b"', 's="a  \\"  b"'),
+    ("x = `a ${ {b: 1}.b } // c`", "x=`a ${ {b: 1}.b } // c`"),
+    ("x = `${`${a}  `}`", "x=`${`${a}  `}`"),
+])
+def test_js_strings_and_templates_are_kept(source, expected):
+    assert minify_js(source) == expected
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("a + ++b", "a+ ++b"),
+    ("a - -b", "a- -b"),
+    ("1 .toString()", "1 .toString()"),
+    ("var  x  =  1", "var x=1"),
+])
+def test_js_keeps_spaces_that_change_tokens(source, expected):
+    assert minify_js(source) == expected
+
+
+def test_js_keeps_line_breaks_for_semicolon_insertion():
+    assert minify_js("x = a\n/* c */\n(b)") == "x=a\n(b)"
+    assert minify_js("a\n++b") == "a\n++b"
+    assert minify_js("x = a // c\ny = b") == "x=a\ny=b"
+    assert minify_js("if (a) {\n  b()\n}\n") == "if(a){b()}"
+
+
+def test_js_keeps_license_comments_and_shebang():
+    assert minify_js("#!/usr/bin/env node\n/*! MIT */\nfoo( )") == "#!/usr/bin/env node\n/*! MIT */\nfoo()"
+
+
+@pytest.mark.parametrize("source", ["s = 'open", "x = `open", "/* open", "x = /open"])
+def test_js_unterminated_input_raises(source):
+    with pytest.raises(MinifyError):
+        minify_js(source)
+
+
+def test_css():
+    source = 'a  {  color : red ;  }  /* x */ b > c { background: url( "a b.png" ) ; content: "  x  " }'
+    assert minify_css(source) == 'a{color :red}b>c{background:url( "a b.png" );content:"  x  "}'
+
+
+def test_css_keeps_descendant_and_pseudo_selectors_apart():
+    assert minify_css("a :hover { }") == "a :hover{}"
+
+
+def test_css_keeps_license_comments():
+    assert minify_css("/*! keep */\na { }") == "/*! keep */ a{}"
+
+
+def test_html_keeps_framework_comment_markers():
+    react = '<div id="root"><!--$--><p>Hello<!-- -->world</p><!--/$--></div>'
+    assert minify_html(react) == react
+    vue = "<div>\n  <!--[--><span>a</span><!--]-->\n</div>"
+    assert minify_html(vue) == "<div>\n<!--[--><span>a</span><!--]-->\n</div>"
+    assert minify_html('<!--#include virtual="/nav.html" -->') == '<!--#include virtual="/nav.html" -->'
+    assert minify_html("<!-- ko if: a --><b></b><!-- /ko -->") == "<!-- ko if: a --><b></b><!-- /ko -->"
+
+
+def test_html_strips_comments_when_asked():
+    source = '<!--[if IE]><p>ie</p><![endif]--> <!-- x --> <p>a<!-- -->b</p><!--! keep -->'
+    assert minify_html(source, strip_comments=True) == "<!--[if IE]><p>ie</p><![endif]--> <p>ab</p><!--! keep -->"
+
+
+def test_html_tags_and_text():
+    assert minify_html('<p  class = "a  b" >\n\n  t  </p >') == '<p class="a  b">\nt </p>'
+
+
+def test_html_leaves_pre_and_textarea_alone():
+    source = "<pre>  a\n   b </pre>  <textarea> x  y </textarea>"
+    assert minify_html(source) == "<pre>  a\n   b </pre> <textarea> x  y </textarea>"
+
+
+def test_html_minifies_inline_script_and_style():
+    source = "<script>\n  var a = 1 ;  // c\n</script><style> a { color : red } </style>"
+    assert minify_html(source) == "<script>var a=1;</script><style>a{color :red}</style>"
+
+
+def test_html_leaves_other_scripts_alone():
+    template = '<script type="text/template">  keep   this </script>'
+    assert minify_html(template) == template
+    # A script the JavaScript minifier cannot take apart stays as it is
+    broken = "<script> s = 'open </script>"
+    assert minify_html(broken) == broken
+    assert minify_html('<script>if (a < b) x = "</p>"</script>') == '<script>if(a<b)x="</p>"</script>'
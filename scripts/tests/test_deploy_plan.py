@@ -0,0 +1,127 @@
+import json
+import os
+from pathlib import Path
+
+from deploy_common import DeployFile
+from deploy_plan import DeployPlan, ListingCache, plan_changes
+
+
+def deploy_files(sizes):
+    return [DeployFile(path, Path("/site") / path.lstrip("/"), size) for path, size in sizes.items()]
+
+
+def test_plan_classifies_paths():
+    files = deploy_files({"/index.html": 10, "/new.css": 20, "/same.js": 30})
+    hashes = {"/index.html": "h2", "/new.css": "h3", "/same.js": "h4"}
+    remote = {"/index.html": "h1", "/same.js": "h4", "/old.png": "h5", "/gone.txt": "h6"}
+
+    plan = plan_changes("firebase", "live", "sites/p/versions/1", files, hashes, remote, False)
+
+    assert plan.remote_known
+    assert plan.added == ["/new.css"]
+    assert plan.changed == ["/index.html"]
+    assert plan.unchanged == ["/same.js"]
+    assert plan.deleted == ["/gone.txt", "/old.png"]
+    assert not plan.no_op
+
+
+def test_identical_listing_is_no_op():
+    files = deploy_files({"/index.html": 10})
+    plan = plan_changes("cloudflare", "main", "d1", files, {"/index.html": "h1"}, {"/index.html": "h1"}, False)
+    assert plan.no_op
+
+
+def test_config_change_is_not_no_op():
+    files = deploy_files({"/index.html": 10})
+    plan = plan_changes("firebase", "live", "v1", files, {"/index.html": "h1"}, {"/index.html": "h1"}, True)
+    assert plan.unchanged == ["/index.html"]
+    assert not plan.no_op
+
+
+def test_unknown_listing_counts_everything_as_added():
+    files = deploy_files({"/index.html": 10})
+    plan = plan_changes("firebase", "live", "v1", files, {"/index.html": "h1"}, None, False)
+    assert not plan.remote_known
+    assert plan.added == ["/index.html"]
+    assert not plan.no_op
+
+
+def test_nothing_live_yet():
+    plan = plan_changes("firebase", "live", None, [], {}, None, False)
+    assert plan.remote_known
+    assert plan.no_op
+
+
+def test_write_json_shape(tmp_path):
+    files = deploy_files({"/a.html": 100, "/b.css": 50, "/c.js": 7})
+    hashes = {"/a.html": "x", "/b.css": "y2", "/c.js": "z"}
+    remote = {"/b.css": "y1", "/c.js": "z", "/d.txt": "w"}
+    plan = plan_changes("cloudflare", "main", "d1", files, hashes, remote, False)
+
+    path = tmp_path / "plan.json"
+    plan.write_json(str(path))
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    assert data == plan.summary()
+    assert data == {
+        "provider": "cloudflare",
+        "target": "main",
+        "base": "d1",
+        "remote_known": True,
+        "no_op": False,
+        "config_changed": False,
+        "totals": {
+            "added": {"files": 1, "bytes": 100},
+            "changed": {"files": 1, "bytes": 50},
+            "unchanged": {"files": 1, "bytes": 7},
+            "deleted": {"files": 1},
+        },
+        "added": ["/a.html"],
+        "changed": ["/b.css"],
+        "unchanged": ["/c.js"],
+        "deleted": ["/d.txt"],
+    }
+
+
+def test_empty_plan_summary():
+    plan = DeployPlan("firebase", "live", None, True, False)
+    assert plan.summary()["totals"]["added"] == {"files": 0, "bytes": 0}
+    assert plan.no_op
+
+
+def test_listing_cache_round_trip(tmp_path):
+    cache = ListingCache(tmp_path / "versions")
+    assert cache.get("sites/p/versions/1") is None
+
+    cache.put("sites/p/versions/1", {"/index.html": "h1"}, {"headers": []})
+    cached = cache.get("sites/p/versions/1")
+    assert cached["files"] == {"/index.html": "h1"}
+    assert cached["config"] == {"headers": []}
+    assert cache.path_for("sites/p/versions/1") == tmp_path / "versions" / "1.json"
+
+
+def test_listing_cache_checks_version(tmp_path):
+    cache = ListingCache(tmp_path)
+    cache.put("sites/p/versions/1", {"/index.html": "h1"}, None)
+    # Same last segment, different site
+    assert cache.get("sites/q/versions/1") is None
+
+
+def test_listing_cache_ignores_corrupt_file(tmp_path):
+    cache = ListingCache(tmp_path)
+    cache.path_for("d1").write_text("{not json", encoding="utf-8")
+    assert cache.get("d1") is None
+
+
+def test_listing_cache_keeps_newest(tmp_path):
+    cache = ListingCache(tmp_path, keep=2)
+    for number in range(4):
+        cache.put(f"d{number}", {}, None)
+        # Distinct mtimes regardless of filesystem timestamp granularity
+        os.utime(cache.path_for(f"d{number}"), (1_000_000 + number, 1_000_000 + number))
+    cache.prune()
+
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == ["d2.json", "d3.json"]
+    assert cache.get("d0") is None
+    assert cache.get("d3") is not None